@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Re-ingest many documents through the OpenAI Batch API instead of live calls.
+
+Every command works on a checkpointed work directory (see hr_parser.batch)
+and can be re-run after an interruption.
+
+Usage:
+  python batch_ingest.py prepare <folder> --workdir runs/backfill [--kind resume|job]
+  python batch_ingest.py submit  --workdir runs/backfill
+  python batch_ingest.py status  --workdir runs/backfill
+  python batch_ingest.py collect --workdir runs/backfill
+  python batch_ingest.py run     --workdir runs/backfill [--poll 60]   (submit, wait, collect)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from hr_parser.batch import BatchRun
+
+EXTENSIONS = {".pdf", ".docx", ".txt", ".png", ".jpg", ".jpeg", ".tiff", ".bmp"}
+
+
+def _files(folder: str):
+    for path in sorted(Path(folder).rglob("*")):
+        if path.is_file() and path.suffix.lower() in EXTENSIONS:
+            yield path.read_bytes(), str(path.relative_to(folder))
+
+
+def _kind(workdir: str, default: str) -> str:
+    try:
+        with open(os.path.join(workdir, "state.json")) as f:
+            return json.load(f)["kind"]
+    except FileNotFoundError:
+        return default
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["prepare", "submit", "status", "collect", "run"])
+    parser.add_argument("folder", nargs="?", help="Documents to ingest (prepare only)")
+    parser.add_argument("--workdir", required=True)
+    parser.add_argument("--kind", default="resume", choices=["resume", "job"])
+    parser.add_argument("--poll", type=float, help="Seconds between status polls for 'run'")
+    args = parser.parse_args()
+
+    run = BatchRun(args.workdir, kind=_kind(args.workdir, args.kind))
+    if args.command == "prepare":
+        if not args.folder:
+            parser.error("prepare needs a folder")
+        print(f"Prepared {run.prepare(_files(args.folder))} requests in {args.workdir}")
+    elif args.command == "submit":
+        print(f"Submitted batches: {asyncio.run(run.submit())}")
+    elif args.command == "status":
+        asyncio.run(run.poll())
+    elif args.command == "collect":
+        async def _collect():
+            await run.poll()
+            return await run.collect()
+        print(f"Collected: {asyncio.run(_collect())}")
+    elif args.command == "run":
+        print(f"Collected: {asyncio.run(run.run(args.poll))}")
+    print(json.dumps(run.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the canonical stage: the CPU spent turning one decoded GPT
+response into the validated document that is embedded and stored
+(gpt client _postprocess + service _finalize), for resumes and jobs.
+
+Responses are synthetic, seeded and deliberately messy (country names,
+"Present" end dates, "Jan 2019" start dates, mixed-case proficiencies, string
+salaries and booleans) so every normalisation rule runs. JSON decoding is
+done up front and not timed. Reported per kind: CPU microseconds per document
+(median of --repeat passes over --docs documents).
+
+Usage: python bench_canonical.py [--docs 2000] [--repeat 5] [--out after.json] [--compare before.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.environ.setdefault("HRP_USE_MOCK", "true")
+
+SEED = 1234
+SKILLS = ("Python", "SQL", "Kubernetes", "React", "TypeScript", "AWS", "Spark", "Docker", "Go", "Kafka",
+          "PostgreSQL", "MongoDB", "Terraform", "Airflow", "Pandas", "FastAPI", "GraphQL", "Redis")
+LEVELS = ("Advanced", "expert ", "Intermediate", "beginner", "Proficient", None)
+COUNTRIES = ("India", "United States", "United Kingdom", "Germany", "IN")
+
+
+def _resume(rng):
+    experience = []
+    for i in range(rng.randint(4, 9)):
+        start = rng.randint(2005, 2022)
+        experience.append({
+            "title_raw": "Senior Engineer", "title_norm": "software engineer", "company": f"Company {i}",
+            "employment_type": "Full-time", "location": "Remote",
+            "start_date": rng.choice((f"{start}-0{rng.randint(1, 9)}", f"Jan {start}", str(start))),
+            "end_date": rng.choice(("Present", f"{start + 2}", f"March {start + 1}", None)),
+            "current": None,
+            "achievements": [f"Delivered project {j} ahead of schedule" for j in range(rng.randint(2, 6))],
+            "tech": rng.sample(SKILLS, 4),
+        })
+    return {
+        "meta": {"language": "en", "parsing_confidence": rng.choice((0.82, "high", None))},
+        "identity": {
+            "full_name": "Jane Roe", "first_name": "Jane", "last_name": "Roe",
+            "emails": ["jane.roe@example.com"], "phones": ["+91 98765 43210"],
+            "links": {"linkedin": "https://linkedin.com/in/janeroe", "github": None, "portfolio": None, "other": []},
+            "location": {"city": "Chennai", "state": "TN", "country": rng.choice(COUNTRIES)},
+        },
+        "summary": "Backend engineer with a decade of distributed systems experience.",
+        "skills": [{"name": s, "group": "tech", "proficiency": rng.choice(LEVELS), "years": rng.randint(1, 10)}
+                   for s in rng.sample(SKILLS, rng.randint(8, 18))],
+        "experience": experience,
+        "education": [{"institution": "IIT Madras", "degree": "B.Tech", "field_of_study": "CS",
+                       "start_year": 2008, "end_year": 2012, "score": {"value": 8.1, "scale": None}}],
+        "projects": [{"name": "ingest", "description": "Document ingestion pipeline"}],
+        "certifications": [],
+        "preferences": {"remote": True, "relocation": rng.choice((True, "open")), "notice_period_days": 30,
+                        "salary": {"currency": "INR", "expectation_lpa": rng.choice(("32", 40.0, None))}},
+        "work_auth": {"country": "IN", "status": "citizen"},
+        "dedupe": {"keys": []},
+    }
+
+
+def _job(rng):
+    return {
+        "meta": {"language": "en", "parsing_confidence": 0.9},
+        "company": {"name": "TechCorp", "industry": "Retail", "size": "1000+", "website": None,
+                    "description": "Retail analytics at scale."},
+        "details": {"title": "Senior Data Scientist", "department": "Analytics",
+                    "employment_type": rng.choice(("Full-time", "contract", "full_time")),
+                    "work_schedule": None, "travel_required": rng.choice(("No", False, None)),
+                    "visa_sponsorship": rng.choice(("yes", None))},
+        "location": {"city": "Chennai", "state": None, "country": rng.choice(COUNTRIES),
+                     "remote": "false", "hybrid": rng.choice(("yes", True))},
+        "requirements": {"experience_years": 6, "education_level": rng.choice(("Master's", "bachelor", None)),
+                         "required_skills": rng.sample(SKILLS, 8), "preferred_skills": rng.sample(SKILLS, 4),
+                         "certifications": [], "languages": ["English"]},
+        "compensation": {"salary_min": 80000, "salary_max": 120000, "currency": "USD", "equity": True,
+                         "benefits": ["Health Insurance", "401k", "PTO"]},
+        "application": {"contact_email": "jobs@techcorp.com", "application_url": None,
+                        "application_deadline": rng.choice(("31 March 2026", None)), "application_method": "email"},
+        "description": "Build forecasting models for store operations.",
+        "responsibilities": [f"Responsibility {i}" for i in range(rng.randint(6, 14))],
+        "qualifications": [f"Qualification {i}" for i in range(rng.randint(4, 8))],
+        "benefits": ["Health Insurance"], "culture": "Collaborative",
+        "growth_opportunities": ["Mentorship"], "dedupe": {"keys": []},
+    }
+
+
+def _stage(kind):
+    """(gpt client, service, response factory) for a document kind."""
+    if kind == "resume":
+        from hr_parser import gpt_client
+        from hr_parser.service import HRResumeParserService
+        return gpt_client, HRResumeParserService(), _resume
+    from hr_parser import job_gpt_client
+    from hr_parser.job_service import HRJobParserService
+    return job_gpt_client, HRJobParserService(), _job
+
+
+def bench(kind, docs, repeat):
+    gpt, service, make = _stage(kind)
+    rng = random.Random(SEED)
+    raw = [json.dumps(make(rng)) for _ in range(docs)]
+    passes = []
+    for _ in range(repeat):
+        objs = [json.loads(r) for r in raw]  # decoding is not part of the stage
+        started = time.process_time()
+        for i, obj in enumerate(objs):
+            obj = gpt._postprocess(obj, "", f"doc-{i}.pdf")
+            service._finalize(obj, "application/pdf", f"doc-{i}.pdf", "0" * 64, "1" * 64)
+        passes.append((time.process_time() - started) / docs * 1e6)
+    return {"docs": docs, "us_per_doc": round(statistics.median(passes), 1),
+            "min_us_per_doc": round(min(passes), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5, help="Passes per kind; the median is reported")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --out to compare against")
+    args = parser.parse_args()
+
+    results = {kind: bench(kind, args.docs, args.repeat) for kind in ("resume", "job")}
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["cases"]
+    for kind, r in results.items():
+        line = f"{kind:7s} {r['us_per_doc']:8.1f} us/doc (min {r['min_us_per_doc']:.1f})"
+        if kind in baseline:
+            before = baseline[kind]["us_per_doc"]
+            line += f"   before {before:.1f} us/doc, {before / r['us_per_doc']:.2f}x"
+        print(line)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"python": sys.version.split()[0], "seed": SEED, "cases": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
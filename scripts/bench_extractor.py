@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Benchmark text extraction over a synthetic, reproducible document corpus.
+
+The corpus is generated from a fixed seed into --corpus (a temp dir by
+default): text PDFs, scanned image-only PDFs, DOCX files with tables, and
+PNG/JPG scans, each at several page counts. Every case runs in a fresh
+process so peak RSS is per case. Reported per case:
+  - pages_per_sec / mb_per_sec : extraction throughput
+  - peak_rss_mb                : max resident set size of the case process
+  - ocr_page_share             : PDF pages that ended up on the OCR path
+
+Usage: python bench_extractor.py [--repeat 3] [--out baseline.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+SEED = 1234
+PAGE_COUNTS = (1, 5, 20)
+WORDS = ("python", "mongodb", "kubernetes", "led", "team", "of", "engineers", "delivered", "platform",
+         "migration", "reduced", "latency", "by", "40%", "designed", "apis", "for", "payments", "data",
+         "pipelines", "mentored", "juniors", "aws", "react", "typescript", "and", "shipped", "features")
+
+# (kind, function benchmarked, file extension)
+KINDS = {
+    "text_pdf": ("pdf_to_text", ".pdf"),
+    "scanned_pdf": ("pdf_to_text", ".pdf"),
+    "docx": ("docx_to_text", ".docx"),
+    "png": ("image_to_text", ".png"),
+    "jpg": ("image_to_text", ".jpg"),
+    "mixed": ("file_to_text", None),
+}
+
+
+def _lines(rng, n):
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() for _ in range(n)]
+
+
+def _text_pdf(path, pages, rng):
+    import fitz
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page().insert_textbox(fitz.Rect(50, 50, 545, 790), "\n".join(_lines(rng, 45)), fontsize=10)
+    doc.save(path)
+
+
+def _scanned_pdf(path, pages, rng):
+    import fitz
+    src = fitz.open()
+    for _ in range(pages):
+        src.new_page().insert_textbox(fitz.Rect(50, 50, 545, 790), "\n".join(_lines(rng, 45)), fontsize=10)
+    doc = fitz.open()
+    for page in src:
+        scan = doc.new_page(width=page.rect.width, height=page.rect.height)
+        scan.insert_image(scan.rect, pixmap=page.get_pixmap(dpi=150))
+    doc.save(path)
+
+
+def _docx(path, pages, rng):
+    from docx import Document
+    doc = Document()
+    for p in range(pages):
+        doc.add_heading(f"Experience {p + 1}", level=2)
+        for line in _lines(rng, 25):
+            doc.add_paragraph(line)
+        table = doc.add_table(rows=6, cols=3)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = " ".join(rng.choice(WORDS) for _ in range(3))
+    doc.save(path)
+
+
+def _image(path, pages, rng, fmt):
+    from PIL import Image, ImageDraw
+    # "pages" scales the image height: one A4-ish page at ~100 dpi per page
+    img = Image.new("RGB", (850, 1100 * pages), "white")
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(_lines(rng, 60 * pages)):
+        draw.text((40, 30 + i * 18), line, fill="black")
+    img.save(path, format=fmt)
+
+
+def build_corpus(directory):
+    """Write the corpus into `directory`; returns {case: {kind, func, files, pages}}."""
+    rng = random.Random(SEED)
+    makers = {
+        "text_pdf": _text_pdf,
+        "scanned_pdf": _scanned_pdf,
+        "docx": _docx,
+        "png": lambda p, n, r: _image(p, n, r, "PNG"),
+        "jpg": lambda p, n, r: _image(p, n, r, "JPEG"),
+    }
+    cases = {}
+    for kind, make in makers.items():
+        func, ext = KINDS[kind]
+        # images are single scans; keep them to 1 and 5 "pages" of height
+        counts = PAGE_COUNTS[:2] if kind in ("png", "jpg") else PAGE_COUNTS
+        for pages in counts:
+            path = os.path.join(directory, f"{kind}-{pages}p{ext}")
+            make(path, pages, rng)
+            cases[f"{kind}/{pages}p"] = {"kind": kind, "func": func, "files": [path], "pages": pages}
+    mixed = [c["files"][0] for c in cases.values() if c["pages"] == 1]
+    cases["mixed/1p"] = {"kind": "mixed", "func": "file_to_text", "files": mixed, "pages": len(mixed)}
+    return cases
+
+
+def _run_case(case, repeat):
+    """Runs in a fresh process: time `repeat` passes over the case files."""
+    from hr_parser import extractor
+    func = getattr(extractor, case["func"])
+    timings, ocr_pages, pdf_pages = [], 0, 0
+    for path in case["files"]:  # untimed warm-up pass: lazy imports, OS page cache
+        func(path)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for path in case["files"]:
+            func(path)
+        timings.append(time.perf_counter() - started)
+    for path in case["files"]:
+        if path.endswith(".pdf"):
+            _, stats = extractor.extract_pdf(path)
+            pdf_pages += len(stats)
+            ocr_pages += sum(1 for p in stats if p["method"] in ("ocr", "none"))
+    return {
+        "seconds": statistics.median(timings),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "ocr_page_share": round(ocr_pages / pdf_pages, 3) if pdf_pages else None,
+    }
+
+
+def run_cases(cases, repeat):
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name, case in cases.items():
+        with ctx.Pool(1) as pool:
+            out = pool.apply(_run_case, (case, repeat))
+        size_mb = sum(os.path.getsize(p) for p in case["files"]) / 2**20
+        seconds = max(out["seconds"], 1e-9)
+        results[name] = {
+            "function": case["func"],
+            "files": len(case["files"]),
+            "pages": case["pages"],
+            "size_mb": round(size_mb, 3),
+            "seconds": round(out["seconds"], 4),
+            "pages_per_sec": round(case["pages"] / seconds, 2),
+            "mb_per_sec": round(size_mb / seconds, 2),
+            "peak_rss_mb": round(out["peak_rss_mb"], 1),
+            "ocr_page_share": out["ocr_page_share"],
+        }
+        print(f"  {name:<18} {results[name]['pages_per_sec']:>9} pages/s {results[name]['mb_per_sec']:>8} MB/s "
+              f"rss {results[name]['peak_rss_mb']:>7} MB  ocr {out['ocr_page_share']}")
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["cases"]
+    print(f"\nvs {baseline_path} (pages/s ratio, >1 is faster):")
+    for name, res in results.items():
+        old = baseline.get(name)
+        if old and old["pages_per_sec"]:
+            print(f"  {name:<18} x{res['pages_per_sec'] / old['pages_per_sec']:.2f}")
+
+
+def _tesseract_version():
+    try:
+        import pytesseract
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per case; the median is reported")
+    parser.add_argument("--corpus", help="Directory for the generated corpus (default: a temp dir, removed after)")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --out to compare against")
+    args = parser.parse_args()
+
+    corpus = args.corpus or tempfile.mkdtemp(prefix="hrp-bench-")
+    os.makedirs(corpus, exist_ok=True)
+    try:
+        cases = build_corpus(corpus)
+        print(f"Corpus: {sum(len(c['files']) for c in cases.values())} files in {corpus}")
+        results = run_cases(cases, args.repeat)
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus, ignore_errors=True)
+
+    report = {"python": sys.version.split()[0], "seed": SEED, "repeat": args.repeat,
+              "tesseract": _tesseract_version(), "cases": results}
+    if args.compare:
+        compare(results, args.compare)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Convert stored embeddings to the binary vector format.
+
+Rewrites emb.skills_vec / emb.summary_vec / emb.jd_vec on canonical resumes
+and jobs, and vec on _emb_cache, into EMB_STORAGE_FORMAT (or --format).
+Documents already in the target format are skipped, so the script can be
+re-run or interrupted safely; vectors in another binary format are decoded
+and re-encoded, so it also switches formats.
+
+Usage: python migrate_vectors.py [--format float32|int8|array] [--batch 500] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pymongo import MongoClient, UpdateOne
+
+from app.ml.vector_codec import EMB_STORAGE_FORMAT, decode, encode, is_encoded
+
+# collection -> vector fields to rewrite
+TARGETS = {
+    "resumes_canonical": ["emb.skills_vec", "emb.summary_vec"],
+    "jobs_canonical": ["emb.skills_vec", "emb.jd_vec"],
+    "_emb_cache": ["vec"],
+}
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def migrate_collection(col, fields, fmt, batch_size, dry_run):
+    """Re-encode `fields` on every doc of `col`; returns (scanned, updated)."""
+    scanned = updated = 0
+    ops = []
+    for doc in col.find({}, {f: 1 for f in fields}, batch_size=batch_size):
+        scanned += 1
+        changes = {}
+        for field in fields:
+            value = _get(doc, field)
+            if value is None or is_encoded(value, fmt):
+                continue
+            # Decode first: the stored value may be a Binary in another format
+            vec = decode(value)
+            if vec is not None:
+                changes[field] = encode(vec, fmt)
+        if not changes:
+            continue
+        updated += 1
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+        if len(ops) >= batch_size:
+            if not dry_run:
+                col.bulk_write(ops, ordered=False)
+            ops = []
+    if ops and not dry_run:
+        col.bulk_write(ops, ordered=False)
+    return scanned, updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", default=EMB_STORAGE_FORMAT, choices=["float32", "int8", "array"])
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = MongoClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))[os.getenv("DB_NAME", "hyperrecruit")]
+    print(f"Migrating embeddings to {args.format}{' (dry run)' if args.dry_run else ''}")
+    for name, fields in TARGETS.items():
+        started = time.time()
+        scanned, updated = migrate_collection(db[name], fields, args.format, args.batch, args.dry_run)
+        print(f"  {name}: {updated}/{scanned} documents converted in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
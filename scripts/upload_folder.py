@@ -7,9 +7,10 @@ Usage: python upload_folder.py <folder_path>
 import requests
 import os
 import sys
+import time
 from pathlib import Path
 
-def upload_folder(folder_path, api_url="http://localhost:8080/hr/parser/bulk"):
+def upload_folder(folder_path, api_url="http://localhost:8080/hr/parser/ingest", poll_seconds=2):
     """Upload entire folder of resumes."""
     
     print(f"📁 Uploading folder: {folder_path}")
@@ -75,54 +76,67 @@ def upload_folder(folder_path, api_url="http://localhost:8080/hr/parser/bulk"):
         print("❌ No files could be read for upload")
         return False
     
-    # Upload files
-    print(f"\n📡 Uploading {len(upload_files)} files...")
+    # Submit files for background ingest, then poll for progress
+    print(f"\n📡 Submitting {len(upload_files)} files...")
     try:
-        response = requests.post(api_url, files=upload_files, timeout=300)  # 5 minute timeout
+        response = requests.post(api_url, files=upload_files, timeout=60)
         
         print(f"📊 Response status: {response.status_code}")
         
-        if response.status_code == 200:
-            result = response.json()
-            print(f"✅ Bulk upload successful!")
-            print(f"   Total files processed: {result['count']}")
-            
-            # Show results
-            successful = 0
-            failed = 0
-            candidates = set()
-            
-            for i, file_result in enumerate(result['results']):
-                filename = files[i].name
-                if file_result.get('ok'):
-                    successful += 1
-                    confidence = file_result.get('parsing_confidence', 0)
-                    candidate_id = file_result.get('candidate_id', 'N/A')
-                    candidates.add(candidate_id)
-                    print(f"   ✅ {filename}: {confidence:.2f} confidence (ID: {candidate_id[:8]}...)")
-                else:
-                    failed += 1
-                    error = file_result.get('error', 'Unknown error')
-                    print(f"   ❌ {filename}: {error}")
-            
-            print(f"\n📊 Summary:")
-            print(f"   ✅ Successful: {successful}")
-            print(f"   ❌ Failed: {failed}")
-            print(f"   👥 Unique candidates: {len(candidates)}")
-            print(f"   📈 Success rate: {successful/len(files)*100:.1f}%")
-            
-            if failed_files:
-                print(f"   📁 Files with read errors: {len(failed_files)}")
-            
-            return True
-            
-        else:
+        if response.status_code != 200:
             print(f"❌ Upload failed: {response.status_code}")
             print(f"   Error: {response.text}")
             return False
+        
+        ingest_id = response.json()["ingest_id"]
+        print(f"✅ Queued as ingest {ingest_id}")
+        
+        status_url = f"{api_url.rstrip('/')}/{ingest_id}"
+        while True:
+            result = requests.get(status_url, timeout=30).json()
+            done = result['succeeded'] + result['failed']
+            print(f"   ⏳ {done}/{result['total']} done "
+                  f"({result['failed']} failed, {result['files_per_sec']:.2f} files/s)")
+            if result['status'] == 'completed':
+                break
+            time.sleep(poll_seconds)
+        
+        print(f"✅ Bulk upload successful!")
+        print(f"   Total files processed: {result['total']}")
+        
+        # Show results
+        successful = 0
+        failed = 0
+        candidates = set()
+        
+        for file_info in result['files']:
+            filename = file_info['filename']
+            file_result = file_info.get('result') or {}
+            if file_result.get('ok'):
+                successful += 1
+                confidence = file_result.get('parsing_confidence', 0)
+                candidate_id = file_result.get('candidate_id', 'N/A')
+                candidates.add(candidate_id)
+                print(f"   ✅ {filename}: {confidence:.2f} confidence (ID: {candidate_id[:8]}...)")
+            else:
+                failed += 1
+                error = file_result.get('error', 'Unknown error')
+                print(f"   ❌ {filename}: {error}")
+        
+        print(f"\n📊 Summary:")
+        print(f"   ✅ Successful: {successful}")
+        print(f"   ❌ Failed: {failed}")
+        print(f"   👥 Unique candidates: {len(candidates)}")
+        print(f"   📈 Success rate: {successful/len(files)*100:.1f}%")
+        print(f"   ⚡ Throughput: {result['files_per_sec']:.2f} files/s")
+        
+        if failed_files:
+            print(f"   📁 Files with read errors: {len(failed_files)}")
+        
+        return True
             
     except requests.exceptions.Timeout:
-        print("❌ Upload timed out. Try with fewer files or check server status.")
+        print("❌ Request timed out. Check server status.")
         return False
     except Exception as e:
         print(f"❌ Upload error: {e}")
@@ -10,10 +10,10 @@ setup(
     install_requires=[
         "fastapi>=0.104.0",
         "uvicorn>=0.24.0",
-        "pydantic>=2.0.0",
-        "openai>=1.0.0",
+        "pydantic[email]>=2.0.0",
+        "openai>=1.17.0",
         "tenacity>=8.0.0",
-        "pymongo>=4.0.0",
+        "pymongo>=4.9.0",
         "python-dotenv>=1.0.0",
         "pymupdf>=1.23.0",
         "python-docx>=0.8.11",
@@ -22,6 +22,9 @@ setup(
         "scikit-learn>=1.3.0",
     ],
     extras_require={
+        "tokens": [
+            "tiktoken>=0.7.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "black>=23.0.0",
@@ -10,10 +10,41 @@ src_dir = os.path.dirname(current_file_dir)
 if src_dir not in sys.path:
     sys.path.insert(0, src_dir)
 
+import threading
+from contextlib import asynccontextmanager
 from hr_parser import hr_parser_router
+from hr_parser.router import create_services
 from hr_parser.scoring_router import router as scoring_router
+from hr_parser.ingest import start_ingest_workers, stop_ingest_workers
+from hr_parser.repository import ensure_indexes
+from hr_parser.bulk import shutdown_extract_pool
+from hr_parser.clients import close_clients
+from hr_parser.ratelimit import limiter_stats
+from app.ml.ann import candidate_index
+from app.ml.embeddings import cache_stats
+from app import metrics
 
-app = FastAPI(title="HR Parser Demo", version="0.1.0")
+def _bootstrap_indexes():
+    try:
+        ensure_indexes()
+    except Exception as e:
+        print(f"Index bootstrap failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.parser_services = create_services()
+    # Index creation waits on Mongo; run it beside startup instead of before it
+    threading.Thread(target=_bootstrap_indexes, name="hrp-index-bootstrap", daemon=True).start()
+    # Drain any ingest queued before a restart
+    start_ingest_workers(app.state.parser_services)
+    yield
+    stop_ingest_workers()
+    # After the ingest workers, which may still be extracting through the pool
+    shutdown_extract_pool()
+    candidate_index.close()
+    await close_clients()
+
+app = FastAPI(title="HR Parser Demo", version="0.1.0", lifespan=lifespan)
 
 # Get the directory of this file
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -32,4 +63,10 @@ def read_root():
 
 @app.get("/health")
 def health():
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@app.get("/metrics")
+def get_metrics():
+    """Process counters (cache hits/misses/evictions, ...), embedding cache size and OpenAI limiter state."""
+    return {"ok": True, "counters": metrics.snapshot(), "embedding_cache": cache_stats(),
+            "rate_limits": limiter_stats()}
\ No newline at end of file
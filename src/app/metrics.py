@@ -0,0 +1,28 @@
+"""
+Process-wide counters exposed on GET /metrics.
+
+Counters are plain integers keyed by dotted names ("emb_cache.lru.hits").
+Callers bump them with `incr`; `snapshot` returns a copy for reporting.
+"""
+import threading
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+
+
+def incr(name: str, n: int = 1) -> None:
+    if not n:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot() -> Dict[str, int]:
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,352 @@
+"""
+Approximate nearest-neighbour retrieval over stored embeddings.
+
+IVFIndex is an inverted-file index built with NumPy: vectors are normalized,
+clustered with spherical k-means into ~sqrt(N) lists, and a query only scans
+the `nprobe` lists whose centroids are closest to it. Small indexes (below
+ANN_MIN_TRAIN vectors) are scanned exactly. The index updates in place as
+documents are written and persists to an .npz file; once it has grown well
+past what it was clustered on, it is re-clustered on a background thread.
+"""
+import os, threading, time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH", os.path.join("data", "ann", "candidates.npz"))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+ANN_MIN_TRAIN = int(os.getenv("ANN_MIN_TRAIN", "2000"))
+ANN_SAVE_EVERY = int(os.getenv("ANN_SAVE_EVERY", "200"))
+
+_KMEANS_ITERS = 10
+_KMEANS_SAMPLE = 20000
+_CHUNK = 8192
+
+
+def _kmeans(sample: np.ndarray) -> np.ndarray:
+    """Spherical k-means centroids (~sqrt(len(sample)) of them) for normalized rows."""
+    rng = np.random.default_rng(0)
+    nlist = max(1, int(np.sqrt(len(sample))))
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(_KMEANS_ITERS):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[labels == c]
+            centroids[c] = members.mean(axis=0) if len(members) else sample[rng.integers(len(sample))]
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32)
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    if v.ndim == 1:
+        n = float(np.linalg.norm(v))
+        return v / n if n > 0 else v
+    norms = np.linalg.norm(v, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return v / norms
+
+
+class IVFIndex:
+    """Inverted-file cosine index keyed by document id."""
+
+    def __init__(self, dim: int = 0):
+        self._lock = threading.RLock()
+        self._reset(dim)
+
+    def _reset(self, dim: int) -> None:
+        self.dim = dim
+        self._vecs = np.zeros((0, dim), dtype=np.float32)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: Dict[int, set] = {}
+        self._trained_on = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # --- building -------------------------------------------------------
+
+    def build(self, items: Iterable[Tuple[str, Sequence[float]]]) -> "IVFIndex":
+        with self._lock:
+            ids, vecs = [], []
+            for doc_id, vec in items:
+                if vec is not None and len(vec):
+                    ids.append(str(doc_id))
+                    vecs.append(vec)
+            if not ids:
+                self._reset(self.dim)
+                return self
+            matrix = _normalize(np.asarray(vecs, dtype=np.float32))
+            self.dim = matrix.shape[1]
+            self._vecs = matrix
+            self._size = len(ids)
+            self._ids = list(ids)
+            self._rows = {doc_id: i for i, doc_id in enumerate(ids)}
+            self._alive = np.ones(self._size, dtype=bool)
+            self._assign = np.full(self._size, -1, dtype=np.int32)
+            self._train()
+            return self
+
+    def _sample(self) -> Tuple[Optional[np.ndarray], int]:
+        """(k-means sample, live rows) under the lock; no sample below ANN_MIN_TRAIN rows."""
+        live = np.flatnonzero(self._alive[:self._size])
+        if len(live) < ANN_MIN_TRAIN:
+            return None, len(live)
+        rng = np.random.default_rng(0)
+        return self._vecs[rng.choice(live, size=min(len(live), _KMEANS_SAMPLE), replace=False)], len(live)
+
+    def _install(self, centroids: Optional[np.ndarray], trained_on: int) -> None:
+        """Assign every live row (including rows added while training) to the new centroids."""
+        self.centroids = centroids
+        self._lists = {}
+        self._assign[:self._size] = -1
+        self._trained_on = trained_on
+        if centroids is None:
+            return
+        live = np.flatnonzero(self._alive[:self._size])
+        for start in range(0, len(live), _CHUNK):
+            rows = live[start:start + _CHUNK]
+            self._assign[rows] = np.argmax(self._vecs[rows] @ centroids.T, axis=1)
+        for c in range(len(centroids)):
+            self._lists[c] = set(np.flatnonzero(self._assign[:self._size] == c).tolist())
+
+    def _train(self) -> None:
+        sample, live = self._sample()
+        self._install(_kmeans(sample) if sample is not None else None, live)
+
+    @property
+    def needs_training(self) -> bool:
+        """True once the index has grown well past what it was clustered on."""
+        return len(self) >= max(ANN_MIN_TRAIN, 4 * self._trained_on)
+
+    def retrain(self) -> None:
+        """Re-cluster without holding the lock during k-means; searches and upserts continue meanwhile."""
+        with self._lock:
+            sample, live = self._sample()
+        centroids = _kmeans(sample) if sample is not None else None
+        with self._lock:
+            self._install(centroids, live)
+
+    # --- incremental updates -------------------------------------------
+
+    def upsert(self, doc_id: str, vec: Optional[Sequence[float]]) -> None:
+        doc_id = str(doc_id)
+        if vec is None or not len(vec):
+            self.remove(doc_id)
+            return
+        v = _normalize(np.asarray(vec, dtype=np.float32))
+        with self._lock:
+            if not self.dim:
+                self.dim = len(v)
+                self._vecs = np.zeros((0, self.dim), dtype=np.float32)
+            if len(v) != self.dim:
+                return
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._append_row(doc_id)
+            else:
+                self._unlist(row)
+            self._vecs[row] = v
+            self._alive[row] = True
+            if self.centroids is not None:
+                c = int(np.argmax(self.centroids @ v))
+                self._assign[row] = c
+                self._lists.setdefault(c, set()).add(row)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            row = self._rows.pop(str(doc_id), None)
+            if row is None:
+                return
+            self._unlist(row)
+            self._alive[row] = False
+            self._ids[row] = None
+
+    def _unlist(self, row: int) -> None:
+        c = int(self._assign[row])
+        if c >= 0:
+            self._lists.get(c, set()).discard(row)
+            self._assign[row] = -1
+
+    def _append_row(self, doc_id: str) -> int:
+        if self._size == len(self._vecs):
+            cap = max(64, 2 * len(self._vecs))
+            self._vecs = np.vstack([self._vecs, np.zeros((cap - len(self._vecs), self.dim), dtype=np.float32)])
+            self._assign = np.concatenate([self._assign, np.full(cap - len(self._assign), -1, dtype=np.int32)])
+            self._alive = np.concatenate([self._alive, np.zeros(cap - len(self._alive), dtype=bool)])
+        row = self._size
+        self._size += 1
+        self._ids.append(doc_id)
+        self._rows[doc_id] = row
+        return row
+
+    # --- search ---------------------------------------------------------
+
+    def search(self, query: Sequence[float], k: int, nprobe: int = ANN_NPROBE) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, cosine) pairs, best first."""
+        q = _normalize(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            if not len(self) or len(q) != self.dim:
+                return []
+            if self.centroids is None:
+                rows = np.flatnonzero(self._alive[:self._size])
+            else:
+                probes = np.argsort(-(self.centroids @ q))[:max(1, nprobe)]
+                rows = np.fromiter((r for c in probes for r in self._lists.get(int(c), ())), dtype=np.int64)
+            if not len(rows):
+                return []
+            sims = self._vecs[rows] @ q
+            k = min(k, len(rows))
+            top = np.argpartition(-sims, k - 1)[:k]
+            top = top[np.argsort(-sims[top])]
+            return [(self._ids[rows[i]], float(sims[i])) for i in top]
+
+    # --- persistence ----------------------------------------------------
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            live = np.flatnonzero(self._alive[:self._size])
+            tmp = f"{path}.tmp.npz"
+            np.savez(
+                tmp,
+                ids=np.array([self._ids[r] for r in live], dtype=str),
+                vecs=self._vecs[live],
+                assign=self._assign[live],
+                centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), dtype=np.float32),
+                trained_on=np.array(self._trained_on),
+            )
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        data = np.load(path)
+        vecs = data["vecs"].astype(np.float32, copy=False)
+        idx = cls(vecs.shape[1] if vecs.ndim == 2 else 0)
+        idx._vecs = vecs
+        idx._size = len(vecs)
+        idx._ids = [str(i) for i in data["ids"]]
+        idx._rows = {doc_id: i for i, doc_id in enumerate(idx._ids)}
+        idx._alive = np.ones(idx._size, dtype=bool)
+        idx._assign = data["assign"].astype(np.int32)
+        idx._trained_on = int(data["trained_on"])
+        if len(data["centroids"]):
+            idx.centroids = data["centroids"]
+            for c in range(len(idx.centroids)):
+                idx._lists[c] = set(np.flatnonzero(idx._assign == c).tolist())
+        return idx
+
+
+class PersistentIndex:
+    """
+    Process-wide IVFIndex backed by a file. It is loaded (or built with
+    `loader`) on first search and reloaded when another process has saved a
+    newer file. Saves (every ANN_SAVE_EVERY updates and on close) hold an
+    flock on <path>.lock and first merge: if another process saved since this
+    one last loaded, its file is reloaded and this process's pending updates
+    are replayed on top, so no process's upserts are lost. Re-clustering runs
+    on a background thread instead of inside the upsert that triggered it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index: Optional[IVFIndex] = None
+        self._mtime = 0.0
+        self._pending: Dict[str, Optional[Sequence[float]]] = {}
+        self._retraining = False
+        self._lock = threading.Lock()
+
+    def _file_mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return 0.0
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.lock", "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load_from_disk(self) -> None:
+        """Load the saved index and replay the updates this process has not saved yet."""
+        self._mtime = self._file_mtime()
+        index = IVFIndex.load(self.path)
+        for doc_id, vec in self._pending.items():
+            index.upsert(doc_id, vec)
+        self._index = index
+
+    def get(self, loader: Callable[[], Iterable[Tuple[str, Sequence[float]]]]) -> IVFIndex:
+        with self._lock:
+            mtime = self._file_mtime()
+            if self._index is None or mtime > self._mtime:
+                if mtime:
+                    self._load_from_disk()
+                else:
+                    started = time.time()
+                    self._index = IVFIndex().build(loader())
+                    print(f"Built ANN index over {len(self._index)} vectors in {time.time() - started:.1f}s")
+                    self._save()
+            self._maybe_retrain()
+            return self._index
+
+    def upsert(self, doc_id: str, vec: Optional[Sequence[float]]) -> None:
+        with self._lock:
+            if self._index is None:
+                # Never built in this deployment: the first search builds it from the store
+                if not self._file_mtime():
+                    return
+                self._load_from_disk()
+            self._index.upsert(doc_id, vec)
+            self._pending[str(doc_id)] = vec
+            if len(self._pending) >= ANN_SAVE_EVERY:
+                self._save()
+            self._maybe_retrain()
+
+    def _save(self) -> None:
+        with self._file_lock():
+            if self._file_mtime() > self._mtime:
+                self._load_from_disk()
+            self._index.save(self.path)
+            self._mtime = self._file_mtime()
+            self._pending = {}
+
+    def _maybe_retrain(self) -> None:
+        if self._retraining or not self._index.needs_training:
+            return
+        self._retraining = True
+        threading.Thread(target=self._retrain, args=(self._index,), name="ann-retrain", daemon=True).start()
+
+    def _retrain(self, index: IVFIndex) -> None:
+        try:
+            started = time.time()
+            index.retrain()
+            print(f"Re-clustered ANN index over {len(index)} vectors in {time.time() - started:.1f}s")
+        except Exception as e:
+            print(f"ANN re-clustering failed: {e}")
+        finally:
+            with self._lock:
+                self._retraining = False
+
+    def close(self) -> None:
+        with self._lock:
+            if self._index is not None and self._pending:
+                self._save()
+
+
+candidate_index = PersistentIndex(ANN_INDEX_PATH)
@@ -0,0 +1,76 @@
+"""
+In-process tier of the embedding cache.
+
+VectorLRU keeps recently used vectors keyed by (model, text_sha) and is
+bounded by the bytes the vectors occupy rather than by entry count, so the
+memory ceiling holds regardless of embedding dimension. Vectors are held as
+read-only float32 arrays, the precision they are stored with.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+
+from app import metrics
+
+Key = Tuple[str, str]
+
+
+class VectorLRU:
+    """Thread-safe LRU of embedding vectors, capped at `max_bytes`."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items: "OrderedDict[Key, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get_many(self, model: str, shas: Iterable[str]) -> Dict[str, np.ndarray]:
+        """{text_sha: vector} for the shas held in memory; counts hits and misses."""
+        found: Dict[str, np.ndarray] = {}
+        misses = 0
+        with self._lock:
+            for sha in shas:
+                arr = self._items.get((model, sha))
+                if arr is None:
+                    misses += 1
+                    continue
+                self._items.move_to_end((model, sha))
+                found[sha] = arr
+        metrics.incr("emb_cache.lru.hits", len(found))
+        metrics.incr("emb_cache.lru.misses", misses)
+        return found
+
+    def put_many(self, model: str, vecs: Dict[str, Any]) -> None:
+        if self.max_bytes <= 0:
+            return
+        evicted = 0
+        with self._lock:
+            for sha, vec in vecs.items():
+                if vec is None:
+                    continue
+                arr = np.array(vec, dtype=np.float32)
+                arr.setflags(write=False)
+                if arr.nbytes > self.max_bytes:
+                    continue
+                old = self._items.pop((model, sha), None)
+                if old is not None:
+                    self.bytes -= old.nbytes
+                self._items[(model, sha)] = arr
+                self.bytes += arr.nbytes
+                while self.bytes > self.max_bytes:
+                    _, dropped = self._items.popitem(last=False)
+                    self.bytes -= dropped.nbytes
+                    evicted += 1
+        metrics.incr("emb_cache.lru.evictions", evicted)
+
+    def get(self, model: str, sha: str) -> Optional[np.ndarray]:
+        return self.get_many(model, [sha]).get(sha)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
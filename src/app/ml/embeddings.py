@@ -1,31 +1,174 @@
-import os, hashlib
-from typing import List, Optional, Dict, Any
+import os, hashlib, asyncio
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Tuple
 import numpy as np
-from pymongo import MongoClient
-from openai import OpenAI
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+from app import metrics
+from app.ml.emb_cache import VectorLRU
+from app.ml.vector_codec import encode, decode
+from hr_parser.clients import get_openai, get_async_openai, collection, async_collection
+from hr_parser.ratelimit import embeddings_limiter, embedding_tokens
 
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
 USE_EMBEDDINGS = os.getenv("USE_EMBEDDINGS", "true").lower() == "true"
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))  # inputs per embeddings request
+# In-process LRU in front of the Mongo cache, bounded by vector bytes
+EMB_LRU_MAX_BYTES = int(os.getenv("EMB_LRU_MAX_BYTES", str(64 * 1024 * 1024)))
+# Mongo tier eviction: expire vectors after N days and/or keep at most N docs (0 = off)
+EMB_CACHE_TTL_DAYS = float(os.getenv("EMB_CACHE_TTL_DAYS", "0"))
+EMB_CACHE_MAX_DOCS = int(os.getenv("EMB_CACHE_MAX_DOCS", "0"))
 
-_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
-_db = MongoClient(os.getenv("MONGODB_URI","mongodb://localhost:27017"))[os.getenv("DB_NAME","hyperrecruit")]
-_cache = _db["_emb_cache"]  # { model, text_sha, vec }
+_cache = collection("_emb_cache")  # { model, text_sha, vec (vector_codec Binary), created_at }
+_acache = async_collection("_emb_cache")
+_lru = VectorLRU(EMB_LRU_MAX_BYTES)
+# Inserts between size-cap checks on the Mongo tier
+_TRIM_EVERY = 500
+_inserted_since_trim = 0
 
 def _sha(s: str) -> str:
     import hashlib
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
-def get_embedding_cached(text: Optional[str]) -> Optional[List[float]]:
-    if not text or not USE_EMBEDDINGS or not _client:
-        return None
-    key = {"model": EMBED_MODEL, "text_sha": _sha(text)}
-    hit = _cache.find_one(key)
-    if hit: return hit["vec"]
-    resp = _client.embeddings.create(model=EMBED_MODEL, input=text[:7000])
-    vec = resp.data[0].embedding
-    _cache.insert_one({**key, "vec": vec})
-    return vec
+def _plan(texts: List[Optional[str]]) -> Dict[str, str]:
+    """Unique {text_sha: text} for the texts that should be embedded."""
+    return {_sha(t): t for t in texts if t}
+
+def _batches(items: List[Any]) -> List[List[Any]]:
+    return [items[i:i + EMBED_BATCH_SIZE] for i in range(0, len(items), EMBED_BATCH_SIZE)]
+
+def _vectors_by_sha(shas: List[str], resp) -> Dict[str, np.ndarray]:
+    # The API returns one item per input, tagged with its input index
+    return {shas[d.index]: decode(d.embedding) for d in resp.data}
+
+def _cache_docs(found: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return [{"model": EMBED_MODEL, "text_sha": sha, "vec": encode(vec), "created_at": now}
+            for sha, vec in found.items()]
+
+def _mongo_query(shas: List[str]) -> Dict[str, Any]:
+    return {"model": EMBED_MODEL, "text_sha": {"$in": shas}}
+
+def _from_memory(wanted: Dict[str, str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    vecs = _lru.get_many(EMBED_MODEL, wanted)
+    return vecs, [sha for sha in wanted if sha not in vecs]
+
+def _count_mongo(hits: Dict[str, np.ndarray], asked: List[str]) -> None:
+    metrics.incr("emb_cache.mongo.hits", len(hits))
+    metrics.incr("emb_cache.mongo.misses", len(asked) - len(hits))
+    _lru.put_many(EMBED_MODEL, hits)
+
+def _cached_fresh(fresh: Dict[str, np.ndarray]) -> None:
+    global _inserted_since_trim
+    metrics.incr("emb_cache.embedded", len(fresh))
+    _lru.put_many(EMBED_MODEL, fresh)
+    _inserted_since_trim += len(fresh)
+    if EMB_CACHE_MAX_DOCS > 0 and _inserted_since_trim >= _TRIM_EVERY:
+        _inserted_since_trim = 0
+        try:
+            trim_mongo_cache()
+        except Exception as e:
+            print(f"Embedding cache trim failed: {e}")
+
+def trim_mongo_cache(max_docs: int = EMB_CACHE_MAX_DOCS) -> int:
+    """Delete the oldest cached vectors beyond `max_docs`; returns how many were removed."""
+    if max_docs <= 0:
+        return 0
+    excess = _cache.estimated_document_count() - max_docs
+    if excess <= 0:
+        return 0
+    ids = [d["_id"] for d in _cache.find({}, {"_id": 1}).sort("created_at", ASCENDING).limit(excess)]
+    removed = _cache.delete_many({"_id": {"$in": ids}}).deleted_count if ids else 0
+    metrics.incr("emb_cache.mongo.evictions", removed)
+    return removed
+
+def cache_index_specs() -> List[Tuple[Any, list, Dict[str, Any]]]:
+    """Indexes for the Mongo tier, created by repository.ensure_indexes at startup."""
+    specs = [(_cache, [("model", ASCENDING), ("text_sha", ASCENDING)], {"unique": True})]
+    if EMB_CACHE_TTL_DAYS > 0:
+        specs.append((_cache, [("created_at", ASCENDING)],
+                      {"expireAfterSeconds": int(EMB_CACHE_TTL_DAYS * 86400)}))
+    elif EMB_CACHE_MAX_DOCS > 0:
+        specs.append((_cache, [("created_at", ASCENDING)], {}))
+    return specs
+
+def cache_stats() -> Dict[str, Any]:
+    return {"lru_entries": len(_lru), "lru_bytes": _lru.bytes, "lru_max_bytes": _lru.max_bytes}
+
+def get_embeddings_cached(texts: List[Optional[str]]) -> List[Optional[np.ndarray]]:
+    """
+    float32 embeddings for many texts, aligned with `texts` (None for empty texts).
+    Lookups go through the in-process LRU, then one `$in` query on the Mongo
+    tier; all misses go out in one multi-input embeddings request per
+    EMBED_BATCH_SIZE texts and are cached in both tiers.
+    """
+    client = get_openai()
+    if not USE_EMBEDDINGS or not client:
+        return [None] * len(texts)
+    wanted = _plan(texts)
+    if not wanted:
+        return [None] * len(texts)
+
+    vecs, missing = _from_memory(wanted)
+    if missing:
+        hits = {hit["text_sha"]: decode(hit["vec"]) for hit in _cache.find(
+            _mongo_query(missing), {"text_sha": 1, "vec": 1})}
+        _count_mongo(hits, missing)
+        vecs.update(hits)
+    misses = [sha for sha in wanted if sha not in vecs]
+    fresh: Dict[str, np.ndarray] = {}
+    for batch in _batches(misses):
+        inputs = [wanted[sha][:7000] for sha in batch]
+        resp = embeddings_limiter.call(lambda: client.embeddings.create(model=EMBED_MODEL, input=inputs),
+                                       embedding_tokens(inputs))
+        fresh.update(_vectors_by_sha(batch, resp))
+    if fresh:
+        try:
+            _cache.insert_many(_cache_docs(fresh), ordered=False)
+        except BulkWriteError:
+            pass  # another writer cached the same text first
+        _cached_fresh(fresh)
+        vecs.update(fresh)
+    return [vecs.get(_sha(t)) if t else None for t in texts]
+
+async def get_embeddings_cached_async(texts: List[Optional[str]]) -> List[Optional[np.ndarray]]:
+    """Non-blocking variant of get_embeddings_cached."""
+    client = get_async_openai()
+    if not USE_EMBEDDINGS or not client:
+        return [None] * len(texts)
+    wanted = _plan(texts)
+    if not wanted:
+        return [None] * len(texts)
+
+    vecs, missing = _from_memory(wanted)
+    if missing:
+        hits = {hit["text_sha"]: decode(hit["vec"]) async for hit in _acache.find(
+            _mongo_query(missing), {"text_sha": 1, "vec": 1})}
+        _count_mongo(hits, missing)
+        vecs.update(hits)
+    misses = [sha for sha in wanted if sha not in vecs]
+    fresh: Dict[str, np.ndarray] = {}
+    for batch in _batches(misses):
+        inputs = [wanted[sha][:7000] for sha in batch]
+        resp = await embeddings_limiter.call_async(
+            lambda: client.embeddings.create(model=EMBED_MODEL, input=inputs), embedding_tokens(inputs))
+        fresh.update(_vectors_by_sha(batch, resp))
+    if fresh:
+        try:
+            await _acache.insert_many(_cache_docs(fresh), ordered=False)
+        except BulkWriteError:
+            pass
+        # trimming is a sync call; keep it off the event loop
+        await asyncio.to_thread(_cached_fresh, fresh)
+        vecs.update(fresh)
+    return [vecs.get(_sha(t)) if t else None for t in texts]
+
+def get_embedding_cached(text: Optional[str]) -> Optional[np.ndarray]:
+    return get_embeddings_cached([text])[0]
+
+async def get_embedding_cached_async(text: Optional[str]) -> Optional[np.ndarray]:
+    """Non-blocking variant of get_embedding_cached."""
+    return (await get_embeddings_cached_async([text]))[0]
 
 def cosine(a: List[float], b: List[float]) -> float:
     va, vb = np.array(a), np.array(b)
@@ -43,7 +186,7 @@ class EmbeddingService:
             'candidate': 0.8
         }
     
-    def generate_skill_embedding(self, skills: List[Dict[str, Any]]) -> Optional[List[float]]:
+    def generate_skill_embedding(self, skills: List[Dict[str, Any]]) -> Optional[np.ndarray]:
         """Generate embedding for skills list."""
         if not skills:
             return None
@@ -68,14 +211,14 @@ class EmbeddingService:
         skill_text = ' '.join(weighted_skills)
         return get_embedding_cached(skill_text)
     
-    def generate_summary_embedding(self, summary: Optional[str]) -> Optional[List[float]]:
+    def generate_summary_embedding(self, summary: Optional[str]) -> Optional[np.ndarray]:
         """Generate embedding for summary text."""
         if not summary:
             return None
         
         return get_embedding_cached(summary)
     
-    def generate_jd_embedding(self, job_data: Dict[str, Any]) -> Optional[List[float]]:
+    def generate_jd_embedding(self, job_data: Dict[str, Any]) -> Optional[np.ndarray]:
         """Generate embedding for job description."""
         # Combine key job elements
         jd_text_parts = []
@@ -151,28 +294,53 @@ class EmbeddingService:
         
         return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
     
-    def store_embeddings(self, doc: Dict[str, Any], doc_type: str) -> Dict[str, Any]:
-        """Store embeddings in document."""
-        doc = doc.copy()
-        
+    def _embedding_texts(self, doc: Dict[str, Any], doc_type: str) -> Dict[str, Optional[str]]:
+        """Texts to embed per `emb` field, in the format used by store_embeddings."""
         if doc_type == 'resume':
-            # Generate embeddings for resume using the specified format
             skills_text = " ".join([s.get("name", "") for s in doc.get("skills", []) if s.get("name")])
             summary_text = (doc.get("summary") or "")
+            return {"skills_vec": skills_text or None, "summary_vec": summary_text}
+
+        if doc_type == 'job':
+            # Validated docs carry every schema key, with None where GPT found nothing
+            required_skills = doc.get("requirements", {}).get("required_skills") or []
+            preferred_skills = doc.get("requirements", {}).get("preferred_skills") or []
+            title_norm = doc.get("details", {}).get("title_norm") or ""
+            description = doc.get("description") or ""
+            return {
+                "skills_vec": " ".join(required_skills + preferred_skills),
+                "jd_vec": f'{title_norm} {description}',
+            }
+
+        return {}
+
+    def _attach(self, doc: Dict[str, Any], doc_type: str, vecs: Dict[str, Any]) -> Dict[str, Any]:
+        vecs = {field: encode(vec) for field, vec in vecs.items()}
+        if doc_type == 'resume':
             doc.setdefault("emb", {})
-            doc["emb"]["skills_vec"] = get_embedding_cached(skills_text) if skills_text else None
-            doc["emb"]["summary_vec"] = get_embedding_cached(summary_text)
-        
+            doc["emb"].update(vecs)
         elif doc_type == 'job':
-            # Generate embeddings for job description using the specified format
-            required_skills = doc.get("requirements", {}).get("required_skills", [])
-            preferred_skills = doc.get("requirements", {}).get("preferred_skills", [])
-            title_norm = doc.get("details", {}).get("title_norm", "")
-            description = doc.get("description", "")
-            
-            doc["emb"] = {
-                "skills_vec": get_embedding_cached(" ".join(required_skills + preferred_skills)),
-                "jd_vec": get_embedding_cached(f'{title_norm} {description}')
-            }
-        
+            doc["emb"] = vecs
         return doc
+
+    def store_embeddings(self, doc: Dict[str, Any], doc_type: str) -> Dict[str, Any]:
+        """Store embeddings in document."""
+        return self.store_embeddings_many([doc], doc_type)[0]
+
+    def store_embeddings_many(self, docs: List[Dict[str, Any]], doc_type: str) -> List[Dict[str, Any]]:
+        """
+        Store embeddings in many documents with one batched cache lookup and
+        embeddings request. `emb` is attached in place: the documents are the
+        validated dicts the services own, so they are not copied.
+        """
+        texts = [self._embedding_texts(doc, doc_type) for doc in docs]
+        flat = [text for t in texts for text in t.values()]
+        vecs = iter(get_embeddings_cached(flat))
+        return [self._attach(doc, doc_type, {field: next(vecs) for field in t})
+                for doc, t in zip(docs, texts)]
+
+    async def store_embeddings_async(self, doc: Dict[str, Any], doc_type: str) -> Dict[str, Any]:
+        """Non-blocking variant of store_embeddings."""
+        texts = self._embedding_texts(doc, doc_type)
+        vecs = await get_embeddings_cached_async(list(texts.values()))
+        return self._attach(doc, doc_type, dict(zip(texts.keys(), vecs)))
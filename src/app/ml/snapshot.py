@@ -0,0 +1,288 @@
+"""
+Memory-mapped embedding snapshots for scoring.
+
+Each snapshot is a generation of two files plus a manifest in EMB_SNAPSHOT_DIR:
+  - <name>-<gen>.npy : float32 (rows, dim) matrix of L2-normalized vectors,
+                       with a fixed 128-byte .npy header so rows can be
+                       appended in place and the row count rewritten
+  - <name>-<gen>.ids : one document id per row, append-only
+  - <name>.json      : {"gen": n}, replaced atomically on compaction
+
+Scoring processes open the matrix with np.load(mmap_mode="r"), so attaching
+costs a header read and pages are shared through the OS cache. Writes append
+a row per changed document (a NaN row drops a document that lost its vector);
+the newest row for an id wins. Once stale rows exceed
+EMB_SNAPSHOT_COMPACT_RATIO of the file, the live rows are copied into a new
+generation. Appends and compaction hold an flock on <name>.lock.
+"""
+import json, os, struct, threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+EMB_SNAPSHOT_DIR = os.getenv("EMB_SNAPSHOT_DIR", os.path.join("data", "snapshot"))
+EMB_SNAPSHOT_COMPACT_RATIO = float(os.getenv("EMB_SNAPSHOT_COMPACT_RATIO", "0.3"))
+
+_HEADER_BYTES = 128
+_MIN_COMPACT_ROWS = 1000
+_CHUNK = 4096
+
+
+def _header(rows: int, dim: int) -> bytes:
+    body = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (rows, dim)
+    size = _HEADER_BYTES - 10
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", size) + (body.ljust(size - 1) + "\n").encode("latin1")
+
+
+def _read_shape(path: str) -> Tuple[int, int]:
+    with open(path, "rb") as f:
+        head = f.read(_HEADER_BYTES).decode("latin1")
+    rows, dim = head.split("'shape': (", 1)[1].split(")", 1)[0].split(",")
+    return int(rows), int(dim)
+
+
+def _normalized(vec: Sequence[float]) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+
+class EmbeddingSnapshot:
+    """One named snapshot (e.g. all candidate vectors)."""
+
+    def __init__(self, directory: str, name: str):
+        self.directory = directory
+        self.name = name
+        self._lock = threading.RLock()
+        self._reset(None)
+
+    def _reset(self, gen: Optional[int]) -> None:
+        self._gen = gen
+        self.dim = 0
+        self._rows = 0
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._ids_offset = 0
+        self._mm: Optional[np.ndarray] = None
+
+    # --- paths ----------------------------------------------------------
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self.name}{suffix}")
+
+    def _data_path(self, gen: int) -> str:
+        return self._path(f"-{gen}.npy")
+
+    def _ids_path(self, gen: int) -> str:
+        return self._path(f"-{gen}.ids")
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- reading --------------------------------------------------------
+
+    def _manifest_gen(self) -> Optional[int]:
+        try:
+            with open(self._path(".json")) as f:
+                return int(json.load(f)["gen"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _sync(self) -> bool:
+        """
+        Catch up with the files on disk; False if the snapshot does not exist
+        or cannot be read, in which case callers score without it.
+        """
+        error: Optional[Exception] = None
+        for _ in range(2):
+            gen = self._manifest_gen()
+            if gen is None:
+                self._reset(None)
+                return False
+            try:
+                self._sync_gen(gen)
+                return True
+            except (FileNotFoundError, ValueError) as e:
+                # Another process compacted `gen` away between reading the
+                # manifest and opening its files; resolve the new one once
+                self._reset(None)
+                error = e
+        print(f"Embedding snapshot {self.name} unreadable, scoring without it: {error}")
+        return False
+
+    def _sync_gen(self, gen: int) -> None:
+        if gen != self._gen:
+            self._reset(gen)
+        rows, self.dim = _read_shape(self._data_path(gen))
+        if rows > self._rows:
+            with open(self._ids_path(gen), "rb") as f:
+                f.seek(self._ids_offset)
+                for line in f:
+                    if len(self._ids) >= rows:
+                        break
+                    doc_id = line.decode().rstrip("\n")
+                    self._row_of[doc_id] = len(self._ids)
+                    self._ids.append(doc_id)
+                    self._ids_offset += len(line)
+            self._rows = rows
+            self._mm = None
+        if self._mm is None and self._rows:
+            self._mm = np.load(self._data_path(gen), mmap_mode="r")
+
+    def exists(self) -> bool:
+        with self._lock:
+            return self._sync()
+
+    def attach(self, loader: Callable[[], Iterable[Tuple[str, Optional[Sequence[float]]]]]) -> "EmbeddingSnapshot":
+        """Open the snapshot, building it with `loader` first if it does not exist yet."""
+        with self._lock:
+            if self._sync():
+                return self
+            with self._file_lock():
+                # Only build when there is no snapshot at all, not when it is unreadable
+                if not self._sync() and self._manifest_gen() is None:
+                    self._write_generation(1, loader())
+                    self._sync()
+            return self
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def semantic_scores(self, doc_ids: Sequence[str], query: Optional[Sequence[float]]) -> List[Optional[float]]:
+        """
+        0..1 semantic score per id (same scale as compute_base_and_semantic),
+        None for ids the snapshot has no vector for.
+        """
+        out: List[Optional[float]] = [None] * len(doc_ids)
+        with self._lock:
+            if not self._sync() or not self._rows or query is None or len(query) != self.dim:
+                return out
+            hits = [(i, self._row_of.get(str(d))) for i, d in enumerate(doc_ids)]
+            hits = [(i, r) for i, r in hits if r is not None]
+            if not hits:
+                return out
+            rows = np.fromiter((r for _, r in hits), dtype=np.int64, count=len(hits))
+            q = _normalized(query)
+            sims = np.empty(len(rows), dtype=np.float32)
+            for start in range(0, len(rows), _CHUNK):
+                sims[start:start + _CHUNK] = self._mm[rows[start:start + _CHUNK]] @ q
+            sims = (sims + 1.0) / 2.0
+        for (i, _), s in zip(hits, sims.tolist()):
+            if s == s:  # NaN rows are dropped documents
+                out[i] = s
+        return out
+
+    def items(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """(doc_id, vector) for every live row."""
+        with self._lock:
+            if not self._sync():
+                return iter(())
+            live = sorted(self._row_of.items(), key=lambda kv: kv[1])
+            mm = self._mm
+        return ((doc_id, mm[row]) for doc_id, row in live if not np.isnan(mm[row, 0]))
+
+    # --- writing --------------------------------------------------------
+
+    def _write_generation(self, gen: int, items: Iterable[Tuple[str, Optional[Sequence[float]]]]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        dim, rows = self.dim, 0
+        with open(self._data_path(gen), "wb") as data, open(self._ids_path(gen), "wb") as ids:
+            data.write(_header(0, dim))
+            block: List[np.ndarray] = []
+            for doc_id, vec in items:
+                if vec is None or not len(vec):
+                    continue
+                dim = dim or len(vec)
+                if len(vec) != dim:
+                    continue
+                block.append(_normalized(vec))
+                ids.write(f"{doc_id}\n".encode())
+                if len(block) >= _CHUNK:
+                    data.write(np.stack(block).tobytes())
+                    rows += len(block)
+                    block = []
+            if block:
+                data.write(np.stack(block).tobytes())
+                rows += len(block)
+            data.seek(0)
+            data.write(_header(rows, dim))
+        tmp = self._path(".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"gen": gen}, f)
+        os.replace(tmp, self._path(".json"))
+
+    def upsert_many(self, items: Sequence[Tuple[str, Optional[Sequence[float]]]]) -> None:
+        """
+        Append the current vector of each (doc_id, vector); None (or a vector of
+        another dimension) drops the doc. A no-op until the snapshot is built.
+        """
+        with self._lock, self._file_lock():
+            if not self._sync():
+                return
+            new_ids, block = [], []
+            for doc_id, vec in items:
+                doc_id = str(doc_id)
+                if vec is not None and len(vec) and (not self.dim or len(vec) == self.dim):
+                    self.dim = self.dim or len(vec)
+                    block.append(_normalized(vec))
+                elif doc_id in self._row_of:
+                    block.append(np.full(self.dim, np.nan, dtype=np.float32))
+                else:
+                    continue
+                new_ids.append(doc_id)
+            if not block:
+                return
+
+            gen = self._gen
+            with open(self._data_path(gen), "r+b") as data:
+                data.seek(_HEADER_BYTES + self._rows * self.dim * 4)
+                data.write(np.stack(block).tobytes())
+                data.truncate()
+                with open(self._ids_path(gen), "r+b") as ids:
+                    ids.truncate(self._ids_offset)
+                    ids.seek(self._ids_offset)
+                    ids.write("".join(f"{d}\n" for d in new_ids).encode())
+                # The header row count is the commit point for readers
+                data.seek(0)
+                data.write(_header(self._rows + len(block), self.dim))
+            self._sync()
+
+            stale = self._rows - len(self._row_of)
+            if self._rows >= _MIN_COMPACT_ROWS and stale > EMB_SNAPSHOT_COMPACT_RATIO * self._rows:
+                self._compact()
+
+    def upsert(self, doc_id: str, vec: Optional[Sequence[float]]) -> None:
+        self.upsert_many([(doc_id, vec)])
+
+    def _compact(self) -> None:
+        """Copy live rows into the next generation and drop the old files."""
+        old = self._gen
+        live = sorted(self._row_of.items(), key=lambda kv: kv[1])
+        mm = self._mm
+        self._write_generation(old + 1, ((d, mm[r]) for d, r in live if not np.isnan(mm[r, 0])))
+        self._reset(None)
+        self._sync()
+        for path in (self._data_path(old), self._ids_path(old)):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        print(f"Compacted embedding snapshot {self.name}: {len(self)} live rows")
+
+
+candidate_snapshot = EmbeddingSnapshot(EMB_SNAPSHOT_DIR, "candidates")
+job_snapshot = EmbeddingSnapshot(EMB_SNAPSHOT_DIR, "jobs")
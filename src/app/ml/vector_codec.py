@@ -0,0 +1,80 @@
+"""
+Binary storage format for embedding vectors.
+
+Vectors are written as BSON Binary instead of arrays of doubles:
+  - float32 : subtype 9 (BSON vector), header [0x27, 0x00], little-endian float32 data
+  - int8    : subtype 0x80, header [0x03, 0x00], float32 scale, int8 data (value = q * scale)
+
+A 1536-dim embedding takes ~6 KB as float32 and ~1.5 KB as int8 instead of
+~14 KB as a BSON array. `decode` reads the bytes in place with np.frombuffer
+(no per-component Python floats) and still accepts legacy list vectors, so
+old and migrated documents can be mixed. EMB_STORAGE_FORMAT picks the format
+for new writes: float32 (default), int8, or array for the legacy layout.
+"""
+import os
+from typing import Any, Optional
+import numpy as np
+from bson.binary import Binary
+
+EMB_STORAGE_FORMAT = os.getenv("EMB_STORAGE_FORMAT", "float32").lower()
+
+VECTOR_SUBTYPE = 9
+SCALED_INT8_SUBTYPE = 0x80
+DTYPE_FLOAT32 = 0x27
+DTYPE_INT8 = 0x03
+
+_F32 = np.dtype("<f4")
+
+
+def encode(vec: Any, fmt: str = EMB_STORAGE_FORMAT) -> Any:
+    """Storage value for one vector in `fmt` (None stays None)."""
+    if vec is None:
+        return None
+    if fmt == "array":
+        return np.asarray(vec, dtype=np.float64).tolist()
+    arr = np.asarray(vec, dtype=_F32)
+    if fmt == "int8":
+        peak = float(np.max(np.abs(arr))) if arr.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        q = np.clip(np.rint(arr / scale), -127, 127).astype(np.int8)
+        header = bytes([DTYPE_INT8, 0]) + np.array([scale], dtype=_F32).tobytes()
+        return Binary(header + q.tobytes(), SCALED_INT8_SUBTYPE)
+    if fmt != "float32":
+        raise ValueError(f"Unknown embedding storage format: {fmt}")
+    return Binary(bytes([DTYPE_FLOAT32, 0]) + arr.tobytes(), VECTOR_SUBTYPE)
+
+
+def decode(value: Any) -> Optional[np.ndarray]:
+    """
+    float32 vector for a stored value (Binary or legacy list), or None if it
+    is missing or empty. float32 payloads are read-only views over the BSON bytes.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        buf = memoryview(value)
+        if len(buf) < 2:
+            return None
+        dtype = buf[0]
+        if dtype == DTYPE_FLOAT32:
+            arr = np.frombuffer(buf, dtype=_F32, offset=2)
+        elif dtype == DTYPE_INT8 and getattr(value, "subtype", None) == SCALED_INT8_SUBTYPE:
+            scale = np.frombuffer(buf, dtype=_F32, count=1, offset=2)[0]
+            arr = np.frombuffer(buf, dtype=np.int8, offset=6).astype(np.float32) * scale
+        elif dtype == DTYPE_INT8:
+            arr = np.frombuffer(buf, dtype=np.int8, offset=2).astype(np.float32)
+        else:
+            raise ValueError(f"Unsupported vector dtype byte: {dtype:#x}")
+        return arr if arr.size else None
+    arr = np.asarray(value, dtype=np.float32)
+    return arr if arr.size else None
+
+
+def is_encoded(value: Any, fmt: str = EMB_STORAGE_FORMAT) -> bool:
+    """True if `value` is already stored in `fmt`."""
+    if fmt == "array":
+        return isinstance(value, list)
+    if not isinstance(value, Binary):
+        return False
+    wanted = SCALED_INT8_SUBTYPE if fmt == "int8" else VECTOR_SUBTYPE
+    return value.subtype == wanted
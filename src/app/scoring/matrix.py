@@ -0,0 +1,74 @@
+"""
+Vectorized semantic scoring.
+
+Stacks the scoring vectors of many documents into one pre-normalized float32
+matrix so the semantic component for a whole pool is a single matrix-vector
+product instead of one `cosine` call (two array builds + two norms) per pair.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+
+class EmbeddingMatrix:
+    """Row-normalized float32 matrix over the vectors of `docs` (positions map back to docs)."""
+
+    def __init__(self, positions: List[int], matrix: np.ndarray):
+        self.positions = positions
+        self.matrix = matrix
+        self.dim = matrix.shape[1] if matrix.ndim == 2 else 0
+
+    @classmethod
+    def from_docs(cls, docs: Sequence[Dict[str, Any]],
+                  vec_of: Callable[[Dict[str, Any]], Optional[Sequence[float]]]) -> "EmbeddingMatrix":
+        vecs = [(i, vec_of(d)) for i, d in enumerate(docs)]
+        vecs = [(i, v) for i, v in vecs if _has_vec(v)]
+        if not vecs:
+            return cls([], np.zeros((0, 0), dtype=np.float32))
+
+        # Stack the dominant dimension; odd-sized vectors fall back to per-pair cosine
+        dims: Dict[int, int] = {}
+        for _, v in vecs:
+            dims[len(v)] = dims.get(len(v), 0) + 1
+        dim = max(dims, key=dims.get)
+        vecs = [(i, v) for i, v in vecs if len(v) == dim]
+
+        matrix = np.stack([np.asarray(v, dtype=np.float32) for _, v in vecs])
+        return cls([i for i, _ in vecs], _normalize_rows(matrix))
+
+    def semantic_scores(self, query: Sequence[float]) -> Dict[int, float]:
+        """
+        {doc position: semantic score in 0..1} for every stacked row, matching
+        `(cosine(row, query) + 1) / 2` as computed by compute_base_and_semantic.
+        """
+        if not self.positions or query is None or len(query) != self.dim:
+            return {}
+        q = np.asarray(query, dtype=np.float32)
+        norm = float(np.linalg.norm(q))
+        if norm > 0:
+            q = q / norm
+        sims = (self.matrix @ q + 1.0) / 2.0
+        return {pos: float(s) for pos, s in zip(self.positions, sims.tolist())}
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def semantic_for_pool(docs: Sequence[Dict[str, Any]], vec_of: Callable,
+                      query: Optional[Sequence[float]]) -> List[Optional[float]]:
+    """
+    Semantic score per doc for one query vector, aligned with `docs`:
+      - 0.0 where either side has no vector (same as the per-pair path)
+      - None where the doc could not be stacked, so the caller computes it per pair
+    """
+    if query is None or not len(query):
+        return [0.0] * len(docs)
+    scores = EmbeddingMatrix.from_docs(docs, vec_of).semantic_scores(query)
+    return [scores[i] if i in scores else (None if _has_vec(vec_of(d)) else 0.0)
+            for i, d in enumerate(docs)]
+
+
+def _has_vec(v: Optional[Sequence[float]]) -> bool:
+    return v is not None and len(v) > 0
@@ -1,28 +1,102 @@
 import time, os
-from typing import Union
+from typing import Union, Dict, Any, List
 from bson import ObjectId
-from pymongo import MongoClient
-from app.scoring.score import compute_base_and_semantic
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.scoring.score import compute_base_and_semantic, candidate_vec, job_vec
+from app.scoring.matrix import semantic_for_pool
+from app.ml.ann import candidate_index
+from app.ml.snapshot import candidate_snapshot, job_snapshot
+from hr_parser.clients import database
 
-client = MongoClient(os.getenv("MONGODB_URI","mongodb://localhost:27017"))
-db = client[os.getenv("DB_NAME","hyperrecruit")]
+db = database()
+
+SCORE_WRITE_BATCH_SIZE = int(os.getenv("SCORE_WRITE_BATCH_SIZE", "500"))
 
 def _oid(x: Union[str, ObjectId]) -> ObjectId:
     return x if isinstance(x, ObjectId) else ObjectId(str(x))
 
+class ScoreWriter:
+    """
+    Buffers score upserts and writes them as unordered bulk_write batches.
+    `written` counts pairs actually stored; failed pairs are reported one by one.
+    """
+
+    def __init__(self, batch_size: int = SCORE_WRITE_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self._ops: List[UpdateOne] = []
+        self._keys: List[Dict[str, str]] = []
+
+    def add(self, key: Dict[str, str], res: Dict[str, Any]) -> None:
+        self._ops.append(UpdateOne(key, {"$set": {
+            **key, **res, "version":"v1.0", "scored_at": time.time()
+        }}, upsert=True))
+        self._keys.append(key)
+        if len(self._ops) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._ops:
+            return
+        ops, keys = self._ops, self._keys
+        self._ops, self._keys = [], []
+        try:
+            db.scores.bulk_write(ops, ordered=False)
+            self.written += len(ops)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            for err in errors:
+                k = keys[err["index"]]
+                print(f"Error saving score for candidate {k['candidate_id']} / job {k['job_id']}: {err.get('errmsg')}")
+            self.written += len(ops) - len(errors)
+        except Exception as e:
+            for k in keys:
+                print(f"Error saving score for candidate {k['candidate_id']} / job {k['job_id']}: {e}")
+
+def _job_vectors():
+    for j in db.jobs_canonical.find({}, {"emb": 1}):
+        yield str(j["_id"]), job_vec(j)
+
+def _candidate_vectors():
+    """(candidate_id, scoring vector) for every stored resume; builds the candidate snapshot."""
+    for c in db.resumes_canonical.find({}, {"emb": 1}):
+        yield str(c["_id"]), candidate_vec(c)
+
+def _pool_semantic(col, docs, snapshot, vec_of, query) -> List[Any]:
+    """
+    Semantic score per doc of a pool loaded without `emb`. Vectors come from the
+    memory-mapped snapshot; docs it does not cover get their `emb` fetched in
+    one query and go through semantic_for_pool (None = score per pair).
+    """
+    if query is None:
+        return [0.0] * len(docs)
+    semantic = snapshot.semantic_scores([str(d["_id"]) for d in docs], query)
+    missing = [i for i, s in enumerate(semantic) if s is None]
+    if missing:
+        embs = {d["_id"]: d.get("emb") for d in col.find(
+            {"_id": {"$in": [docs[i]["_id"] for i in missing]}}, {"emb": 1})}
+        for i in missing:
+            docs[i]["emb"] = embs.get(docs[i]["_id"]) or {}
+        rest = semantic_for_pool([docs[i] for i in missing], vec_of, query)
+        for i, s in zip(missing, rest):
+            semantic[i] = s
+    return semantic
+
 def score_candidate_against_open_jobs(candidate_id):
     c = db.resumes_canonical.find_one({"_id": _oid(candidate_id)})
     if not c: return 0
-    cnt = 0
+    writer = ScoreWriter()
     # Score against all jobs (remove status filter since we don't have that field)
-    for j in db.jobs_canonical.find({}):
-        res = compute_base_and_semantic(c, j)
+    jobs = list(db.jobs_canonical.find({}, {"emb": 0}))
+    snapshot = job_snapshot.attach(_job_vectors)
+    semantic = _pool_semantic(db.jobs_canonical, jobs, snapshot, job_vec, candidate_vec(c))
+    for j, sem in zip(jobs, semantic):
+        res = compute_base_and_semantic(c, j, semantic=sem)
         key = {"job_id": str(j["_id"]), "candidate_id": str(c["_id"])}
-        db.scores.update_one(key, {"$set": {
-            **key, **res, "version":"v1.0", "scored_at": time.time()
-        }}, upsert=True)
-        cnt += 1
-    return cnt
+        writer.add(key, res)
+    writer.flush()
+    return writer.written
 
 def score_job_against_all_candidates(job_id):
     try:
@@ -32,24 +106,55 @@ def score_job_against_all_candidates(job_id):
             return 0
         
         print(f"Scoring job {job_id} against all candidates...")
-        cnt = 0
-        for c in db.resumes_canonical.find({}):
+        writer = ScoreWriter()
+        candidates = list(db.resumes_canonical.find({}, {"emb": 0}))
+        # All semantic scores for the job from the memory-mapped snapshot
+        snapshot = candidate_snapshot.attach(_candidate_vectors)
+        semantic = _pool_semantic(db.resumes_canonical, candidates, snapshot, candidate_vec, job_vec(j))
+        for c, sem in zip(candidates, semantic):
             try:
-                res = compute_base_and_semantic(c, j)
+                res = compute_base_and_semantic(c, j, semantic=sem)
                 key = {"job_id": str(j["_id"]), "candidate_id": str(c["_id"])}
-                db.scores.update_one(key, {"$set": {
-                    **key, **res, "version":"v1.0", "scored_at": time.time()
-                }}, upsert=True)
-                cnt += 1
+                writer.add(key, res)
             except Exception as e:
                 print(f"Error scoring candidate {c.get('_id')}: {e}")
                 # Continue with next candidate instead of failing completely
                 continue
         
+        writer.flush()
+        cnt = writer.written
         print(f"Scored {cnt} candidates successfully")
         return cnt
     except Exception as e:
         print(f"Fatal error in score_job_against_all_candidates: {e}")
         import traceback
         traceback.print_exc()
-        raise
\ No newline at end of file
+        raise
+
+def _snapshot_candidate_vectors():
+    """Candidate vectors for the ANN index build, read from the snapshot."""
+    return candidate_snapshot.attach(_candidate_vectors).items()
+
+def top_candidates_for_job(job_id, k: int = 20, pool: int = 300) -> List[Dict[str, Any]]:
+    """
+    Retrieve the `pool` nearest candidates to the job from the ANN index and
+    rerank them with compute_base_and_semantic. Returns the best `k`, best first.
+    Candidates without embeddings are never retrieved by this path.
+    """
+    j = db.jobs_canonical.find_one({"_id": _oid(job_id)})
+    if not j:
+        raise LookupError(f"Job not found: {job_id}")
+    jvec = job_vec(j)
+    if jvec is None:
+        raise ValueError(f"Job {job_id} has no embedding")
+
+    hits = candidate_index.get(_snapshot_candidate_vectors).search(jvec, max(k, pool))
+    sims = {cid: sim for cid, sim in hits}
+    ranked = []
+    for c in db.resumes_canonical.find({"_id": {"$in": [_oid(cid) for cid in sims]}}):
+        cid = str(c["_id"])
+        res = compute_base_and_semantic(c, j, semantic=(sims[cid] + 1) / 2.0)
+        ranked.append({"candidate_id": cid, **res})
+    ranked.sort(key=lambda r: r["final_score"], reverse=True)
+    return ranked[:k]
+
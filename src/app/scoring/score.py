@@ -1,7 +1,30 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import numpy as np
 from app.ml.embeddings import cosine
+from app.ml.vector_codec import decode
 
-def compute_base_and_semantic(c: Dict[str,Any], j: Dict[str,Any]) -> Dict[str,Any]:
+def _first_vec(doc: Dict[str,Any], *fields: str) -> Optional[np.ndarray]:
+    emb = doc.get("emb") or {}
+    for field in fields:
+        vec = decode(emb.get(field))
+        if vec is not None:
+            return vec
+    return None
+
+def candidate_vec(c: Dict[str,Any]) -> Optional[np.ndarray]:
+    """Resume vector used for semantic scoring: summary_vec, falling back to skills_vec."""
+    return _first_vec(c, "summary_vec", "skills_vec")
+
+def job_vec(j: Dict[str,Any]) -> Optional[np.ndarray]:
+    """JD vector used for semantic scoring: jd_vec, falling back to skills_vec."""
+    return _first_vec(j, "jd_vec", "skills_vec")
+
+def compute_base_and_semantic(c: Dict[str,Any], j: Dict[str,Any],
+                              semantic: Optional[float] = None) -> Dict[str,Any]:
+    """
+    Score one candidate/job pair. `semantic` is a precomputed 0..1 similarity
+    (see app.scoring.matrix); when None it is computed from the stored vectors.
+    """
     from app.scoring.rules import skill_overlap, experience_fit, education_fit, location_fit
 
     # --- Candidate fields ---
@@ -61,10 +84,13 @@ def compute_base_and_semantic(c: Dict[str,Any], j: Dict[str,Any]) -> Dict[str,An
     s_sem    = 0.0
 
     # semantic: resume summary_vec/skills_vec vs JD jd_vec/skills_vec
-    cvec = ((c.get("emb") or {}).get("summary_vec")) or ((c.get("emb") or {}).get("skills_vec"))
-    jvec = ((j.get("emb") or {}).get("jd_vec")) or ((j.get("emb") or {}).get("skills_vec"))
-    if cvec and jvec:
-        s_sem = (cosine(cvec, jvec) + 1) / 2.0  # -1..1 → 0..1
+    if semantic is not None:
+        s_sem = semantic
+    else:
+        cvec = candidate_vec(c)
+        jvec = job_vec(j)
+        if cvec is not None and jvec is not None:
+            s_sem = (cosine(cvec, jvec) + 1) / 2.0  # -1..1 → 0..1
 
     # Weights: 90% skills, 10% AI similarity
     final = (0.9*s_skills + 0.1*s_sem) * 100.0
@@ -1,4 +1,13 @@
-from .service import HRResumeParserService
-from .router import router as hr_parser_router
-
 __all__ = ["HRResumeParserService", "hr_parser_router"]
+
+
+def __getattr__(name):
+    # Resolved on first use so that light submodules (config, clients) can be
+    # imported without pulling in the service and router stack.
+    if name == "HRResumeParserService":
+        from .service import HRResumeParserService
+        return HRResumeParserService
+    if name == "hr_parser_router":
+        from .router import router
+        return router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
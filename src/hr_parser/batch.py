@@ -0,0 +1,269 @@
+# hr_parser/batch.py
+"""
+Offline batch mode for mass re-ingestion.
+
+Backfills should not compete with interactive uploads for chat rate limits,
+so a BatchRun writes one chat-completion request per document to JSONL files,
+submits them through the OpenAI Batch API, and later feeds the responses
+through the same post-processing, validation, embedding and upsert steps as
+the live path. Every step checkpoints into a work directory, so a run can be
+stopped and resumed at any point:
+
+  - state.json        : {kind, prompt_version, parser_version, batches: [...]}
+  - items.jsonl       : per request {custom_id, filename, mime, file_sha, text_sha, hash_sha256}
+  - requests-<n>.jsonl: the batch input files (HRP_BATCH_MAX_REQUESTS lines each)
+  - results.jsonl     : per stored request {custom_id, ok, ...}; collected ids are skipped on resume
+
+The client only needs the async `files.create/content` and
+`batches.create/retrieve` calls, so tests can pass a local stand-in.
+Documents go through the single-prompt path (no section split); batch
+latency is bounded by the completion window anyway.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .bulk import extract_bytes
+from .clients import get_async_openai
+from .config import PARSER_VERSION, BULK_STORE_BATCH, BATCH_MAX_REQUESTS, BATCH_POLL_SECONDS
+from .identity import text_fingerprint
+
+ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def _parser(kind: str):
+    """(gpt client module, service) for a document kind."""
+    if kind == "resume":
+        from . import gpt_client
+        from .service import HRResumeParserService
+        return gpt_client, HRResumeParserService()
+    if kind == "job":
+        from . import job_gpt_client
+        from .job_service import HRJobParserService
+        return job_gpt_client, HRJobParserService()
+    raise ValueError(f"Unknown batch kind: {kind}")
+
+
+def _read_jsonl(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _append_jsonl(path: str, rows: Iterable[Dict[str, Any]]) -> None:
+    with open(path, "a") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+class BatchRun:
+    """One checkpointed batch re-ingestion in `workdir`."""
+
+    def __init__(self, workdir: str, kind: str = "resume", client: Any = None):
+        self.workdir = workdir
+        self.kind = kind
+        self._client = client
+        self.gpt, self.service = _parser(kind)
+        os.makedirs(workdir, exist_ok=True)
+        self.state = self._load_state()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_async_openai()
+            if self._client is None:
+                raise RuntimeError("OPENAI_API_KEY is required for batch submission")
+        return self._client
+
+    # --- checkpoint files ---------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.workdir, name)
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self._path("state.json")) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {"kind": self.kind, "prompt_version": self.gpt.PROMPT_VERSION,
+                    "parser_version": PARSER_VERSION, "created_at": time.time(), "batches": []}
+        if state["kind"] != self.kind:
+            raise ValueError(f"{self.workdir} holds a {state['kind']} batch run, not {self.kind}")
+        if state["prompt_version"] != self.gpt.PROMPT_VERSION:
+            print(f"Warning: batch run {self.workdir} was prepared with prompt {state['prompt_version']}, "
+                  f"current prompt is {self.gpt.PROMPT_VERSION}")
+        return state
+
+    def _save_state(self) -> None:
+        tmp = self._path("state.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self._path("state.json"))
+
+    def _collected(self) -> set:
+        return {row["custom_id"] for row in _read_jsonl(self._path("results.jsonl"))}
+
+    # --- prepare --------------------------------------------------------------
+
+    def prepare(self, files: Iterable[Tuple[bytes, str]]) -> int:
+        """
+        Extract and compact each (data, filename) and write its request line.
+        Files already ingested (same bytes, or same text for resumes) are
+        skipped. Returns the number of requests written.
+        """
+        if self.state["batches"]:
+            raise RuntimeError(f"{self.workdir} is already prepared")
+        items, requests = [], []
+        for data, filename in files:
+            file_sha = hashlib.sha256(data).hexdigest()
+            if self.service.cached_result(file_sha) is not None:
+                continue
+            text, mime = extract_bytes(data, filename)
+            if self.service.known_result(text, file_sha) is not None:
+                continue
+            body, hash_sha256 = self.gpt.prepare_request(text)
+            custom_id = f"{self.kind}-{len(items)}-{file_sha[:16]}"
+            items.append({"custom_id": custom_id, "filename": filename, "mime": mime, "file_sha": file_sha,
+                          "text_sha": text_fingerprint(text), "hash_sha256": hash_sha256})
+            requests.append({"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body})
+
+        _append_jsonl(self._path("items.jsonl"), items)
+        for n, start in enumerate(range(0, len(requests), BATCH_MAX_REQUESTS)):
+            name = f"requests-{n}.jsonl"
+            _append_jsonl(self._path(name), requests[start:start + BATCH_MAX_REQUESTS])
+            self.state["batches"].append({"input": name, "id": None, "status": "prepared",
+                                          "output_file_id": None, "error_file_id": None, "collected": False})
+        self._save_state()
+        return len(requests)
+
+    # --- submit / poll ----------------------------------------------------------
+
+    async def submit(self) -> List[str]:
+        """Upload and start every prepared batch that has not been submitted yet."""
+        started = []
+        for batch in self.state["batches"]:
+            if batch["id"]:
+                continue
+            with open(self._path(batch["input"]), "rb") as f:
+                uploaded = await self.client.files.create(file=f, purpose="batch")
+            created = await self.client.batches.create(
+                input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window="24h",
+                metadata={"kind": self.kind, "prompt_version": self.state["prompt_version"]})
+            batch.update(id=created.id, status=created.status)
+            self._save_state()
+            started.append(created.id)
+        return started
+
+    async def poll(self) -> Dict[str, str]:
+        """Refresh the status of submitted batches: {batch id: status}."""
+        for batch in self.state["batches"]:
+            if not batch["id"] or batch["status"] in FINAL_STATUSES:
+                continue
+            remote = await self.client.batches.retrieve(batch["id"])
+            batch.update(status=remote.status, output_file_id=remote.output_file_id,
+                         error_file_id=getattr(remote, "error_file_id", None))
+        self._save_state()
+        return {b["id"]: b["status"] for b in self.state["batches"] if b["id"]}
+
+    # --- collect ----------------------------------------------------------------
+
+    def _canonical(self, line: Dict[str, Any], item: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one batch output line through the live post-processing and validation."""
+        if line.get("error"):
+            raise RuntimeError(f"Batch request failed: {line['error']}")
+        response = line.get("response") or {}
+        if response.get("status_code") != 200:
+            raise RuntimeError(f"Batch request returned {response.get('status_code')}: {response.get('body')}")
+        return self.service.finalize_response(response["body"]["choices"][0]["message"]["content"],
+                                              item["filename"], item["mime"], item["file_sha"],
+                                              item["text_sha"], item["hash_sha256"])
+
+    def _store(self, pending: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        outcomes = self.service.store_many([canonical for _, canonical in pending])
+        rows = []
+        for (custom_id, _), outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                rows.append({"custom_id": custom_id, "ok": False, "error": str(outcome)})
+            else:
+                rows.append({"custom_id": custom_id, **outcome})
+        return rows
+
+    async def collect(self) -> Dict[str, int]:
+        """
+        Store the results of completed batches in BULK_STORE_BATCH groups,
+        checkpointing each group to results.jsonl. Returns {"stored", "failed"}.
+        """
+        items = {item["custom_id"]: item for item in _read_jsonl(self._path("items.jsonl"))}
+        done = self._collected()
+        counts = {"stored": 0, "failed": 0}
+
+        def _flush(rows: List[Dict[str, Any]]) -> None:
+            _append_jsonl(self._path("results.jsonl"), rows)
+            for row in rows:
+                counts["stored" if row["ok"] else "failed"] += 1
+
+        for batch in self.state["batches"]:
+            if batch["collected"] or batch["status"] not in FINAL_STATUSES:
+                continue
+            lines = []
+            for file_id in (batch["output_file_id"], batch["error_file_id"]):
+                if file_id:
+                    content = await self.client.files.content(file_id)
+                    lines += [json.loads(l) for l in content.text.splitlines() if l.strip()]
+
+            pending: List[Tuple[str, Dict[str, Any]]] = []
+            for line in lines:
+                custom_id = line.get("custom_id")
+                if custom_id not in items or custom_id in done:
+                    continue
+                try:
+                    pending.append((custom_id, self._canonical(line, items[custom_id])))
+                except Exception as e:
+                    _flush([{"custom_id": custom_id, "ok": False, "error": str(e)}])
+                if len(pending) >= BULK_STORE_BATCH:
+                    _flush(await asyncio.to_thread(self._store, pending))
+                    pending = []
+            if pending:
+                _flush(await asyncio.to_thread(self._store, pending))
+
+            # Requests the batch never answered (failed/expired batches) are reported too
+            seen = {line.get("custom_id") for line in lines} | done
+            missing = [cid for cid in self._batch_ids(batch) if cid not in seen]
+            _flush([{"custom_id": cid, "ok": False, "error": f"No result (batch {batch['status']})"}
+                    for cid in missing])
+            batch["collected"] = True
+            self._save_state()
+        return counts
+
+    def _batch_ids(self, batch: Dict[str, Any]) -> List[str]:
+        return [row["custom_id"] for row in _read_jsonl(self._path(batch["input"]))]
+
+    async def run(self, poll_seconds: Optional[float] = None) -> Dict[str, int]:
+        """Submit, wait for every batch to finish and collect the results."""
+        poll_seconds = BATCH_POLL_SECONDS if poll_seconds is None else poll_seconds
+        await self.submit()
+        counts = {"stored": 0, "failed": 0}
+        while True:
+            statuses = await self.poll()
+            collected = await self.collect()
+            for key in counts:
+                counts[key] += collected[key]
+            if all(s in FINAL_STATUSES for s in statuses.values()):
+                return counts
+            await asyncio.sleep(poll_seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        results = _read_jsonl(self._path("results.jsonl"))
+        return {
+            "kind": self.kind,
+            "requests": len(_read_jsonl(self._path("items.jsonl"))),
+            "batches": [{k: b[k] for k in ("id", "status", "collected")} for b in self.state["batches"]],
+            "stored": sum(1 for r in results if r["ok"]),
+            "failed": sum(1 for r in results if not r["ok"]),
+        }
@@ -0,0 +1,259 @@
+# hr_parser/bulk.py
+"""
+Staged bulk ingestion engine shared by HRResumeParserService and HRJobParserService.
+
+Every file goes through three stages:
+  - extract : bytes_to_text, run in a process pool (CPU-bound PDF/OCR work)
+  - parse   : GPT call + schema validation (I/O-bound)
+  - store   : embeddings + Mongo upsert (I/O-bound, batched across files)
+
+Extraction for the whole batch is submitted up front so the process pool stays
+busy, while at most `max_concurrency` files are in the parse stage at once.
+Parsed files are stored in small batches as they finish. Uploads whose raw
+bytes were already ingested are answered from the fingerprint lookup before
+extraction. Results are returned in input order;
+failures keep the {"ok": False, "file": ..., "error": ...} shape. Callers that
+stream results (iter_bulk) also get each one as soon as it is final.
+
+In bulk every file is one extract task, so a worker never starts a pool of its
+own; page-level fan-out is only used for single long PDFs (extract_in_pool).
+Per-page extraction stats come back to the parent and are counted on /metrics.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .config import BULK_MAX_CONCURRENCY, BULK_EXTRACT_WORKERS, BULK_STORE_BATCH, PDF_PARALLEL_MIN_PAGES
+from app import metrics
+from .extractor import PDF_MIME, detect_mime, extract_with_stats, pdf_page_count
+
+ParseFn = Callable[[str, str, str, str], Dict[str, Any]]
+StoreManyFn = Callable[[List[Dict[str, Any]]], List[Any]]
+LookupFn = Callable[[List[str]], Dict[str, Dict[str, Any]]]
+KnownFn = Callable[[str, str], Optional[Dict[str, Any]]]
+ResultFn = Callable[[int, Dict[str, Any]], None]
+
+_extract_pool: Optional[ProcessPoolExecutor] = None
+
+# Documents whose page extraction takes longer than this get a per-method breakdown logged
+SLOW_EXTRACT_SECONDS = 5.0
+
+
+def get_extract_pool() -> Optional[ProcessPoolExecutor]:
+    global _extract_pool
+    if _extract_pool is None and BULK_EXTRACT_WORKERS > 0:
+        # Not fork: the app process holds Mongo/OpenAI clients and threads that a
+        # forked child would inherit in whatever state they were mid-use
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _extract_pool = ProcessPoolExecutor(max_workers=BULK_EXTRACT_WORKERS,
+                                            mp_context=multiprocessing.get_context(method))
+    return _extract_pool
+
+
+def shutdown_extract_pool() -> None:
+    global _extract_pool
+    if _extract_pool is not None:
+        _extract_pool.shutdown(wait=False, cancel_futures=True)
+        _extract_pool = None
+
+
+def record_extract_stats(pages: List[Dict[str, Any]], filename: Optional[str] = None) -> None:
+    """Count PDF pages and milliseconds per extraction method on /metrics."""
+    if not pages:
+        return
+    metrics.incr("extract.pdf.docs")
+    by_method: Dict[str, float] = {}
+    for page in pages:
+        metrics.incr(f"extract.pdf.pages.{page['method']}")
+        metrics.incr(f"extract.pdf.ms.{page['method']}", int(page["seconds"] * 1000))
+        by_method[page["method"]] = by_method.get(page["method"], 0.0) + page["seconds"]
+    total = sum(by_method.values())
+    if total >= SLOW_EXTRACT_SECONDS:
+        breakdown = ", ".join(f"{m} {t:.1f}s" for m, t in sorted(by_method.items(), key=lambda kv: -kv[1]))
+        print(f"Slow PDF extraction {filename or '<upload>'}: {len(pages)} pages in {total:.1f}s ({breakdown})")
+
+
+def extract_bytes(data: bytes, filename: Optional[str] = None) -> Tuple[str, str]:
+    """Extract raw upload bytes in the calling process and record the page stats."""
+    text, mime, pages = extract_with_stats(data, filename)
+    record_extract_stats(pages, filename)
+    return text, mime
+
+
+def _extract_job(data: bytes, filename: Optional[str]) -> Tuple[str, str, List[Dict[str, Any]]]:
+    # Runs in a worker process: no page-level pool here, stats go back to the parent
+    return extract_with_stats(data, filename)
+
+
+def _collect(future: Future, filename: Optional[str]) -> Tuple[str, str]:
+    text, mime, pages = future.result()
+    record_extract_stats(pages, filename)
+    return text, mime
+
+
+def extract_in_pool(data: bytes, filename: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Extract one upload in the shared process pool (in-thread if the pool is
+    disabled). Long PDFs are driven from this thread with their pages spread
+    over the pool instead of landing on a single worker.
+    """
+    pool = get_extract_pool()
+    if pool is None:
+        return extract_bytes(data, filename)
+    try:
+        if detect_mime(data, filename) == PDF_MIME and pdf_page_count(data) >= PDF_PARALLEL_MIN_PAGES:
+            text, mime, pages = extract_with_stats(data, filename, executor=pool)
+            record_extract_stats(pages, filename)
+            return text, mime
+        return _collect(pool.submit(_extract_job, data, filename), filename)
+    except BrokenProcessPool:
+        shutdown_extract_pool()
+        return extract_bytes(data, filename)
+
+
+def run_bulk(items: Iterable[tuple], parse: ParseFn, store_many: StoreManyFn,
+             lookup: Optional[LookupFn] = None,
+             known: Optional[KnownFn] = None,
+             on_result: Optional[ResultFn] = None,
+             max_concurrency: int = BULK_MAX_CONCURRENCY,
+             store_batch: int = BULK_STORE_BATCH) -> List[Dict[str, Any]]:
+    """
+    Run (fileobj, filename) items through extract -> parse -> store.
+
+    `parse(text, mime, filename, file_sha)` returns the validated canonical dict.
+    `store_many(canonicals)` embeds and stores a batch of them and returns, per
+    canonical, the result dict or the exception it failed with. Parsed files are
+    handed to store_many in batches of `store_batch` as they finish, so the
+    embedding calls are batched while GPT calls for later files are in flight.
+    `lookup(file_shas)` may return {file_sha: result} for uploads that were
+    already ingested; those skip every stage.
+    `known(text, file_sha)` may return a result for extracted text that was
+    already parsed under other bytes; those skip the parse and store stages.
+    `on_result(index, result)` is called from a worker thread as each file's
+    result becomes final, in completion order.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    datas: List[Any] = []
+    for fileobj, _ in items:
+        try:
+            datas.append(fileobj.read())
+        except Exception as e:
+            datas.append(e)
+    shas = [hashlib.sha256(d).hexdigest() if isinstance(d, bytes) else None for d in datas]
+
+    cached: Dict[str, Dict[str, Any]] = {}
+    if lookup is not None:
+        try:
+            cached = lookup([sha for sha in shas if sha])
+        except Exception as e:
+            print(f"Fingerprint lookup failed, parsing every file: {e}")
+
+    pool = get_extract_pool()
+    payloads: List[Any] = []
+    for (_, filename), data, sha in zip(items, datas, shas):
+        if pool is None or sha is None or sha in cached:
+            payloads.append(data)
+            continue
+        try:
+            payloads.append(pool.submit(_extract_job, data, filename))
+        except BrokenProcessPool:
+            shutdown_extract_pool()
+            payloads.append(data)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+    def _finish(i: int, result: Dict[str, Any]) -> None:
+        results[i] = result
+        if on_result is not None:
+            try:
+                on_result(i, result)
+            except Exception as e:
+                print(f"Bulk result callback failed for {items[i][1]}: {e}")
+
+    def _error(i: int, e: BaseException) -> Dict[str, Any]:
+        if isinstance(e, BrokenProcessPool):
+            shutdown_extract_pool()
+        return {"ok": False, "file": items[i][1], "error": str(e)}
+
+    def _parse(i: int) -> Optional[Dict[str, Any]]:
+        """Canonical dict for item i, or None once its final result is recorded."""
+        payload = payloads[i]
+        try:
+            if isinstance(payload, Exception):
+                raise payload
+            if shas[i] in cached:
+                _finish(i, dict(cached[shas[i]]))
+                return None
+            if isinstance(payload, Future):
+                text, mime = _collect(payload, items[i][1])
+            else:
+                text, mime = extract_bytes(payload, items[i][1])
+            if known is not None:
+                hit = known(text, shas[i])
+                if hit is not None:
+                    _finish(i, hit)
+                    return None
+            return parse(text, mime, items[i][1], shas[i])
+        except Exception as e:
+            _finish(i, _error(i, e))
+            return None
+
+    def _store(batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        try:
+            outcomes = store_many([canonical for _, canonical in batch])
+        except Exception as e:
+            outcomes = [e] * len(batch)
+        for (i, _), outcome in zip(batch, outcomes):
+            _finish(i, _error(i, outcome) if isinstance(outcome, BaseException) else outcome)
+
+    workers = max(1, min(max_concurrency, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hrp-bulk") as parse_ex, \
+            ThreadPoolExecutor(max_workers=2, thread_name_prefix="hrp-bulk-store") as store_ex:
+        futures = {parse_ex.submit(_parse, i): i for i in range(len(items))}
+        stores, ready = [], []
+        for fut in as_completed(futures):
+            canonical = fut.result()
+            if canonical is None:
+                continue
+            ready.append((futures[fut], canonical))
+            if len(ready) >= store_batch:
+                stores.append(store_ex.submit(_store, ready))
+                ready = []
+        if ready:
+            stores.append(store_ex.submit(_store, ready))
+        for fut in stores:
+            fut.result()
+
+    return results
+
+
+async def iter_bulk(run: Callable[[ResultFn], Any]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (index, result) pairs as a bulk run finishes them. `run(on_result)`
+    performs the run in a worker thread (e.g. a service's parse_bulk_fileobjs);
+    an exception it raises is re-raised after the results emitted so far.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def _run() -> None:
+        try:
+            run(lambda i, result: loop.call_soon_threadsafe(queue.put_nowait, (i, result)))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    task = asyncio.ensure_future(asyncio.to_thread(_run))
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        yield item
+    await task
@@ -0,0 +1,163 @@
+# hr_parser/clients.py
+"""
+Process-wide Mongo and OpenAI clients.
+
+Each client is built once, on first use, with the pool/timeout/keep-alive
+settings from hr_parser.config, and shared by the repository, ingest queue,
+scoring pipeline, embedding cache and GPT parsers. The OpenAI clients do not
+retry on their own: hr_parser.ratelimit owns retries so 429s feed the shared
+limiter. Modules that want a
+collection at import time use `collection(name)` / `async_collection(name)`,
+which return lazy proxies: no client (and no socket) exists until the first
+query. `close_clients()` runs at app shutdown.
+"""
+
+import threading
+from typing import TYPE_CHECKING, Any, Optional
+
+from pymongo import MongoClient, AsyncMongoClient
+
+if TYPE_CHECKING:  # openai is slow to import; it is loaded with the first client
+    from openai import OpenAI, AsyncOpenAI
+
+from .config import (
+    MONGODB_URI, DB_NAME, OPENAI_API_KEY,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_MS,
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    OPENAI_TIMEOUT_SECONDS, OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE, OPENAI_KEEPALIVE_EXPIRY,
+)
+
+_lock = threading.Lock()
+_clients: dict = {}
+
+
+def _mongo_options() -> dict:
+    opts = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    if MONGO_MAX_IDLE_MS > 0:
+        opts["maxIdleTimeMS"] = MONGO_MAX_IDLE_MS
+    if MONGO_SOCKET_TIMEOUT_MS > 0:
+        opts["socketTimeoutMS"] = MONGO_SOCKET_TIMEOUT_MS
+    return opts
+
+
+def _openai_limits():
+    import httpx
+    return httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY)
+
+
+def _get(name: str, build) -> Any:
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = build()
+    return client
+
+
+def get_mongo() -> MongoClient:
+    return _get("mongo", lambda: MongoClient(MONGODB_URI, **_mongo_options()))
+
+
+def get_async_mongo() -> AsyncMongoClient:
+    return _get("amongo", lambda: AsyncMongoClient(MONGODB_URI, **_mongo_options()))
+
+
+def get_db():
+    return get_mongo()[DB_NAME]
+
+
+def get_async_db():
+    return get_async_mongo()[DB_NAME]
+
+
+def _build_openai():
+    import openai
+    return openai.OpenAI(
+        api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT_SECONDS, max_retries=0,
+        http_client=openai.DefaultHttpxClient(limits=_openai_limits(), timeout=OPENAI_TIMEOUT_SECONDS))
+
+
+def _build_async_openai():
+    import openai
+    return openai.AsyncOpenAI(
+        api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT_SECONDS, max_retries=0,
+        http_client=openai.DefaultAsyncHttpxClient(limits=_openai_limits(), timeout=OPENAI_TIMEOUT_SECONDS))
+
+
+def get_openai() -> Optional["OpenAI"]:
+    """Shared OpenAI client, or None when no API key is configured."""
+    if not OPENAI_API_KEY:
+        return None
+    return _get("openai", _build_openai)
+
+
+def get_async_openai() -> Optional["AsyncOpenAI"]:
+    """Shared AsyncOpenAI client, or None when no API key is configured."""
+    if not OPENAI_API_KEY:
+        return None
+    return _get("aopenai", _build_async_openai)
+
+
+class _LazyDatabase:
+    """Database handle that resolves the shared client on first attribute access."""
+
+    def __init__(self, is_async: bool = False):
+        self._is_async = is_async
+
+    def _target(self):
+        return get_async_db() if self._is_async else get_db()
+
+    def __getattr__(self, attr: str):
+        return getattr(self._target(), attr)
+
+    def __getitem__(self, name: str):
+        return self._target()[name]
+
+
+class _LazyCollection:
+    """Collection handle that resolves the shared client on first use."""
+
+    def __init__(self, name: str, is_async: bool = False):
+        self._name = name
+        self._is_async = is_async
+
+    def _target(self):
+        return (get_async_db() if self._is_async else get_db())[self._name]
+
+    def __getattr__(self, attr: str):
+        return getattr(self._target(), attr)
+
+
+def database(is_async: bool = False) -> Any:
+    return _LazyDatabase(is_async)
+
+
+def collection(name: str) -> Any:
+    return _LazyCollection(name)
+
+
+def async_collection(name: str) -> Any:
+    return _LazyCollection(name, is_async=True)
+
+
+async def close_clients() -> None:
+    """Close every client built so far (app shutdown)."""
+    with _lock:
+        clients = dict(_clients)
+        _clients.clear()
+    for name, client in clients.items():
+        try:
+            if name in ("amongo", "aopenai"):
+                await client.close()
+            else:
+                client.close()
+        except Exception as e:
+            print(f"Closing {name} client failed: {e}")
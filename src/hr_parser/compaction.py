@@ -0,0 +1,138 @@
+# hr_parser/compaction.py
+"""
+Input compaction between extraction and the GPT prompt.
+
+Extracted text is mostly whitespace, page furniture and OCR debris, all of
+which is billed as input tokens. `compact_text` normalises whitespace, drops
+page numbers and lines without a single letter or digit, keeps repeated page
+headers/footers on the first page only, collapses a line repeated straight
+after itself, and then cuts the result to a token budget at a line boundary.
+Tokens are counted with tiktoken when it is installed and estimated at ~4
+characters per token otherwise. Pages are separated by "\f" (see extractor.extract_pdf).
+"""
+
+import math
+import re
+from typing import Optional
+
+from app import metrics
+from .config import MAX_INPUT_CHARS, MAX_INPUT_TOKENS
+from .extractor import PAGE_BREAK
+
+# Lines at the top/bottom of a page checked for repeated headers/footers
+_EDGE_LINES = 3
+# Share of pages a header/footer line must repeat on to count as boilerplate
+_BOILERPLATE_SHARE = 0.6
+
+_SPACES = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+_PAGE_NUMBER = re.compile(r"^(page\s*)?[-–(\[]?\s*\d{1,3}\s*(([/|]|of)\s*\d{1,3})?\s*[-–)\]]?$", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+_WORD_CHAR = re.compile(r"\w")
+
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = None
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def _clip_to_tokens(text: str, budget: int) -> str:
+    encoder = _get_encoder()
+    if encoder is not None:
+        tokens = encoder.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        clipped = encoder.decode(tokens[:budget])
+    else:
+        if len(text) <= budget * 4:
+            return text
+        clipped = text[:budget * 4]
+    # Never hand the model half a line
+    cut = clipped.rfind("\n")
+    return clipped[:cut] if cut > 0 else clipped
+
+
+def _normalise(line: str) -> str:
+    return _SPACES.sub(" ", line).strip()
+
+
+def _clean_page(page: str) -> list[str]:
+    """Normalised lines of one page without OCR debris or page numbers."""
+    lines = [line for line in (_normalise(raw) for raw in page.splitlines()) if _WORD_CHAR.search(line)]
+    # A bare number is only a page number at the top or bottom of a page
+    return [line for i, line in enumerate(lines)
+            if not ((i < 2 or i >= len(lines) - 2) and _PAGE_NUMBER.match(line))]
+
+
+def _boilerplate(pages: list[list[str]]) -> set:
+    """Header/footer lines (digits masked) repeated across most pages."""
+    if len(pages) < 2:
+        return set()
+    seen: dict = {}
+    for lines in pages:
+        # Short pages are mostly body: look at fewer edge lines there
+        k = max(1, min(_EDGE_LINES, len(lines) // 4))
+        edge = {_DIGITS.sub("#", line) for line in lines[:k] + lines[-k:]}
+        for key in edge:
+            seen[key] = seen.get(key, 0) + 1
+    needed = max(2, math.ceil(_BOILERPLATE_SHARE * len(pages)))
+    return {key for key, n in seen.items() if n >= needed}
+
+
+def compact_text(text: str, max_tokens: Optional[int] = None) -> tuple[str, dict]:
+    """(compacted text, stats) with stats tokens_in, tokens_out, tokens_saved, lines_dropped."""
+    budget = MAX_INPUT_TOKENS if max_tokens is None else max_tokens
+    pages = [_clean_page(page) for page in text.split(PAGE_BREAK)]
+    total_lines = sum(1 for line in text.splitlines() if line.strip())
+
+    boilerplate = _boilerplate(pages)
+    out: list[str] = []
+    kept_boilerplate = set()
+    for lines in pages:
+        for line in lines:
+            key = _DIGITS.sub("#", line)
+            if key in boilerplate:
+                # Keep it once: a repeated header is often the candidate's name
+                if key in kept_boilerplate:
+                    continue
+                kept_boilerplate.add(key)
+            # Other repeats are kept: the same bullet under two roles belongs to both
+            if out and line == out[-1]:
+                continue
+            out.append(line)
+
+    compacted = _clip_to_tokens("\n".join(out), budget)[:MAX_INPUT_CHARS]
+    tokens_in, tokens_out = count_tokens(text), count_tokens(compacted)
+    return compacted, {
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "tokens_saved": max(0, tokens_in - tokens_out),
+        "lines_dropped": max(0, total_lines - compacted.count("\n") - (1 if compacted else 0)),
+    }
+
+
+def compact_for_prompt(text: str) -> str:
+    """compact_text plus the compaction.* counters on /metrics."""
+    compacted, stats = compact_text(text)
+    metrics.incr("compaction.docs")
+    metrics.incr("compaction.tokens_in", stats["tokens_in"])
+    metrics.incr("compaction.tokens_out", stats["tokens_out"])
+    metrics.incr("compaction.tokens_saved", stats["tokens_saved"])
+    metrics.incr("compaction.lines_dropped", stats["lines_dropped"])
+    return compacted
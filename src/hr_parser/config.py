@@ -12,6 +12,61 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "hyperrecruit")
 
+# Shared clients (hr_parser.clients): Mongo pool and timeouts, OpenAI HTTP pool.
+# 0 leaves MONGO_MAX_IDLE_MS / MONGO_SOCKET_TIMEOUT_MS unset (no limit).
+MONGO_MAX_POOL_SIZE = int(os.getenv("HRP_MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("HRP_MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("HRP_MONGO_MAX_IDLE_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("HRP_MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("HRP_MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("HRP_MONGO_SOCKET_TIMEOUT_MS", "0"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("HRP_OPENAI_TIMEOUT_SECONDS", "120"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("HRP_OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("HRP_OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("HRP_OPENAI_KEEPALIVE_EXPIRY", "30"))
+# Shared client-side rate limits (0 = no budget) and the ceiling of the
+# adaptive concurrency window, per API family; retries of 429/5xx per call
+CHAT_RPM = int(os.getenv("HRP_CHAT_RPM", "5000"))
+CHAT_TPM = int(os.getenv("HRP_CHAT_TPM", "4000000"))
+CHAT_MAX_CONCURRENCY = int(os.getenv("HRP_CHAT_MAX_CONCURRENCY", "32"))
+EMBED_RPM = int(os.getenv("HRP_EMBED_RPM", "5000"))
+EMBED_TPM = int(os.getenv("HRP_EMBED_TPM", "5000000"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("HRP_EMBED_MAX_CONCURRENCY", "16"))
+RATE_LIMIT_RETRIES = int(os.getenv("HRP_RATE_LIMIT_RETRIES", "6"))
+
 MAX_INPUT_CHARS = int(os.getenv("HRP_MAX_INPUT_CHARS", "180000"))
+# Prompt budget for the compacted document text (tiktoken count, or chars/4 without it)
+MAX_INPUT_TOKENS = int(os.getenv("HRP_MAX_INPUT_TOKENS", "45000"))
+# Section-parallel parsing for long documents (opt-in): documents of at least
+# this many (compacted) tokens are split at their headings and parsed
+# concurrently. Off by default (0); every part re-sends the prompt and schema.
+SECTION_PARALLEL_MIN_TOKENS = int(os.getenv("HRP_SECTION_PARALLEL_MIN_TOKENS", "0"))
+SECTION_CHUNK_TOKENS = int(os.getenv("HRP_SECTION_CHUNK_TOKENS", "1500"))
+SECTION_MAX_PARALLEL = int(os.getenv("HRP_SECTION_MAX_PARALLEL", "6"))
 MAX_OUTPUT_TOKENS = int(os.getenv("HRP_MAX_OUTPUT_TOKENS", "3000"))
 USE_MOCK = os.getenv("HRP_USE_MOCK", "false").lower() == "true"
+
+# Bump when extraction/post-processing changes so stored ingest fingerprints stop matching
+PARSER_VERSION = "hrx-0.2.0"
+
+# Bulk ingestion: files in the GPT/embedding/upsert stages at once, and
+# processes used for text extraction (0 = extract in the calling thread)
+BULK_MAX_CONCURRENCY = int(os.getenv("HRP_BULK_MAX_CONCURRENCY", "8"))
+BULK_EXTRACT_WORKERS = int(os.getenv("HRP_BULK_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# Parsed files embedded (one batched embeddings request) and stored together
+BULK_STORE_BATCH = int(os.getenv("HRP_BULK_STORE_BATCH", "8"))
+# PDFs with at least this many pages have their pages split across the
+# extract pool, PDF_PAGES_PER_TASK pages per task
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("HRP_PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_PAGES_PER_TASK = int(os.getenv("HRP_PDF_PAGES_PER_TASK", "2"))
+
+# Background ingest: worker threads per API process draining the Mongo queue,
+# idle poll interval, and how long a claimed file may run before it is requeued
+INGEST_WORKERS = int(os.getenv("HRP_INGEST_WORKERS", "4"))
+INGEST_POLL_SECONDS = float(os.getenv("HRP_INGEST_POLL_SECONDS", "2"))
+INGEST_LEASE_SECONDS = float(os.getenv("HRP_INGEST_LEASE_SECONDS", "600"))
+
+# Offline batch mode: requests per Batch API input file (the API allows 50k)
+# and how often a running batch is polled
+BATCH_MAX_REQUESTS = int(os.getenv("HRP_BATCH_MAX_REQUESTS", "50000"))
+BATCH_POLL_SECONDS = float(os.getenv("HRP_BATCH_POLL_SECONDS", "60"))
@@ -1,107 +1,243 @@
+"""
+Text extraction for uploaded resumes and job descriptions.
+
+Everything works on in-memory bytes: PDFs are opened with
+fitz.open(stream=...), DOCX and images are read from BytesIO, and the file
+type comes from magic bytes (falling back to the filename extension), so no
+upload is spilled to a temp file. Paths are still accepted and read once.
+
+PDF pages are planned before extraction: pages with a text layer go through
+get_text (then blocks, then words), scanned pages go straight to OCR. Long
+PDFs can have their pages spread over a process pool; every page reports the
+method used and its timing.
+fitz (PyMuPDF), docx, PIL and pytesseract are imported where they are used,
+so importing this module (and the API) stays cheap.
+"""
+import io
 import mimetypes
+import time
+import zipfile
+from concurrent.futures import Executor
 from pathlib import Path
-import fitz
-from docx import Document
+from typing import Optional, Union
+
+from .config import PDF_PARALLEL_MIN_PAGES, PDF_PAGES_PER_TASK
+
+Source = Union[str, bytes, bytearray, memoryview]
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TEXT_MIME = "text/plain"
+PAGE_BREAK = "\f"
+
+_IMAGE_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+_IMAGE_EXTS = [".png", ".jpg", ".jpeg", ".tiff", ".bmp"]
+
+
+def _read_source(source: Source) -> tuple[bytes, Optional[str]]:
+    """(bytes, label) for a path or an in-memory buffer."""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read(), source
+    return bytes(source) if isinstance(source, memoryview) else source, None
+
+
+def detect_mime(data: bytes, filename: Optional[str] = None) -> str:
+    """File type from magic bytes, then the filename extension, else text/plain."""
+    head = bytes(data[:1024])
+    if head.lstrip()[:5] == b"%PDF-":
+        return PDF_MIME
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                if "word/document.xml" in zf.namelist():
+                    return DOCX_MIME
+        except zipfile.BadZipFile:
+            pass
+    for magic, mime in _IMAGE_MAGIC:
+        if head.startswith(magic):
+            return mime
+    if filename:
+        ext = Path(filename).suffix.lower()
+        # Some generators put a few junk bytes before the marker; a text upload
+        # that merely mentions "%PDF-" is not a PDF, so trust it only for .pdf names
+        if ext == ".pdf" and b"%PDF-" in head:
+            return PDF_MIME
+        if ext == ".docx":
+            return DOCX_MIME
+        if ext in _IMAGE_EXTS:
+            return mimetypes.guess_type(filename)[0] or f"image/{ext.strip('.')}"
+    return TEXT_MIME
+
+def _has_text_layer(page) -> bool:
+    # Fonts in the page resources mean a text layer; scans carry only images
+    return bool(page.get_fonts()) or not page.get_images()
+
+def plan_pdf_pages(doc) -> list[str]:
+    """Extraction method per page, picked up front: "text" or "ocr"."""
+    return ["text" if _has_text_layer(page) else "ocr" for page in doc]
+
+def _ocr_page(page, page_num: int) -> str:
+    try:
+        # Convert page to image and use OCR
+        pix = page.get_pixmap()
+        img_data = pix.tobytes("png")
+        
+        from PIL import Image
+        img = Image.open(io.BytesIO(img_data))
+        
+        import pytesseract
+        return pytesseract.image_to_string(img)
+    except Exception as ocr_error:
+        print(f"OCR failed for page {page_num}: {ocr_error}")
+        return ""
+
+def _page_text(page, page_num: int, plan: str) -> tuple[str, str]:
+    """(text, method used) for one page, starting from its planned method."""
+    if plan == "text":
+        # Method 1: Standard text extraction
+        page_text = page.get_text("text")
+        if page_text.strip():
+            return page_text, "text"
+        
+        # Method 2: If no text, try blocks
+        blocks = page.get_text("blocks")
+        page_text = "\n".join([block[4] for block in blocks if len(block) > 4 and isinstance(block[4], str)])
+        if page_text.strip():
+            return page_text, "blocks"
+        
+        # Method 3: If still no text, try words
+        words = page.get_text("words")
+        page_text = " ".join([word[4] for word in words if isinstance(word[4], str)])
+        if page_text.strip():
+            return page_text, "words"
+    
+    # Method 4: OCR, straight away for pages without a text layer
+    page_text = _ocr_page(page, page_num)
+    return page_text, "ocr" if page_text.strip() else "none"
+
+def extract_pdf_pages(data: bytes, page_nums: list[int], plans: list[str]) -> list[dict]:
+    """
+    Extract `page_nums` of a PDF held in memory, one stats dict per page
+    (page, plan, method, seconds, chars, text). Top-level so page chunks can
+    run in worker processes.
+    """
+    import fitz
+    out = []
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for page_num, plan in zip(page_nums, plans):
+            started = time.perf_counter()
+            page_text, method = _page_text(doc[page_num], page_num, plan)
+            out.append({"page": page_num, "plan": plan, "method": method,
+                        "seconds": round(time.perf_counter() - started, 4),
+                        "chars": len(page_text.strip()), "text": page_text})
+    return out
+
+def pdf_page_count(data: bytes) -> int:
+    try:
+        import fitz
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            return len(doc)
+    except Exception:
+        return 0
 
-def pdf_to_text(path: str) -> str:
+def _extract_pages_parallel(data: bytes, plans: list[str], executor: Executor) -> list[dict]:
+    pages = list(range(len(plans)))
+    chunks = [pages[i:i + PDF_PAGES_PER_TASK] for i in range(0, len(pages), PDF_PAGES_PER_TASK)]
+    futures = [executor.submit(extract_pdf_pages, data, chunk, [plans[p] for p in chunk]) for chunk in chunks]
+    # Chunks are submitted in page order, so collecting them in order keeps the pages ordered
+    return [page for future in futures for page in future.result()]
+
+def extract_pdf(source: Source, executor: Optional[Executor] = None) -> tuple[str, list[dict]]:
+    """
+    (text, per-page stats) for a PDF. Documents with at least
+    PDF_PARALLEL_MIN_PAGES pages are split across `executor` when one is
+    given; callers already running inside a worker process pass none.
+    """
+    data, path = _read_source(source)
+    path = path or "<upload>"
     try:
         import fitz
-        text = []
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            plans = plan_pdf_pages(doc)
         
-        with fitz.open(path) as doc:
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Try multiple extraction methods
-                page_text = ""
-                
-                # Method 1: Standard text extraction
-                page_text = page.get_text("text")
-                
-                # Method 2: If no text, try blocks
-                if not page_text.strip():
-                    blocks = page.get_text("blocks")
-                    page_text = "\n".join([block[4] for block in blocks if len(block) > 4 and isinstance(block[4], str)])
-                
-                # Method 3: If still no text, try words
-                if not page_text.strip():
-                    words = page.get_text("words")
-                    page_text = " ".join([word[4] for word in words if isinstance(word[4], str)])
-                
-                # Method 4: If still no text, try OCR (if available)
-                if not page_text.strip():
-                    try:
-                        # Convert page to image and use OCR
-                        pix = page.get_pixmap()
-                        img_data = pix.tobytes("png")
-                        
-                        from PIL import Image
-                        import io
-                        img = Image.open(io.BytesIO(img_data))
-                        
-                        import pytesseract
-                        page_text = pytesseract.image_to_string(img)
-                    except Exception as ocr_error:
-                        print(f"OCR failed for page {page_num}: {ocr_error}")
-                        page_text = ""
-                
-                if page_text.strip():
-                    text.append(page_text)
+        pages = None
+        if executor is not None and len(plans) >= PDF_PARALLEL_MIN_PAGES:
+            try:
+                pages = _extract_pages_parallel(data, plans, executor)
+            except Exception as e:
+                print(f"Parallel PDF extraction failed for {path}, retrying serially: {e}")
+        if pages is None:
+            pages = extract_pdf_pages(data, list(range(len(plans))), plans)
         
-        result = "\n".join(text)
+        text = [page_text for page_text in (page.pop("text") for page in pages) if page_text.strip()]
+        # Remove excessive whitespace; pages stay separated by a form feed so
+        # compaction can spot per-page headers and footers
+        result = PAGE_BREAK.join(
+            "\n".join([line.strip() for line in page_text.split("\n") if line.strip()]) for page_text in text)
         
         # Clean up the result
         if result:
-            # Remove excessive whitespace
-            result = "\n".join([line.strip() for line in result.split("\n") if line.strip()])
             
             # Check if we got meaningful text
-            if len(result) > 50 and not result.startswith('%PDF') and not result.startswith('xœ'):
-                return result
-            else:
+            if not (len(result) > 50 and not result.startswith('%PDF') and not result.startswith('xœ')):
                 print(f"Warning: PDF extraction may have failed for {path} - got binary or minimal content")
-                return result
         else:
             print(f"Warning: No text extracted from {path}")
-            return ""
+        return result, pages
             
     except Exception as e:
         print(f"Error extracting PDF text from {path}: {e}")
-        return ""
+        return "", []
+
+def pdf_to_text(source: Source, executor: Optional[Executor] = None) -> str:
+    return extract_pdf(source, executor)[0]
 
-def docx_to_text(path: str) -> str:
-    doc = Document(path)
+def docx_to_text(source: Source) -> str:
+    from docx import Document
+    data, _ = _read_source(source)
+    doc = Document(io.BytesIO(data))
     return "\n".join(p.text for p in doc.paragraphs)
 
-def image_to_text(path: str) -> str:
+def image_to_text(source: Source) -> str:
     try:
         import pytesseract
         from PIL import Image
-        return pytesseract.image_to_string(Image.open(path))
+        data, _ = _read_source(source)
+        with Image.open(io.BytesIO(data)) as img:
+            return pytesseract.image_to_string(img)
     except Exception:
         return ""
 
+def extract_with_stats(data: Union[bytes, bytearray, memoryview], filename: Optional[str] = None,
+                       executor: Optional[Executor] = None) -> tuple[str, str, list[dict]]:
+    """(text, mime, per-page stats) for an upload held in memory; stats are only filled for PDFs."""
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    mime = detect_mime(data, filename)
+    if mime == PDF_MIME:
+        text, pages = extract_pdf(data, executor)
+        return text, mime, pages
+    if mime == DOCX_MIME:
+        return docx_to_text(data), mime, []
+    if mime.startswith("image/"):
+        return image_to_text(data), mime, []
+    return data.decode("utf-8", errors="ignore"), TEXT_MIME, []
+
+def bytes_to_text(data: Union[bytes, bytearray, memoryview], filename: Optional[str] = None,
+                  executor: Optional[Executor] = None) -> tuple[str, str]:
+    """(text, mime) for an upload held in memory; `filename` only helps type detection."""
+    text, mime, _ = extract_with_stats(data, filename, executor)
+    return text, mime
+
 def file_to_text(path: str) -> tuple[str, str]:
-    mime, _ = mimetypes.guess_type(path)
-    ext = Path(path).suffix.lower()
-    
-    # Check if it's a PDF by extension or MIME type
-    if mime == "application/pdf" or ext == ".pdf":
-        return pdf_to_text(path), "application/pdf"
-    
-    # Check if it's a PDF by content (for temporary files without extension)
-    if not ext or ext not in [".docx", ".png", ".jpg", ".jpeg", ".tiff", ".bmp"]:
-        try:
-            with open(path, "rb") as f:
-                header = f.read(4)
-                if header == b'%PDF':
-                    return pdf_to_text(path), "application/pdf"
-        except Exception:
-            pass
-    
-    if ext == ".docx":
-        return docx_to_text(path), "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    if ext in [".png",".jpg",".jpeg",".tiff",".bmp"]:
-        return image_to_text(path), f"image/{ext.strip('.')}"
-    with open(path, "r", errors="ignore") as f:
-        return f.read(), "text/plain"
+    data, _ = _read_source(path)
+    return bytes_to_text(data, filename=path)
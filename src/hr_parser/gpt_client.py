@@ -1,9 +1,11 @@
 # hr_parser/gpt_client.py  (fallback for older SDKs)
-import os, time, hashlib, json, re
-from tenacity import retry, stop_after_attempt, wait_exponential
-from openai import OpenAI
-from .config import OPENAI_API_KEY, MAX_INPUT_CHARS, MAX_OUTPUT_TOKENS, USE_MOCK
-from .schemas import CanonicalResume
+import time, hashlib, json
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from .clients import get_openai, get_async_openai
+from .compaction import compact_for_prompt
+from .ratelimit import chat_limiter, chat_tokens
+from .sections import RESUME_LAYOUT, plan_parts, run_parts, run_parts_async
+from .config import OPENAI_API_KEY, MAX_OUTPUT_TOKENS, USE_MOCK, PARSER_VERSION
 
 SYSTEM_PROMPT = (
     "You are a resume parser. Extract key fields into JSON: "
@@ -38,7 +40,7 @@ def _mock_response(plain_text: str, source_file: str) -> dict:
     return {
         "meta": {
             "canonical_version": "1.0",
-            "parser_version": "hrx-0.1.0",
+            "parser_version": PARSER_VERSION,
             "ingested_at": now_iso,
             "source_file": source_file,
             "source_mime": "text/plain",
@@ -59,16 +61,8 @@ def _mock_response(plain_text: str, source_file: str) -> dict:
         "preferences": {}, "work_auth": {}, "dedupe": {"keys": []},
     }
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
-def parse_with_gpt(plain_text: str, source_file: str) -> dict:
-    clipped = plain_text[:MAX_INPUT_CHARS]
-
-    if USE_MOCK or not OPENAI_API_KEY:
-        return _mock_response(clipped, source_file)
-
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
-    messages = [
+def _build_messages(clipped: str) -> list:
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
         {
             "role": "user",
@@ -82,16 +76,30 @@ def parse_with_gpt(plain_text: str, source_file: str) -> dict:
         },
     ]
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        response_format={"type": "json_object"},
-        temperature=0,
-        max_tokens=MAX_OUTPUT_TOKENS,
-    )
+def _build_part_messages(part: dict) -> list:
+    """Prompt for one part of a long resume split by hr_parser.sections."""
+    if part["keys"] is None:
+        scope = ("This is a long resume with some sections removed; they are parsed separately. "
+                 "Extract every key you can from the text below.")
+    else:
+        scope = (f"This is one part of the {part['name']} section of a long resume; the rest is parsed separately. "
+                 f"Return only these keys: {', '.join(part['keys'])}.")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"{scope} Return only valid JSON (no code fence, no prose)."
+                f"\n\nSchema hint:\n{SCHEMA_HINT}\n\nResume text:\n{part['text']}"
+            ),
+        },
+    ]
+
+# Changes whenever the prompt text changes; recorded with ingest fingerprints
+PROMPT_VERSION = _sha256(json.dumps(_build_messages("") + _build_part_messages(
+    {"name": "", "keys": [], "text": ""})))[:12]
 
-    raw = resp.choices[0].message.content
-    
+def _decode_response(raw: str) -> dict:
     # Clean up the response
     if raw:
         # Remove any markdown code blocks
@@ -109,116 +117,88 @@ def parse_with_gpt(plain_text: str, source_file: str) -> dict:
         print(f"Raw response (first 1000 chars): {raw[:1000]}")
         print(f"Raw response (last 500 chars): {raw[-500:]}")
         raise
+    return obj
 
-    # Inject standard meta if missing
+def _postprocess(obj: dict, clipped: str, source_file: str) -> dict:
+    """
+    Inject the standard meta fields; the remaining fixes of GPT output run as
+    validators in one pass in the service's _finalize (see schemas.py).
+    """
     obj.setdefault("meta", {})
     obj["meta"].setdefault("canonical_version", "1.0")
-    obj["meta"].setdefault("parser_version", "hrx-0.1.0")
+    obj["meta"].setdefault("parser_version", PARSER_VERSION)
     obj["meta"].setdefault("ingested_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
     obj["meta"].setdefault("source_file", source_file)
     obj["meta"].setdefault("hash_sha256", _sha256(clipped))
-    # Ensure parsing_confidence is always a valid number
-    confidence = obj["meta"].get("parsing_confidence")
-    if confidence is None or not isinstance(confidence, (int, float)):
-        confidence = 0.75
-    obj["meta"]["parsing_confidence"] = float(confidence)
-
-    # Fix validation issues
-    # Fix country code (should be 2 characters)
-    if obj.get("identity", {}).get("location", {}).get("country"):
-        country = obj["identity"]["location"]["country"]
-        if country == "India":
-            obj["identity"]["location"]["country"] = "IN"
-        elif country == "United States":
-            obj["identity"]["location"]["country"] = "US"
-        elif country == "United Kingdom":
-            obj["identity"]["location"]["country"] = "GB"
-        elif len(country) > 2:
-            obj["identity"]["location"]["country"] = country[:2].upper()
-    
-    # Fix education score fields (remove null values)
-    for edu in obj.get("education", []):
-        if edu.get("score"):
-            if edu["score"].get("value") is None:
-                del edu["score"]["value"]
-            if edu["score"].get("scale") is None:
-                del edu["score"]["scale"]
-            if not edu["score"]:
-                del edu["score"]
-    
-    # Fix preferences salary fields (remove null values and handle type issues)
-    if obj.get("preferences", {}).get("salary"):
-        salary = obj["preferences"]["salary"]
-        if salary.get("currency") is None:
-            del salary["currency"]
-        elif isinstance(salary.get("currency"), str) and salary["currency"].upper() in ["USD", "INR", "EUR", "GBP"]:
-            # Keep currency as string if it's a valid currency code
-            pass
-        elif isinstance(salary.get("currency"), (int, float)):
-            # Keep numeric currency values
-            pass
-        else:
-            # Remove invalid currency values
-            del salary["currency"]
-            
-        if salary.get("expectation_lpa") is None:
-            del salary["expectation_lpa"]
-        elif isinstance(salary.get("expectation_lpa"), str):
-            # Try to convert string to float
-            try:
-                salary["expectation_lpa"] = float(salary["expectation_lpa"])
-            except (ValueError, TypeError):
-                del salary["expectation_lpa"]
-                
-        if not salary:
-            del obj["preferences"]["salary"]
-    
-    # Fix relocation field (convert boolean to string if needed)
-    if obj.get("preferences", {}).get("relocation") is not None:
-        relocation = obj["preferences"]["relocation"]
-        if isinstance(relocation, bool):
-            obj["preferences"]["relocation"] = "Yes" if relocation else "No"
-    
-    # Fix experience date fields (handle "Current", "Present", etc.)
-    for exp in obj.get("experience", []):
-        # Handle end_date
-        if exp.get("end_date"):
-            end_date = exp["end_date"]
-            if isinstance(end_date, str):
-                end_date_lower = end_date.lower().strip()
-                if end_date_lower in ["current", "present", "ongoing", "now"]:
-                    exp["end_date"] = None
-                    exp["current"] = True
-                elif not re.match(r'^\d{4}(-\d{2})?$', end_date_lower):
-                    # Try to extract year from the string
-                    year_match = re.search(r'\b(19|20)\d{2}\b', end_date)
-                    if year_match:
-                        exp["end_date"] = year_match.group()
-                    else:
-                        exp["end_date"] = None
-        
-        # Handle start_date
-        if exp.get("start_date"):
-            start_date = exp["start_date"]
-            if isinstance(start_date, str):
-                if not re.match(r'^\d{4}(-\d{2})?$', start_date):
-                    # Try to extract year from the string
-                    year_match = re.search(r'\b(19|20)\d{2}\b', start_date)
-                    if year_match:
-                        exp["start_date"] = year_match.group()
-                    else:
-                        exp["start_date"] = None
-    
-    # Fix skills proficiency - normalize to lowercase
-    for skill in obj.get("skills", []):
-        if skill.get("proficiency"):
-            proficiency = skill["proficiency"]
-            if isinstance(proficiency, str):
-                proficiency_lower = proficiency.lower().strip()
-                if proficiency_lower in ["beginner", "intermediate", "advanced", "expert"]:
-                    skill["proficiency"] = proficiency_lower
-                else:
-                    # Remove invalid proficiency
-                    skill["proficiency"] = None
-
-    return obj
\ No newline at end of file
+    return obj
+
+# API errors are already retried by chat_limiter; only a reply that is not
+# valid JSON (e.g. cut off at max_tokens) is worth asking for again. Retried
+# per request, so a bad part of a split document does not re-send the others.
+_retry_bad_json = retry(retry=retry_if_exception_type(json.JSONDecodeError), reraise=True,
+                        stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
+
+def _request_body(messages: list) -> dict:
+    """Chat completion parameters; also the body of offline batch requests (hr_parser.batch)."""
+    return {
+        "model": "gpt-4o-mini",
+        "messages": messages,
+        "response_format": {"type": "json_object"},
+        "temperature": 0,
+        "max_tokens": MAX_OUTPUT_TOKENS,
+    }
+
+def prepare_request(plain_text: str) -> tuple:
+    """
+    (chat completion body, sha256 of the compacted text) for one offline batch
+    request (hr_parser.batch); always the single-prompt path.
+    """
+    clipped = compact_for_prompt(plain_text)
+    return _request_body(_build_messages(clipped)), _sha256(clipped)
+
+def parse_response(content: str, source_file: str, hash_sha256: str) -> dict:
+    """Document for the reply to a prepare_request body, as the live path hands it to the service."""
+    obj = _decode_response(content)
+    obj.setdefault("meta", {}).setdefault("hash_sha256", hash_sha256)
+    return _postprocess(obj, "", source_file)
+
+@_retry_bad_json
+def _complete(messages: list) -> dict:
+    body = _request_body(messages)
+    client = get_openai()
+    resp = chat_limiter.call(lambda: client.chat.completions.create(**body), chat_tokens(body))
+    return _decode_response(resp.choices[0].message.content)
+
+@_retry_bad_json
+async def _complete_async(messages: list) -> dict:
+    body = _request_body(messages)
+    client = get_async_openai()
+    resp = await chat_limiter.call_async(lambda: client.chat.completions.create(**body), chat_tokens(body))
+    return _decode_response(resp.choices[0].message.content)
+
+def parse_with_gpt(plain_text: str, source_file: str) -> dict:
+    clipped = compact_for_prompt(plain_text)
+
+    if USE_MOCK or not OPENAI_API_KEY:
+        return _mock_response(clipped, source_file)
+
+    parts = plan_parts(clipped, RESUME_LAYOUT)
+    if len(parts) > 1:
+        obj = run_parts(parts, lambda part: _complete(_build_part_messages(part)))
+    else:
+        obj = _complete(_build_messages(clipped))
+    return _postprocess(obj, clipped, source_file)
+
+async def parse_with_gpt_async(plain_text: str, source_file: str) -> dict:
+    """Non-blocking variant of parse_with_gpt for the async service path."""
+    clipped = compact_for_prompt(plain_text)
+
+    if USE_MOCK or not OPENAI_API_KEY:
+        return _mock_response(clipped, source_file)
+
+    parts = plan_parts(clipped, RESUME_LAYOUT)
+    if len(parts) > 1:
+        obj = await run_parts_async(parts, lambda part: _complete_async(_build_part_messages(part)))
+    else:
+        obj = await _complete_async(_build_messages(clipped))
+    return _postprocess(obj, clipped, source_file)
@@ -0,0 +1,60 @@
+# hr_parser/identity.py
+"""
+Deterministic identity pre-extraction for resumes.
+
+Emails, phone numbers and LinkedIn URLs are pulled out of the extracted text
+with regexes and turned into the same dedupe keys the repository derives from
+GPT output (phone digits first, then lowercased emails). Together with a
+fingerprint of the text, that lets the resume service recognise a candidate it
+has already parsed from the same text and skip the GPT and embedding calls.
+"""
+
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional
+
+_EMAIL = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+# Runs of digits with the usual separators; filtered to 10-15 digits below.
+# Separators stay on one line: numbers on adjacent lines must not join up.
+_PHONE = re.compile(r"(?<![\w.])\+?\(?\d[\d \t().-]{8,20}\d(?![\w])")
+_LINKEDIN = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/[A-Za-z0-9_%-]+/?", re.IGNORECASE)
+# Date ranges such as 2019-2021 look like phone numbers to _PHONE
+_YEAR_RANGE = re.compile(r"^(19|20)\d{2}\D+(19|20)\d{2}$")
+
+
+def _unique(values: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(values))
+
+
+def phone_key(phone: str) -> Optional[str]:
+    # Normalize phone number (remove spaces, dashes, parentheses)
+    digits = "".join(filter(str.isdigit, phone))
+    return f"phone:{digits}" if digits else None
+
+
+def email_key(email: str) -> str:
+    return f"email:{email.lower()}"
+
+
+def resume_identity_keys(emails: Iterable[str], phones: Iterable[str]) -> List[str]:
+    """Dedupe keys in priority order: phones, then emails."""
+    keys = [k for k in (phone_key(p) for p in phones) if k]
+    keys += [email_key(e) for e in emails]
+    return _unique(keys)
+
+
+def extract_identity(text: str) -> Dict[str, List[str]]:
+    """{"emails", "phones", "linkedin"} found in the text, in order of appearance."""
+    emails = _unique(e.rstrip(".").lower() for e in _EMAIL.findall(text))
+    phones = []
+    for match in _PHONE.finditer(text):
+        raw = match.group().strip()
+        if 10 <= sum(c.isdigit() for c in raw) <= 15 and not _YEAR_RANGE.match(raw):
+            phones.append(raw)
+    linkedin = _unique(u.rstrip("/").lower() for u in _LINKEDIN.findall(text))
+    return {"emails": emails, "phones": _unique(phones), "linkedin": linkedin}
+
+
+def text_fingerprint(text: str) -> str:
+    """sha256 of the text with whitespace collapsed, stored as meta.text_sha256."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
@@ -0,0 +1,262 @@
+# hr_parser/ingest.py
+"""
+Background bulk ingestion backed by a Mongo queue.
+
+submit_ingest() stores one queue item per uploaded file and returns an
+ingest id straight away. A local pool of worker threads claims queued items
+atomically (find_one_and_update), runs them through the regular parser
+services and records the per-file result. get_ingest_status() reports
+progress, throughput and failures for an ingest id.
+
+Each claim stamps a fresh token and a heartbeat that the worker renews while
+it parses. Items whose heartbeat is older than INGEST_LEASE_SECONDS (a dead
+worker) are requeued, and a result is only recorded by the worker holding
+the current token, so a requeued file is never finished twice.
+
+Collections:
+  - ingest_jobs  : one doc per submission {kind, total, succeeded, failed, created_at, finished_at}
+  - ingest_queue : one doc per file {ingest_id, index, kind, filename, data, status, result, ...}
+"""
+
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from .config import INGEST_WORKERS, INGEST_POLL_SECONDS, INGEST_LEASE_SECONDS
+from .clients import collection
+
+ingest_jobs_col = collection("ingest_jobs")
+ingest_queue_col = collection("ingest_queue")
+
+KINDS = ("resume", "job")
+MAX_ATTEMPTS = 3
+# Stay clear of Mongo's 16 MB document limit
+MAX_FILE_BYTES = 15 * 1024 * 1024
+
+
+def submit_ingest(files: List[Tuple[bytes, str]], kind: str = "resume") -> str:
+    """Queue (data, filename) pairs for background parsing and return the ingest id."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown ingest kind: {kind}")
+
+    now = time.time()
+    job_id = ingest_jobs_col.insert_one({
+        "kind": kind, "total": len(files), "succeeded": 0, "failed": 0,
+        "created_at": now, "finished_at": None,
+    }).inserted_id
+    ingest_id = str(job_id)
+
+    items = []
+    for i, (data, filename) in enumerate(files):
+        item = {
+            "ingest_id": ingest_id, "index": i, "kind": kind, "filename": filename,
+            "size": len(data), "status": "queued", "attempts": 0, "enqueued_at": now,
+            "started_at": None, "finished_at": None, "result": None,
+        }
+        if len(data) > MAX_FILE_BYTES:
+            item.update(status="failed", finished_at=now, result={
+                "ok": False, "file": filename, "error": "File too large for background ingest"})
+        else:
+            item["data"] = data
+        items.append(item)
+
+    if items:
+        ingest_queue_col.insert_many(items)
+        rejected = sum(1 for it in items if it["status"] == "failed")
+        if rejected:
+            _record_outcome(job_id, ok=False, n=rejected)
+
+    _pool.start()
+    _pool.wake()
+    return ingest_id
+
+
+def _record_outcome(job_id: ObjectId, ok: bool, n: int = 1) -> None:
+    field = "succeeded" if ok else "failed"
+    job = ingest_jobs_col.find_one_and_update(
+        {"_id": job_id}, {"$inc": {field: n}}, return_document=ReturnDocument.AFTER)
+    if job and job["succeeded"] + job["failed"] >= job["total"]:
+        ingest_jobs_col.update_one({"_id": job_id, "finished_at": None},
+                                   {"$set": {"finished_at": time.time()}})
+
+
+def get_ingest_status(ingest_id: str) -> Optional[Dict[str, Any]]:
+    """Per-file progress, throughput and failures for one ingest id (None if unknown)."""
+    try:
+        job = ingest_jobs_col.find_one({"_id": ObjectId(ingest_id)})
+    except Exception:
+        return None
+    if not job:
+        return None
+
+    files = list(ingest_queue_col.find(
+        {"ingest_id": ingest_id},
+        {"_id": 0, "index": 1, "filename": 1, "status": 1, "attempts": 1,
+         "started_at": 1, "finished_at": 1, "result": 1},
+    ).sort("index", ASCENDING))
+
+    counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+    for f in files:
+        counts[f["status"]] = counts.get(f["status"], 0) + 1
+
+    finished = counts["done"] + counts["failed"]
+    if finished == job["total"]:
+        status = "completed"
+    elif counts["running"] or finished:
+        status = "running"
+    else:
+        status = "queued"
+
+    started = [f["started_at"] for f in files if f.get("started_at")]
+    first_start = min(started) if started else None
+    end = job.get("finished_at") or time.time()
+    elapsed = (end - first_start) if first_start else 0.0
+
+    return {
+        "ok": True,
+        "ingest_id": ingest_id,
+        "kind": job["kind"],
+        "status": status,
+        "total": job["total"],
+        "queued": counts["queued"],
+        "running": counts["running"],
+        "succeeded": counts["done"],
+        "failed": counts["failed"],
+        "elapsed_sec": round(elapsed, 2),
+        "files_per_sec": round(finished / elapsed, 3) if elapsed > 0 else 0.0,
+        "files": files,
+        "failures": [f["result"] for f in files if f["status"] == "failed" and f.get("result")],
+    }
+
+
+class IngestWorkerPool:
+    """Worker threads that drain ingest_queue through the parser services."""
+
+    def __init__(self, workers: int = INGEST_WORKERS):
+        self.workers = workers
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._services: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def start(self, services: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            if services is None and not self._services:
+                from .service import HRResumeParserService
+                from .job_service import HRJobParserService
+                services = {"resume": HRResumeParserService(), "job": HRJobParserService()}
+            if services is not None:
+                self._services = services
+            self._stop.clear()
+            for n in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"hrp-ingest-{n}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        return ingest_queue_col.find_one_and_update(
+            {"status": "queued"},
+            {"$set": {"status": "running", "started_at": now, "heartbeat_at": now, "claim": uuid.uuid4().hex},
+             "$inc": {"attempts": 1}},
+            sort=[("enqueued_at", ASCENDING), ("index", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _requeue_stale(self) -> None:
+        cutoff = time.time() - INGEST_LEASE_SECONDS
+        # Items claimed before heartbeats existed only have started_at
+        stale = {"status": "running", "$or": [{"heartbeat_at": {"$lt": cutoff}},
+                                              {"heartbeat_at": None, "started_at": {"$lt": cutoff}}]}
+        ingest_queue_col.update_many(
+            {**stale, "attempts": {"$lt": MAX_ATTEMPTS}},
+            {"$set": {"status": "queued", "claim": None}},
+        )
+        for item in ingest_queue_col.find({**stale, "attempts": {"$gte": MAX_ATTEMPTS}}, {"data": 0}):
+            self._finish(item, {"ok": False, "file": item["filename"],
+                                "error": "Worker lease expired too many times"})
+
+    def _finish(self, item: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        """Record the result if `item`'s claim is still the current one; False if it was lost."""
+        ok = bool(result.get("ok"))
+        updated = ingest_queue_col.update_one(
+            {"_id": item["_id"], "status": "running", "claim": item.get("claim")},
+            {"$set": {"status": "done" if ok else "failed", "result": result,
+                      "finished_at": time.time()},
+             "$unset": {"data": ""}},
+        )
+        if updated.modified_count:
+            _record_outcome(ObjectId(item["ingest_id"]), ok)
+            return True
+        print(f"Ingest item {item['_id']} was reclaimed by another worker; dropping this result")
+        return False
+
+    def _heartbeat(self, item: Dict[str, Any], done: threading.Event) -> None:
+        """Renew the lease on a claimed item until `done` is set or the claim is lost."""
+        while not done.wait(max(1.0, INGEST_LEASE_SECONDS / 3)):
+            try:
+                renewed = ingest_queue_col.update_one(
+                    {"_id": item["_id"], "status": "running", "claim": item["claim"]},
+                    {"$set": {"heartbeat_at": time.time()}})
+                if not renewed.matched_count:
+                    return
+            except Exception as e:
+                print(f"Ingest lease renewal failed for {item['filename']}: {e}")
+
+    def _process(self, item: Dict[str, Any]) -> None:
+        service = self._services[item["kind"]]
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(item, done),
+                                     name=f"{threading.current_thread().name}-lease", daemon=True)
+        heartbeat.start()
+        try:
+            result = service.parse_bytes(item["data"], item["filename"])
+        except Exception as e:
+            result = {"ok": False, "file": item["filename"], "error": str(e)}
+        finally:
+            done.set()
+        self._finish(item, result)
+
+    def _run(self) -> None:
+        # Queue indexes are created by repository.ensure_indexes at startup
+        while not self._stop.is_set():
+            try:
+                item = self._claim()
+                if item is None:
+                    self._requeue_stale()
+                    self._wake.wait(INGEST_POLL_SECONDS)
+                    self._wake.clear()
+                    continue
+                self._process(item)
+            except Exception as e:
+                print(f"Ingest worker error: {e}")
+                self._stop.wait(INGEST_POLL_SECONDS)
+
+
+_pool = IngestWorkerPool()
+
+
+def start_ingest_workers(services: Optional[Dict[str, Any]] = None) -> None:
+    """Start the worker threads, reusing the app's parser services when given."""
+    _pool.start(services)
+
+
+def stop_ingest_workers() -> None:
+    _pool.stop()
@@ -1,9 +1,11 @@
 # hr_parser/job_gpt_client.py
-import os, time, hashlib, json, re
-from tenacity import retry, stop_after_attempt, wait_exponential
-from openai import OpenAI
-from .config import OPENAI_API_KEY, MAX_INPUT_CHARS, MAX_OUTPUT_TOKENS, USE_MOCK
-from .job_schemas import CanonicalJobDescription
+import time, hashlib, json
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from .clients import get_openai, get_async_openai
+from .compaction import compact_for_prompt
+from .ratelimit import chat_limiter, chat_tokens
+from .sections import JOB_LAYOUT, plan_parts, run_parts, run_parts_async
+from .config import OPENAI_API_KEY, MAX_OUTPUT_TOKENS, USE_MOCK, PARSER_VERSION
 
 SYSTEM_PROMPT = (
     "You are an expert job description parser. Analyze the ENTIRE document carefully to extract ALL information accurately. "
@@ -56,7 +58,7 @@ def _mock_job_response(plain_text: str, source_file: str) -> dict:
     return {
         "meta": {
             "canonical_version": "1.0",
-            "parser_version": "hrx-0.1.0",
+            "parser_version": PARSER_VERSION,
             "ingested_at": now_iso,
             "source_file": source_file,
             "source_mime": "text/plain",
@@ -116,16 +118,8 @@ def _mock_job_response(plain_text: str, source_file: str) -> dict:
         "dedupe": {"keys": []},
     }
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
-def parse_job_with_gpt(plain_text: str, source_file: str) -> dict:
-    clipped = plain_text[:MAX_INPUT_CHARS]
-
-    if USE_MOCK or not OPENAI_API_KEY:
-        return _mock_job_response(clipped, source_file)
-
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
-    messages = [
+def _build_messages(clipped: str) -> list:
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
         {
             "role": "user",
@@ -154,16 +148,30 @@ def parse_job_with_gpt(plain_text: str, source_file: str) -> dict:
         },
     ]
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        response_format={"type": "json_object"},
-        temperature=0,
-        max_tokens=MAX_OUTPUT_TOKENS,
-    )
+def _build_part_messages(part: dict) -> list:
+    """Prompt for one part of a long job description split by hr_parser.sections."""
+    if part["keys"] is None:
+        scope = ("This is a long job description with some sections removed; they are parsed separately. "
+                 "Extract every key you can from the text below.")
+    else:
+        scope = (f"This is one part of the {part['name']} section of a long job description; the rest is parsed separately. "
+                 f"Return only these keys: {', '.join(part['keys'])}.")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"{scope} Return only valid JSON (no code fence, no prose)."
+                f"\n\nSchema:\n{SCHEMA_HINT}\n\nJob description text:\n{part['text']}"
+            ),
+        },
+    ]
 
-    raw = resp.choices[0].message.content
+# Changes whenever the prompt text changes; recorded with ingest fingerprints
+PROMPT_VERSION = _sha256(json.dumps(_build_messages("") + _build_part_messages(
+    {"name": "", "keys": [], "text": ""})))[:12]
 
+def _decode_response(raw: str) -> dict:
     # Clean up the response
     if raw:
         # Remove any markdown code blocks
@@ -181,157 +189,88 @@ def parse_job_with_gpt(plain_text: str, source_file: str) -> dict:
         print(f"Raw response (first 1000 chars): {raw[:1000]}")
         print(f"Raw response (last 500 chars): {raw[-500:]}")
         raise
+    return obj
 
-    # Inject standard meta if missing
+def _postprocess(obj: dict, clipped: str, source_file: str) -> dict:
+    """
+    Inject the standard meta fields; the remaining fixes of GPT output run as
+    validators in one pass in the service's _finalize (see job_schemas.py).
+    """
     obj.setdefault("meta", {})
     obj["meta"].setdefault("canonical_version", "1.0")
-    obj["meta"].setdefault("parser_version", "hrx-0.1.0")
+    obj["meta"].setdefault("parser_version", PARSER_VERSION)
     obj["meta"].setdefault("ingested_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
     obj["meta"].setdefault("source_file", source_file)
     obj["meta"].setdefault("hash_sha256", _sha256(clipped))
-    # Ensure parsing_confidence is always a valid number
-    confidence = obj["meta"].get("parsing_confidence")
-    if confidence is None or not isinstance(confidence, (int, float)):
-        confidence = 0.75
-    obj["meta"]["parsing_confidence"] = float(confidence)
+    return obj
 
-    # Fix validation issues
-    # Fix country code (should be 2 characters)
-    if obj.get("location", {}).get("country"):
-        country = obj["location"]["country"]
-        if country == "United States":
-            obj["location"]["country"] = "US"
-        elif country == "United Kingdom":
-            obj["location"]["country"] = "GB"
-        elif country == "India":
-            obj["location"]["country"] = "IN"
-        elif len(country) > 2:
-            obj["location"]["country"] = country[:2].upper()
+# API errors are already retried by chat_limiter; only a reply that is not
+# valid JSON (e.g. cut off at max_tokens) is worth asking for again. Retried
+# per request, so a bad part of a split document does not re-send the others.
+_retry_bad_json = retry(retry=retry_if_exception_type(json.JSONDecodeError), reraise=True,
+                        stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
 
-    # Fix compensation fields (remove null values and handle type issues)
-    if obj.get("compensation", {}).get("salary_min") is None:
-        del obj["compensation"]["salary_min"]
-    if obj.get("compensation", {}).get("salary_max") is None:
-        del obj["compensation"]["salary_max"]
-    if obj.get("compensation", {}).get("currency") is None:
-        del obj["compensation"]["currency"]
-    if obj.get("compensation", {}).get("equity") is None:
-        del obj["compensation"]["equity"]
+def _request_body(messages: list) -> dict:
+    """Chat completion parameters; also the body of offline batch requests (hr_parser.batch)."""
+    return {
+        "model": "gpt-4o-mini",
+        "messages": messages,
+        "response_format": {"type": "json_object"},
+        "temperature": 0,
+        "max_tokens": MAX_OUTPUT_TOKENS,
+    }
 
-    # Fix application deadline format
-    if obj.get("application", {}).get("application_deadline"):
-        deadline = obj["application"]["application_deadline"]
-        if isinstance(deadline, str):
-            # Try to extract year from the string
-            year_match = re.search(r'\b(19|20)\d{2}\b', deadline)
-            if year_match:
-                obj["application"]["application_deadline"] = year_match.group()
-            else:
-                obj["application"]["application_deadline"] = None
+def prepare_request(plain_text: str) -> tuple:
+    """
+    (chat completion body, sha256 of the compacted text) for one offline batch
+    request (hr_parser.batch); always the single-prompt path.
+    """
+    clipped = compact_for_prompt(plain_text)
+    return _request_body(_build_messages(clipped)), _sha256(clipped)
 
-    # Fix employment type
-    if obj.get("details", {}).get("employment_type"):
-        emp_type = obj["details"]["employment_type"]
-        if isinstance(emp_type, str):
-            emp_type_lower = emp_type.lower().strip()
-            valid_type = None
-            if emp_type_lower in ["full-time", "full time", "fulltime"]:
-                valid_type = "full_time"
-            elif emp_type_lower in ["part-time", "part time", "parttime"]:
-                valid_type = "part_time"
-            elif emp_type_lower in ["contractor", "contract"]:
-                valid_type = "contract"
-            elif emp_type_lower in ["intern", "internship"]:
-                valid_type = "internship"
-            elif emp_type_lower in ["temp", "temporary"]:
-                valid_type = "temporary"
-            
-            if valid_type:
-                obj["details"]["employment_type"] = valid_type
-            else:
-                # If invalid value, set to None
-                obj["details"]["employment_type"] = None
-    
-    # Fix travel_required to be boolean or None
-    if "details" in obj:
-        if "travel_required" in obj["details"]:
-            travel = obj["details"]["travel_required"]
-            if travel is None:
-                pass  # Keep as None
-            elif isinstance(travel, bool):
-                pass  # Already boolean
-            elif isinstance(travel, str):
-                travel_lower = travel.lower().strip()
-                if travel_lower in ["yes", "true", "required", "1"]:
-                    obj["details"]["travel_required"] = True
-                elif travel_lower in ["no", "false", "not required", "0"]:
-                    obj["details"]["travel_required"] = False
-                else:
-                    obj["details"]["travel_required"] = None
-            else:
-                obj["details"]["travel_required"] = None
-    
-    # Fix visa_sponsorship to be boolean or None
-    if "details" in obj and "visa_sponsorship" in obj["details"]:
-        visa = obj["details"]["visa_sponsorship"]
-        if not isinstance(visa, (bool, type(None))):
-            if isinstance(visa, str):
-                visa_lower = visa.lower().strip()
-                if visa_lower in ["yes", "true", "available", "1"]:
-                    obj["details"]["visa_sponsorship"] = True
-                elif visa_lower in ["no", "false", "not available", "0"]:
-                    obj["details"]["visa_sponsorship"] = False
-                else:
-                    obj["details"]["visa_sponsorship"] = None
-            else:
-                obj["details"]["visa_sponsorship"] = None
-    
-    # Fix remote and hybrid to be boolean or None
-    if "location" in obj:
-        for field in ["remote", "hybrid"]:
-            if field in obj["location"]:
-                value = obj["location"][field]
-                if not isinstance(value, (bool, type(None))):
-                    if isinstance(value, str):
-                        value_lower = value.lower().strip()
-                        if value_lower in ["yes", "true", "1"]:
-                            obj["location"][field] = True
-                        elif value_lower in ["no", "false", "0"]:
-                            obj["location"][field] = False
-                        else:
-                            obj["location"][field] = None
-                    else:
-                        obj["location"][field] = None
+def parse_response(content: str, source_file: str, hash_sha256: str) -> dict:
+    """Document for the reply to a prepare_request body, as the live path hands it to the service."""
+    obj = _decode_response(content)
+    obj.setdefault("meta", {}).setdefault("hash_sha256", hash_sha256)
+    return _postprocess(obj, "", source_file)
 
-    # Ensure all required nested objects exist with defaults
-    obj.setdefault("company", {})
-    obj.setdefault("details", {})
-    obj.setdefault("location", {})
-    obj.setdefault("requirements", {})
-    obj.setdefault("compensation", {})
-    obj.setdefault("application", {})
-    obj.setdefault("responsibilities", [])
-    obj.setdefault("qualifications", [])
-    obj.setdefault("benefits", [])
-    obj.setdefault("growth_opportunities", [])
-    obj.setdefault("dedupe", {"keys": []})
+@_retry_bad_json
+def _complete(messages: list) -> dict:
+    body = _request_body(messages)
+    client = get_openai()
+    resp = chat_limiter.call(lambda: client.chat.completions.create(**body), chat_tokens(body))
+    return _decode_response(resp.choices[0].message.content)
 
-    # Fix education level
-    if obj.get("requirements", {}).get("education_level"):
-        edu_level = obj["requirements"]["education_level"]
-        if isinstance(edu_level, str):
-            edu_level_lower = edu_level.lower().strip()
-            if edu_level_lower in ["high school", "highschool"]:
-                obj["requirements"]["education_level"] = "high_school"
-            elif edu_level_lower in ["associate", "associates"]:
-                obj["requirements"]["education_level"] = "associate"
-            elif edu_level_lower in ["bachelor", "bachelors", "bachelor's", "bs", "ba"]:
-                obj["requirements"]["education_level"] = "bachelor"
-            elif edu_level_lower in ["master", "masters", "master's", "ms", "ma"]:
-                obj["requirements"]["education_level"] = "master"
-            elif edu_level_lower in ["phd", "ph.d", "doctorate"]:
-                obj["requirements"]["education_level"] = "phd"
-            elif edu_level_lower in ["none", "no degree"]:
-                obj["requirements"]["education_level"] = "none"
+@_retry_bad_json
+async def _complete_async(messages: list) -> dict:
+    body = _request_body(messages)
+    client = get_async_openai()
+    resp = await chat_limiter.call_async(lambda: client.chat.completions.create(**body), chat_tokens(body))
+    return _decode_response(resp.choices[0].message.content)
 
-    return obj
+def parse_job_with_gpt(plain_text: str, source_file: str) -> dict:
+    clipped = compact_for_prompt(plain_text)
+
+    if USE_MOCK or not OPENAI_API_KEY:
+        return _mock_job_response(clipped, source_file)
+
+    parts = plan_parts(clipped, JOB_LAYOUT)
+    if len(parts) > 1:
+        obj = run_parts(parts, lambda part: _complete(_build_part_messages(part)))
+    else:
+        obj = _complete(_build_messages(clipped))
+    return _postprocess(obj, clipped, source_file)
+
+async def parse_job_with_gpt_async(plain_text: str, source_file: str) -> dict:
+    """Non-blocking variant of parse_job_with_gpt for the async service path."""
+    clipped = compact_for_prompt(plain_text)
+
+    if USE_MOCK or not OPENAI_API_KEY:
+        return _mock_job_response(clipped, source_file)
+
+    parts = plan_parts(clipped, JOB_LAYOUT)
+    if len(parts) > 1:
+        obj = await run_parts_async(parts, lambda part: _complete_async(_build_part_messages(part)))
+    else:
+        obj = await _complete_async(_build_messages(clipped))
+    return _postprocess(obj, clipped, source_file)
@@ -1,7 +1,42 @@
-from pydantic import BaseModel, EmailStr, conint, confloat, constr
-from typing import List, Optional, Dict, Literal, Union
+import re
+from pydantic import TypeAdapter, conint, confloat, constr, field_validator, model_validator
+from typing import Any, List, Optional, Dict, Literal, Union
+from .schemas import CanonicalModel, Email, country_code, year_or_none
 
-class JobMeta(BaseModel):
+# As in schemas.py, GPT output is normalised by the "before" validators (see validate_job)
+
+EMPLOYMENT_TYPES = {
+    "full-time": "full_time", "full time": "full_time", "fulltime": "full_time",
+    "part-time": "part_time", "part time": "part_time", "parttime": "part_time",
+    "contractor": "contract", "contract": "contract",
+    "intern": "internship", "internship": "internship",
+    "temp": "temporary", "temporary": "temporary",
+}
+EDUCATION_LEVELS = {
+    "high school": "high_school", "highschool": "high_school",
+    "associate": "associate", "associates": "associate",
+    "bachelor": "bachelor", "bachelors": "bachelor", "bachelor's": "bachelor", "bs": "bachelor", "ba": "bachelor",
+    "master": "master", "masters": "master", "master's": "master", "ms": "master", "ma": "master",
+    "phd": "phd", "ph.d": "phd", "doctorate": "phd",
+    "none": "none", "no degree": "none",
+}
+_DEADLINE = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?$")
+
+
+def flag(value: Any, yes=("yes", "true", "1"), no=("no", "false", "0")) -> Optional[bool]:
+    """Booleans pass, yes/no style strings are converted, anything else is None."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        value = value.lower().strip()
+        if value in yes:
+            return True
+        if value in no:
+            return False
+    return None
+
+
+class JobMeta(CanonicalModel):
     canonical_version: str = "1.0"
     parser_version: str = "hrx-0.1.0"
     ingested_at: Optional[str] = None
@@ -10,22 +45,40 @@ class JobMeta(BaseModel):
     parsing_confidence: confloat(ge=0, le=1) = 0.0
     language: Optional[str] = "en"
     hash_sha256: Optional[str] = None
+    file_sha256: Optional[str] = None
+    text_sha256: Optional[str] = None
+    prompt_version: Optional[str] = None
 
-class JobLocation(BaseModel):
+    @field_validator("parsing_confidence", mode="before")
+    @classmethod
+    def _confidence(cls, v):
+        return float(v) if isinstance(v, (int, float)) else 0.75
+
+class JobLocation(CanonicalModel):
     city: Optional[str] = None
     state: Optional[str] = None
     country: Optional[constr(min_length=2, max_length=2)] = None
     remote: Optional[bool] = None
     hybrid: Optional[bool] = None
 
-class JobCompany(BaseModel):
+    @field_validator("country", mode="before")
+    @classmethod
+    def _country(cls, v):
+        return country_code(v)
+
+    @field_validator("remote", "hybrid", mode="before")
+    @classmethod
+    def _flags(cls, v):
+        return flag(v)
+
+class JobCompany(CanonicalModel):
     name: Optional[str] = None
     industry: Optional[str] = None
     size: Optional[str] = None  # e.g., "1-10", "11-50", "51-200", "201-1000", "1000+"
     website: Optional[str] = None
     description: Optional[str] = None
 
-class JobRequirements(BaseModel):
+class JobRequirements(CanonicalModel):
     experience_years: Optional[conint(ge=0, le=50)] = None
     education_level: Optional[Literal["high_school", "associate", "bachelor", "master", "phd", "none"]] = None
     required_skills: List[str] = []
@@ -33,14 +86,21 @@ class JobRequirements(BaseModel):
     certifications: List[str] = []
     languages: List[str] = []
 
-class JobCompensation(BaseModel):
+    @field_validator("education_level", mode="before")
+    @classmethod
+    def _education_level(cls, v):
+        if isinstance(v, str):
+            return EDUCATION_LEVELS.get(v.lower().strip(), v)
+        return v
+
+class JobCompensation(CanonicalModel):
     salary_min: Optional[confloat(ge=0)] = None
     salary_max: Optional[confloat(ge=0)] = None
     currency: Optional[str] = None
     equity: Optional[bool] = None
     benefits: List[str] = []
 
-class JobDetails(BaseModel):
+class JobDetails(CanonicalModel):
     title: Optional[str] = None
     department: Optional[str] = None
     employment_type: Optional[Literal["full_time", "part_time", "contract", "internship", "temporary"]] = None
@@ -48,20 +108,43 @@ class JobDetails(BaseModel):
     travel_required: Optional[bool] = None
     visa_sponsorship: Optional[bool] = None
 
-class JobApplication(BaseModel):
-    contact_email: Optional[EmailStr] = None
+    @field_validator("employment_type", mode="before")
+    @classmethod
+    def _employment_type(cls, v):
+        if isinstance(v, str):
+            v = v.lower().strip()
+            return v if v in EMPLOYMENT_TYPES.values() else EMPLOYMENT_TYPES.get(v)
+        return v
+
+    @field_validator("travel_required", mode="before")
+    @classmethod
+    def _travel(cls, v):
+        return flag(v, yes=("yes", "true", "required", "1"), no=("no", "false", "not required", "0"))
+
+    @field_validator("visa_sponsorship", mode="before")
+    @classmethod
+    def _visa(cls, v):
+        return flag(v, yes=("yes", "true", "available", "1"), no=("no", "false", "not available", "0"))
+
+class JobApplication(CanonicalModel):
+    contact_email: Optional[Email] = None
     application_url: Optional[str] = None
     application_deadline: Optional[constr(pattern=r"^\d{4}(-\d{2}(-\d{2})?)?$")] = None
     application_method: Optional[str] = None  # e.g., "email", "website", "linkedin"
 
-class CanonicalJobDescription(BaseModel):
+    @field_validator("application_deadline", mode="before")
+    @classmethod
+    def _deadline(cls, v):
+        return year_or_none(v, _DEADLINE)
+
+class CanonicalJobDescription(CanonicalModel):
     meta: JobMeta
-    company: JobCompany
-    details: JobDetails
-    location: JobLocation
-    requirements: JobRequirements
-    compensation: JobCompensation
-    application: JobApplication
+    company: JobCompany = JobCompany()
+    details: JobDetails = JobDetails()
+    location: JobLocation = JobLocation()
+    requirements: JobRequirements = JobRequirements()
+    compensation: JobCompensation = JobCompensation()
+    application: JobApplication = JobApplication()
     description: Optional[str] = None
     responsibilities: List[str] = []
     qualifications: List[str] = []
@@ -69,3 +152,26 @@ class CanonicalJobDescription(BaseModel):
     culture: Optional[str] = None
     growth_opportunities: List[str] = []
     dedupe: Dict[str, List[str]] = {"keys": []}
+
+    @model_validator(mode="before")
+    @classmethod
+    def _sections(cls, data):
+        # Stored jobs have always carried every section, if only empty
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)
+        for key in ("company", "details", "location", "requirements", "compensation", "application"):
+            data.setdefault(key, {})
+        for key in ("responsibilities", "qualifications", "benefits", "growth_opportunities"):
+            data.setdefault(key, [])
+        data.setdefault("dedupe", {"keys": []})
+        return data
+
+
+# Built once at import; validating through it avoids per-call schema lookups
+JOB_ADAPTER = TypeAdapter(CanonicalJobDescription)
+
+
+def validate_job(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Like validate_resume: one pass, and only keys present in `obj` (plus the sections) are written back."""
+    return JOB_ADAPTER.validate_python(obj).model_dump(exclude_unset=True)
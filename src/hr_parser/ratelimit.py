@@ -0,0 +1,256 @@
+# hr_parser/ratelimit.py
+"""
+Process-wide client-side flow control for OpenAI calls.
+
+One AdaptiveLimiter per API family (chat, embeddings) is shared by every
+caller in the process: sync services, async services, bulk threads and the
+embedding cache. Each limiter combines
+
+  - two token buckets, requests/minute and tokens/minute, refilled
+    continuously; a call reserves its estimated tokens before it is sent and
+    the estimate is corrected from the response usage afterwards
+  - an AIMD concurrency window: +1/window per success, halved once per
+    429 cooldown episode
+  - a shared cooldown: a 429 pauses every caller of that family for the
+    server's Retry-After (or an exponential backoff without one)
+
+so bulk load runs close to the quota instead of bursting into 429s and then
+idling in per-call backoff. Limits of 0 switch the matching budget off.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app import metrics
+from .compaction import count_tokens
+from .config import (
+    CHAT_RPM, CHAT_TPM, CHAT_MAX_CONCURRENCY,
+    EMBED_RPM, EMBED_TPM, EMBED_MAX_CONCURRENCY, RATE_LIMIT_RETRIES,
+)
+
+_POLL_SECONDS = 0.05
+_DEFAULT_BACKOFF = 1.0
+_MAX_BACKOFF = 60.0
+
+
+class TokenBucket:
+    """Continuously refilled budget of `per_minute` units, one minute deep."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._stamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._stamp) * self.per_minute / 60.0)
+        self._stamp = now
+
+    def wait_time(self, n: float, now: float) -> float:
+        """Seconds until `n` units are available (0 when unlimited)."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        n = min(n, self.capacity)
+        return 0.0 if self.level >= n else (n - self.level) * 60.0 / self.per_minute
+
+    def take(self, n: float) -> None:
+        if self.per_minute > 0:
+            self.level -= min(n, self.capacity)
+
+    def give_back(self, n: float) -> None:
+        if self.per_minute > 0:
+            self.level = min(self.capacity, self.level + n)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from the Retry-After(-ms) header of an API error, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _is_rate_limited(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """429s, 5xx and connection errors; the SDK's own retries are off (see clients.py)."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class AdaptiveLimiter:
+    """RPM/TPM token buckets plus an AIMD concurrency window and a shared 429 cooldown."""
+
+    def __init__(self, name: str, rpm: int, tpm: int, max_concurrency: int, min_concurrency: int = 1):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.window = float(self.max_concurrency)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self._strikes = 0
+        self._lock = threading.Lock()
+
+    # --- admission --------------------------------------------------------------
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take a slot and the budgets and return 0, or return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.cooldown_until:
+                return self.cooldown_until - now
+            if self.in_flight >= int(self.window):
+                return _POLL_SECONDS
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self, tokens: int) -> None:
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                break
+            wait = min(wait, 1.0)
+            time.sleep(wait)
+            waited += wait
+        metrics.incr(f"ratelimit.{self.name}.wait_ms", int(waited * 1000))
+
+    async def acquire_async(self, tokens: int) -> None:
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                break
+            wait = min(wait, 1.0)
+            await asyncio.sleep(wait)
+            waited += wait
+        metrics.incr(f"ratelimit.{self.name}.wait_ms", int(waited * 1000))
+
+    # --- feedback ---------------------------------------------------------------
+
+    def release(self, reserved: int, used: Optional[int] = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if used is not None and used < reserved:
+                self.tokens.give_back(reserved - used)
+            if error is not None and _is_rate_limited(error):
+                now = time.monotonic()
+                delay = _retry_after(error)
+                if now >= self.cooldown_until:
+                    # First 429 of an episode; the rest of the in-flight burst
+                    # failing during the cooldown must not halve again
+                    self.window = max(float(self.min_concurrency), self.window / 2)
+                    self._strikes += 1
+                    if delay is None:
+                        delay = min(_MAX_BACKOFF, _DEFAULT_BACKOFF * 2 ** (self._strikes - 1))
+                if delay is not None:
+                    self.cooldown_until = max(self.cooldown_until, now + delay)
+                metrics.incr(f"ratelimit.{self.name}.throttled")
+            elif error is None:
+                self._strikes = 0
+                self.window = min(float(self.max_concurrency), self.window + 1.0 / self.window)
+        metrics.incr(f"ratelimit.{self.name}.requests")
+
+    @contextmanager
+    def slot(self, tokens: int):
+        """Hold one admitted request; set `.used` on the yielded dict from the response usage."""
+        self.acquire(tokens)
+        usage: Dict[str, Any] = {"used": None}
+        try:
+            yield usage
+        except BaseException as e:
+            self.release(tokens, error=e)
+            raise
+        self.release(tokens, used=usage["used"])
+
+    @asynccontextmanager
+    async def slot_async(self, tokens: int):
+        await self.acquire_async(tokens)
+        usage: Dict[str, Any] = {"used": None}
+        try:
+            yield usage
+        except BaseException as e:
+            self.release(tokens, error=e)
+            raise
+        self.release(tokens, used=usage["used"])
+
+    # --- calls ------------------------------------------------------------------
+
+    def call(self, fn: Callable[[], Any], tokens: int) -> Any:
+        """
+        Run fn() under the limiter. 429s are retried once the shared cooldown
+        has passed, 5xx and connection errors after an exponential backoff.
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                with self.slot(tokens) as usage:
+                    resp = fn()
+                    usage["used"] = _used_tokens(resp)
+                    return resp
+            except Exception as e:
+                if not _is_retryable(e) or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                if not _is_rate_limited(e):
+                    time.sleep(min(_MAX_BACKOFF, _DEFAULT_BACKOFF * 2 ** attempt))
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        """Async variant of call."""
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                async with self.slot_async(tokens) as usage:
+                    resp = await fn()
+                    usage["used"] = _used_tokens(resp)
+                    return resp
+            except Exception as e:
+                if not _is_retryable(e) or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                if not _is_rate_limited(e):
+                    await asyncio.sleep(min(_MAX_BACKOFF, _DEFAULT_BACKOFF * 2 ** attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"window": round(self.window, 2), "in_flight": self.in_flight,
+                    "cooldown_seconds": round(max(0.0, self.cooldown_until - time.monotonic()), 2)}
+
+
+def _used_tokens(resp: Any) -> Optional[int]:
+    usage = getattr(resp, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def chat_tokens(body: Dict[str, Any]) -> int:
+    """Tokens a chat request counts against TPM: the prompt plus max_tokens."""
+    prompt = sum(count_tokens(m.get("content") or "") + 4 for m in body.get("messages", []))
+    return prompt + int(body.get("max_tokens") or 0)
+
+
+def embedding_tokens(inputs) -> int:
+    return sum(count_tokens(text) for text in inputs)
+
+
+chat_limiter = AdaptiveLimiter("chat", CHAT_RPM, CHAT_TPM, CHAT_MAX_CONCURRENCY)
+embeddings_limiter = AdaptiveLimiter("embeddings", EMBED_RPM, EMBED_TPM, EMBED_MAX_CONCURRENCY)
+
+
+def limiter_stats() -> Dict[str, Any]:
+    return {"chat": chat_limiter.stats(), "embeddings": embeddings_limiter.stats()}
@@ -1,86 +1,87 @@
-from pymongo import MongoClient
-from .config import MONGODB_URI, DB_NAME
+import asyncio, time
+from typing import Dict, List, Optional, Union
+from bson import ObjectId
+from pymongo import ASCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from .config import PARSER_VERSION
+from .clients import database, collection, async_collection
+from .identity import resume_identity_keys
+from app.ml.ann import candidate_index
+from app.ml.snapshot import candidate_snapshot, job_snapshot
+from app.scoring.score import candidate_vec, job_vec
 
-_client = MongoClient(MONGODB_URI)
-_db = _client[DB_NAME]
+_db = database()
 
-canon_col = _db["resumes_canonical"]
-jobs_col = _db["jobs_canonical"]
+canon_col = collection("resumes_canonical")
+jobs_col = collection("jobs_canonical")
+# { kind, file_sha256, parser_version, prompt_version, doc_id, parsing_confidence, recorded_at }
+fingerprints_col = collection("ingest_fingerprints")
 
-def upsert_canonical(doc: dict) -> str:
+# Async handles for the non-blocking service path (same collections)
+acanon_col = async_collection("resumes_canonical")
+ajobs_col = async_collection("jobs_canonical")
+afingerprints_col = async_collection("ingest_fingerprints")
+
+_DOC_COLS = {"resume": (canon_col, acanon_col), "job": (jobs_col, ajobs_col)}
+
+def _index_specs() -> list:
+    # app.ml.embeddings imports hr_parser.clients, which loads this package
+    from app.ml.embeddings import cache_index_specs
+    return [
+        (fingerprints_col,
+         [("kind", ASCENDING), ("file_sha256", ASCENDING),
+          ("parser_version", ASCENDING), ("prompt_version", ASCENDING)],
+         {"unique": True}),
+        # dedupe lookups: one $in over dedupe.keys per upsert
+        (canon_col, [("dedupe.keys", ASCENDING)], {}),
+        (jobs_col, [("dedupe.keys", ASCENDING)], {}),
+        # one score per (job, candidate) pair; score writes are unordered bulk upserts
+        (_db["scores"], [("job_id", ASCENDING), ("candidate_id", ASCENDING)], {"unique": True}),
+        # embedding cache lookups by (model, text_sha), plus its optional TTL / size-cap index
+        *cache_index_specs(),
+        # background ingest: workers claim by (status, enqueued_at), status polls by ingest_id
+        (_db["ingest_queue"], [("status", ASCENDING), ("enqueued_at", ASCENDING)], {}),
+        (_db["ingest_queue"], [("ingest_id", ASCENDING), ("index", ASCENDING)], {}),
+    ]
+
+def ensure_indexes() -> None:
+    """Create the indexes the ingest and scoring paths rely on. Idempotent; run at app startup."""
+    for col, keys, opts in _index_specs():
+        try:
+            col.create_index(keys, **opts)
+        except Exception as e:
+            print(f"Index creation failed on {col.name} {keys}: {e}")
+
+def _resume_lookup_keys(doc: dict) -> List[str]:
     """
-    Upsert canonical resume with phone number as primary deduplication key.
+    Set dedupe keys on a canonical resume and return the keys to look up, in priority order.
     Priority: phone > email > hash
     """
-    emails = [e.lower() for e in (doc.get("identity", {}).get("emails") or [])]
-    phones = doc.get("identity", {}).get("phones") or []
+    identity = doc.get("identity", {})
+    # Phone numbers (primary key), then email addresses (secondary)
+    keys = resume_identity_keys(identity.get("emails") or [], identity.get("phones") or [])
     
-    # Create deduplication keys with phone as primary
-    keys = []
-    
-    # 1. Phone numbers (primary key)
-    for phone in phones:
-        # Normalize phone number (remove spaces, dashes, parentheses)
-        normalized_phone = ''.join(filter(str.isdigit, phone))
-        if normalized_phone:
-            keys.append(f"phone:{normalized_phone}")
-    
-    # 2. Email addresses (secondary)
-    for email in emails:
-        keys.append(f"email:{email}")
-    
-    # 3. Hash as fallback
+    # Hash as fallback
+    hash_key = f"hash:{doc['meta'].get('hash_sha256','')}"
     if not keys:
-        keys = [f"hash:{doc['meta'].get('hash_sha256','')}"]
+        keys = [hash_key]
     
     # Set dedupe keys in the document
     doc.setdefault("dedupe", {})
     doc["dedupe"]["keys"] = list(set(keys))
     
-    # Try to find existing record by phone first, then email, then hash
-    existing_doc = None
-    
-    # Search by phone numbers first (primary deduplication)
-    if phones:
-        for phone in phones:
-            normalized_phone = ''.join(filter(str.isdigit, phone))
-            if normalized_phone:
-                existing_doc = canon_col.find_one({"dedupe.keys": f"phone:{normalized_phone}"})
-                if existing_doc:
-                    break
-    
-    # If no phone match, search by email
-    if not existing_doc and emails:
-        for email in emails:
-            existing_doc = canon_col.find_one({"dedupe.keys": f"email:{email}"})
-            if existing_doc:
-                break
-    
-    # If still no match, search by hash
-    if not existing_doc:
-        hash_key = f"hash:{doc['meta'].get('hash_sha256','')}"
-        existing_doc = canon_col.find_one({"dedupe.keys": hash_key})
-    
-    if existing_doc:
-        # Update existing document
-        result = canon_col.find_one_and_update(
-            {"_id": existing_doc["_id"]},
-            {"$set": doc},
-            return_document=True
-        )
-        return str(result["_id"])
-    else:
-        # Insert new document
-        result = canon_col.insert_one(doc)
-        return str(result.inserted_id)
+    # Search by phone numbers first, then email, then hash
+    lookup = [k for k in keys if k != hash_key]
+    lookup.append(hash_key)
+    return lookup
 
-def upsert_job(doc: dict) -> str:
+def _job_lookup_keys(doc: dict) -> List[str]:
     """
-    Upsert canonical job description with company name and job title as primary deduplication key.
-    Priority: company+title > company+hash > hash
+    Set dedupe keys on a canonical job and return the keys to look up, in priority order.
+    Priority: company+title > company > hash
     """
-    company_name = doc.get("company", {}).get("name", "").lower().strip()
-    job_title = doc.get("details", {}).get("title", "").lower().strip()
+    company_name = (doc.get("company", {}).get("name") or "").lower().strip()
+    job_title = (doc.get("details", {}).get("title") or "").lower().strip()
     
     # Create deduplication keys
     keys = []
@@ -93,39 +94,272 @@ def upsert_job(doc: dict) -> str:
     if company_name:
         keys.append(f"company:{company_name}")
     
-    # 3. Hash as fallback
+    # Hash as fallback
+    hash_key = f"hash:{doc['meta'].get('hash_sha256','')}"
     if not keys:
-        keys = [f"hash:{doc['meta'].get('hash_sha256','')}"]
+        keys = [hash_key]
     
     # Set dedupe keys in the document
     doc.setdefault("dedupe", {})
     doc["dedupe"]["keys"] = list(set(keys))
     
-    # Try to find existing record by company+title first, then company, then hash
-    existing_doc = None
-    
-    # Search by company + title first (primary deduplication)
-    if company_name and job_title:
-        existing_doc = jobs_col.find_one({"dedupe.keys": f"company_title:{company_name}_{job_title}"})
-    
-    # If no company+title match, search by company
-    if not existing_doc and company_name:
-        existing_doc = jobs_col.find_one({"dedupe.keys": f"company:{company_name}"})
-    
-    # If still no match, search by hash
-    if not existing_doc:
-        hash_key = f"hash:{doc['meta'].get('hash_sha256','')}"
-        existing_doc = jobs_col.find_one({"dedupe.keys": hash_key})
-    
+    lookup = [k for k in keys if k != hash_key]
+    lookup.append(hash_key)
+    return lookup
+
+def _dedupe_query(lookup: List[str]) -> dict:
+    return {"dedupe.keys": {"$in": lookup}}
+
+def _best_match(candidates: List[dict], lookup: List[str]) -> Optional[dict]:
+    """
+    Pick the existing doc matched by the highest-priority lookup key (the
+    order of `lookup`); ties go to the oldest doc, as the per-key find_one did.
+    """
+    rank = {key: i for i, key in enumerate(lookup)}
+    best, best_rank = None, None
+    for cand in candidates:
+        r = min((rank[k] for k in (cand.get("dedupe") or {}).get("keys", []) if k in rank), default=None)
+        if r is None:
+            continue
+        if best is None or (r, cand["_id"]) < (best_rank, best["_id"]):
+            best, best_rank = cand, r
+    return best
+
+def _upsert(col, doc: dict, lookup: List[str]) -> str:
+    # One $in over every dedupe key, ranked by priority here
+    existing_doc = _best_match(list(col.find(_dedupe_query(lookup), {"dedupe.keys": 1})), lookup)
+
     if existing_doc:
         # Update existing document
-        result = jobs_col.find_one_and_update(
-            {"_id": existing_doc["_id"]},
-            {"$set": doc},
-            return_document=True
-        )
-        return str(result["_id"])
+        col.update_one({"_id": existing_doc["_id"]}, {"$set": doc})
+        return str(existing_doc["_id"])
     else:
         # Insert new document
-        result = jobs_col.insert_one(doc)
-        return str(result.inserted_id)
\ No newline at end of file
+        result = col.insert_one(doc)
+        return str(result.inserted_id)
+
+async def _upsert_async(col, doc: dict, lookup: List[str]) -> str:
+    existing_doc = _best_match(await col.find(_dedupe_query(lookup), {"dedupe.keys": 1}).to_list(None), lookup)
+
+    if existing_doc:
+        await col.update_one({"_id": existing_doc["_id"]}, {"$set": doc})
+        return str(existing_doc["_id"])
+    else:
+        result = await col.insert_one(doc)
+        return str(result.inserted_id)
+
+def _upsert_many(col, docs: List[dict], lookups: List[List[str]]) -> List[Union[str, Exception]]:
+    """
+    Batch version of _upsert: one $in over every dedupe key of the batch, then
+    one unordered bulk_write. Docs are matched in input order against the
+    stored docs and the earlier docs of the batch (new ones get their ObjectId
+    up front), so in-batch duplicates update each other exactly as sequential
+    upserts would. Returns the doc id or the write error per input doc.
+    """
+    if not docs:
+        return []
+    all_keys = list({k for lookup in lookups for k in lookup})
+    known: Dict[ObjectId, dict] = {d["_id"]: d for d in col.find(_dedupe_query(all_keys), {"dedupe.keys": 1})}
+    by_key: Dict[str, set] = {}
+    for d in known.values():
+        for k in (d.get("dedupe") or {}).get("keys", []):
+            by_key.setdefault(k, set()).add(d["_id"])
+
+    ops, targets, inserted_at = [], [], {}
+    for i, (doc, lookup) in enumerate(zip(docs, lookups)):
+        candidates = [known[_id] for k in lookup for _id in by_key.get(k, ())]
+        match = _best_match(candidates, lookup)
+        if match:
+            _id = match["_id"]
+            for k in match["dedupe"].get("keys", []):
+                by_key.get(k, set()).discard(_id)
+            ops.append(UpdateOne({"_id": _id}, {"$set": doc}))
+        else:
+            _id = ObjectId()
+            inserted_at[_id] = i
+            ops.append(InsertOne({"_id": _id, **doc}))
+        known[_id] = {"_id": _id, "dedupe": {"keys": list(doc["dedupe"]["keys"])}}
+        for k in doc["dedupe"]["keys"]:
+            by_key.setdefault(k, set()).add(_id)
+        targets.append(_id)
+
+    results: List[Union[str, Exception]] = [str(_id) for _id in targets]
+    try:
+        col.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        failed_ids = {}
+        for err in e.details.get("writeErrors", []):
+            error = RuntimeError(err.get("errmsg", "write failed"))
+            results[err["index"]] = error
+            if err["index"] == inserted_at.get(targets[err["index"]]):
+                failed_ids[targets[err["index"]]] = error
+        # Later docs merged into a doc whose insert failed were not stored either
+        for i, _id in enumerate(targets):
+            if _id in failed_ids and not isinstance(results[i], Exception):
+                results[i] = failed_ids[_id]
+    except Exception as e:
+        results = [e] * len(docs)
+    return results
+
+def _index_candidates(pairs: List[tuple]) -> None:
+    """Keep the candidate ANN index and embedding snapshot in step with resume writes."""
+    vecs = [(candidate_id, candidate_vec(doc)) for candidate_id, doc in pairs]
+    for candidate_id, vec in vecs:
+        try:
+            candidate_index.upsert(candidate_id, vec)
+        except Exception as e:
+            print(f"ANN index update failed for {candidate_id}: {e}")
+    try:
+        candidate_snapshot.upsert_many(vecs)
+    except Exception as e:
+        print(f"Embedding snapshot update failed for {len(vecs)} candidates: {e}")
+
+def _index_candidate(candidate_id: str, doc: dict) -> None:
+    _index_candidates([(candidate_id, doc)])
+
+def _index_jobs(pairs: List[tuple]) -> None:
+    """Keep the job embedding snapshot in step with job writes."""
+    try:
+        job_snapshot.upsert_many([(job_id, job_vec(doc)) for job_id, doc in pairs])
+    except Exception as e:
+        print(f"Embedding snapshot update failed for {len(pairs)} jobs: {e}")
+
+def _index_job(job_id: str, doc: dict) -> None:
+    _index_jobs([(job_id, doc)])
+
+def upsert_canonical(doc: dict) -> str:
+    """
+    Upsert canonical resume with phone number as primary deduplication key.
+    Priority: phone > email > hash
+    """
+    candidate_id = _upsert(canon_col, doc, _resume_lookup_keys(doc))
+    _index_candidate(candidate_id, doc)
+    return candidate_id
+
+def upsert_job(doc: dict) -> str:
+    """
+    Upsert canonical job description with company name and job title as primary deduplication key.
+    Priority: company+title > company+hash > hash
+    """
+    job_id = _upsert(jobs_col, doc, _job_lookup_keys(doc))
+    _index_job(job_id, doc)
+    return job_id
+
+def upsert_canonical_many(docs: List[dict]) -> List[Union[str, Exception]]:
+    """
+    Upsert a batch of canonical resumes (same dedupe rules as upsert_canonical)
+    with one lookup query and one bulk write. Returns, in input order, the
+    candidate id or the Exception for each doc.
+    """
+    results = _upsert_many(canon_col, docs, [_resume_lookup_keys(d) for d in docs])
+    _index_candidates([(r, d) for r, d in zip(results, docs) if isinstance(r, str)])
+    return results
+
+def upsert_job_many(docs: List[dict]) -> List[Union[str, Exception]]:
+    """Batch version of upsert_job; returns the job id or the Exception for each doc."""
+    results = _upsert_many(jobs_col, docs, [_job_lookup_keys(d) for d in docs])
+    _index_jobs([(r, d) for r, d in zip(results, docs) if isinstance(r, str)])
+    return results
+
+async def upsert_canonical_async(doc: dict) -> str:
+    """Non-blocking variant of upsert_canonical."""
+    candidate_id = await _upsert_async(acanon_col, doc, _resume_lookup_keys(doc))
+    await asyncio.to_thread(_index_candidate, candidate_id, doc)
+    return candidate_id
+
+async def upsert_job_async(doc: dict) -> str:
+    """Non-blocking variant of upsert_job."""
+    job_id = await _upsert_async(ajobs_col, doc, _job_lookup_keys(doc))
+    await asyncio.to_thread(_index_job, job_id, doc)
+    return job_id
+
+def _known_resume_query(keys: List[str], text_sha: str, prompt_version: str) -> dict:
+    return {"dedupe.keys": {"$in": keys}, "meta.text_sha256": text_sha,
+            "meta.prompt_version": prompt_version}
+
+def find_known_resume(keys: List[str], text_sha: str, prompt_version: str) -> Optional[dict]:
+    """
+    The stored resume with one of the identity `keys` that was parsed from the
+    same text with the same prompt, or None. Uses the dedupe.keys index.
+    """
+    if not keys:
+        return None
+    return canon_col.find_one(_known_resume_query(keys, text_sha, prompt_version),
+                              {"_id": 1, "meta.parsing_confidence": 1})
+
+async def find_known_resume_async(keys: List[str], text_sha: str, prompt_version: str) -> Optional[dict]:
+    """Non-blocking variant of find_known_resume."""
+    if not keys:
+        return None
+    return await acanon_col.find_one(_known_resume_query(keys, text_sha, prompt_version),
+                                     {"_id": 1, "meta.parsing_confidence": 1})
+
+def _fingerprint_query(kind: str, file_shas: List[str], prompt_version: str) -> dict:
+    return {"kind": kind, "file_sha256": {"$in": list(set(file_shas))},
+            "parser_version": PARSER_VERSION, "prompt_version": prompt_version}
+
+def _fingerprint_key(kind: str, file_sha: str, prompt_version: str) -> dict:
+    return {"kind": kind, "file_sha256": file_sha,
+            "parser_version": PARSER_VERSION, "prompt_version": prompt_version}
+
+def _live_fingerprints(fps: List[dict], live_ids: set) -> Dict[str, dict]:
+    return {fp["file_sha256"]: fp for fp in fps if fp["doc_id"] in live_ids}
+
+def find_fingerprints(kind: str, file_shas: List[str], prompt_version: str) -> Dict[str, dict]:
+    """
+    Look up already-ingested uploads by raw-byte sha256 in one query.
+    Returns {file_sha256: fingerprint} for hits whose canonical doc still exists.
+    """
+    if not file_shas:
+        return {}
+    fps = list(fingerprints_col.find(_fingerprint_query(kind, file_shas, prompt_version)))
+    if not fps:
+        return {}
+    col = _DOC_COLS[kind][0]
+    live = {str(d["_id"]) for d in col.find(
+        {"_id": {"$in": [ObjectId(fp["doc_id"]) for fp in fps]}}, {"_id": 1})}
+    return _live_fingerprints(fps, live)
+
+def record_fingerprint(kind: str, file_sha: str, prompt_version: str,
+                       doc_id: str, parsing_confidence: float) -> None:
+    fingerprints_col.update_one(
+        _fingerprint_key(kind, file_sha, prompt_version),
+        {"$set": {"doc_id": doc_id, "parsing_confidence": parsing_confidence,
+                  "recorded_at": time.time()}},
+        upsert=True,
+    )
+
+def record_fingerprints(kind: str, prompt_version: str, entries: List[tuple]) -> None:
+    """Batch version of record_fingerprint: entries are (file_sha, doc_id, parsing_confidence)."""
+    if not entries:
+        return
+    now = time.time()
+    fingerprints_col.bulk_write([
+        UpdateOne(_fingerprint_key(kind, file_sha, prompt_version),
+                  {"$set": {"doc_id": doc_id, "parsing_confidence": confidence, "recorded_at": now}},
+                  upsert=True)
+        for file_sha, doc_id, confidence in entries
+    ], ordered=False)
+
+async def find_fingerprints_async(kind: str, file_shas: List[str], prompt_version: str) -> Dict[str, dict]:
+    """Non-blocking variant of find_fingerprints."""
+    if not file_shas:
+        return {}
+    fps = await afingerprints_col.find(_fingerprint_query(kind, file_shas, prompt_version)).to_list(None)
+    if not fps:
+        return {}
+    col = _DOC_COLS[kind][1]
+    live = {str(d["_id"]) async for d in col.find(
+        {"_id": {"$in": [ObjectId(fp["doc_id"]) for fp in fps]}}, {"_id": 1})}
+    return _live_fingerprints(fps, live)
+
+async def record_fingerprint_async(kind: str, file_sha: str, prompt_version: str,
+                                   doc_id: str, parsing_confidence: float) -> None:
+    """Non-blocking variant of record_fingerprint."""
+    await afingerprints_col.update_one(
+        _fingerprint_key(kind, file_sha, prompt_version),
+        {"$set": {"doc_id": doc_id, "parsing_confidence": parsing_confidence,
+                  "recorded_at": time.time()}},
+        upsert=True,
+    )
+
@@ -4,25 +4,100 @@ FastAPI router for the hr_parser module.
 
 Exposes:
   - POST /parser/single : parse a single uploaded resume
-  - POST /parser/bulk   : parse multiple uploaded resumes
+  - POST /parser/bulk   : parse multiple uploaded resumes (JSON, or NDJSON streamed per file)
+  - POST /parser/ingest, /parser/job/ingest : queue a background bulk ingest
+  - GET  /parser/ingest/{ingest_id}         : poll background ingest progress
 
 Returns JSON suitable for wiring directly into your UI or other services.
+Handlers await the async service path, so a slow GPT call never blocks the event loop.
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+import asyncio
+import io
+import json
+import time
+from fastapi import APIRouter, Depends, Request, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List
+from .ingest import submit_ingest, get_ingest_status
 from .service import HRResumeParserService
 from .job_service import HRJobParserService
 
 router = APIRouter(prefix="/parser", tags=["hr_parser"])
 
-# Create service instances for the process
-_service = HRResumeParserService()
-_job_service = HRJobParserService()
+NDJSON = "application/x-ndjson"
+
+# Services are created in the app lifespan (create_services) and kept on
+# app.state; these are only built if the router is mounted without it.
+_fallback: Dict[str, Any] = {}
+
+
+def create_services() -> Dict[str, Any]:
+    return {"resume": HRResumeParserService(), "job": HRJobParserService()}
+
+
+def _get_service(request: Request, kind: str):
+    services = getattr(request.app.state, "parser_services", None)
+    if services is None:
+        if not _fallback:
+            _fallback.update(create_services())
+        services = _fallback
+    return services[kind]
+
+
+def resume_service(request: Request) -> HRResumeParserService:
+    return _get_service(request, "resume")
+
+
+def job_service(request: Request) -> HRJobParserService:
+    return _get_service(request, "job")
+
+
+def _wants_stream(request: Request, stream: bool) -> bool:
+    return stream or NDJSON in request.headers.get("accept", "")
+
+
+async def _ndjson_results(service, items: List[tuple]) -> AsyncIterator[bytes]:
+    """
+    One line per file as it finishes: the usual result plus "index", "file" and
+    "elapsed_sec" since the request started; then one {"summary": true, ...} line.
+    """
+    started = time.monotonic()
+    counts = {"succeeded": 0, "failed": 0, "cached": 0}
+    try:
+        async for i, result in service.stream_bulk_fileobjs_async(items):
+            counts["succeeded" if result.get("ok") else "failed"] += 1
+            counts["cached"] += bool(result.get("cached"))
+            line = {"index": i, "file": items[i][1], **result, "elapsed_sec": round(time.monotonic() - started, 3)}
+            yield (json.dumps(line, default=str) + "\n").encode()
+        ok, error = True, None
+    except Exception as e:
+        # The status line is already sent, so a failed run is reported in-band
+        ok, error = False, f"Bulk parse failed: {e}"
+    elapsed = time.monotonic() - started
+    summary = {"summary": True, "ok": ok, "count": len(items), **counts, "elapsed_sec": round(elapsed, 3),
+               "files_per_sec": round((counts["succeeded"] + counts["failed"]) / elapsed, 2) if elapsed else None}
+    if error:
+        summary["error"] = error
+    yield (json.dumps(summary) + "\n").encode()
+
+
+async def _parse_bulk(request: Request, files: List[UploadFile], service, stream: bool, what: str):
+    try:
+        if _wants_stream(request, stream):
+            # Read the uploads now: the request may close its files before the stream is consumed
+            items = [(io.BytesIO(await f.read()), f.filename) for f in files]
+            return StreamingResponse(_ndjson_results(service, items), media_type=NDJSON)
+        items = [(f.file, f.filename) for f in files]
+        results = await service.parse_bulk_fileobjs_async(items)
+        return {"ok": True, "count": len(results), "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{what} failed: {e}") from e
 
 
 @router.post("/single")
-async def parse_single(file: UploadFile = File(...)):
+async def parse_single(file: UploadFile = File(...),
+                       service: HRResumeParserService = Depends(resume_service)):
     """
     Parse ONE resume and store canonical result in MongoDB.
 
@@ -37,14 +112,15 @@ async def parse_single(file: UploadFile = File(...)):
       }
     """
     try:
-        return _service.parse_fileobj(file.file, filename=file.filename)
+        return await service.parse_bytes_async(await file.read(), filename=file.filename)
     except Exception as e:
         # Surface a clean error to clients while logging remains in app logs
         raise HTTPException(status_code=500, detail=f"Parse failed for {file.filename}: {e}") from e
 
 
 @router.post("/bulk")
-async def parse_bulk(files: List[UploadFile] = File(...)):
+async def parse_bulk(request: Request, files: List[UploadFile] = File(...), stream: bool = False,
+                     service: HRResumeParserService = Depends(resume_service)):
     """
     Parse MANY resumes and store canonical results in MongoDB.
 
@@ -61,17 +137,20 @@ async def parse_bulk(files: List[UploadFile] = File(...)):
           {"ok": true,  "candidate_id": "...", "parsing_confidence": 0.78}
         ]
       }
+
+    With `?stream=true` or `Accept: application/x-ndjson` the response is
+    NDJSON instead, one line per file in completion order, then a summary:
+      {"index": 1, "file": "bad.pdf", "ok": false, "error": "reason", "elapsed_sec": 4.2}
+      {"index": 0, "file": "a.pdf", "ok": true, "candidate_id": "...", "parsing_confidence": 0.9, "elapsed_sec": 9.8}
+      {"summary": true, "ok": true, "count": 2, "succeeded": 1, "failed": 1, "cached": 0,
+       "elapsed_sec": 9.8, "files_per_sec": 0.2}
     """
-    try:
-        items = [(f.file, f.filename) for f in files]
-        results = _service.parse_bulk_fileobjs(items)
-        return {"ok": True, "count": len(results), "results": results}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Bulk parse failed: {e}") from e
+    return await _parse_bulk(request, files, service, stream, "Bulk parse")
 
 
 @router.post("/job/single")
-async def parse_job_single(file: UploadFile = File(...)):
+async def parse_job_single(file: UploadFile = File(...),
+                           service: HRJobParserService = Depends(job_service)):
     """
     Parse ONE job description and store canonical result in MongoDB.
 
@@ -86,14 +165,15 @@ async def parse_job_single(file: UploadFile = File(...)):
       }
     """
     try:
-        return _job_service.parse_fileobj(file.file, filename=file.filename)
+        return await service.parse_bytes_async(await file.read(), filename=file.filename)
     except Exception as e:
         # Surface a clean error to clients while logging remains in app logs
         raise HTTPException(status_code=500, detail=f"Job parse failed for {file.filename}: {e}") from e
 
 
 @router.post("/job/bulk")
-async def parse_job_bulk(files: List[UploadFile] = File(...)):
+async def parse_job_bulk(request: Request, files: List[UploadFile] = File(...), stream: bool = False,
+                         service: HRJobParserService = Depends(job_service)):
     """
     Parse MANY job descriptions and store canonical results in MongoDB.
 
@@ -110,10 +190,66 @@ async def parse_job_bulk(files: List[UploadFile] = File(...)):
           {"ok": true,  "job_id": "...", "parsing_confidence": 0.78}
         ]
       }
+
+    Streams NDJSON like /parser/bulk with `?stream=true` or `Accept: application/x-ndjson`.
+    """
+    return await _parse_bulk(request, files, service, stream, "Bulk job parse")
+
+
+async def _submit(files: List[UploadFile], kind: str):
+    payload = [(await f.read(), f.filename) for f in files]
+    ingest_id = await asyncio.to_thread(submit_ingest, payload, kind)
+    return {"ok": True, "ingest_id": ingest_id, "count": len(payload)}
+
+
+@router.post("/ingest")
+async def ingest_bulk(files: List[UploadFile] = File(...)):
+    """
+    Queue MANY resumes for background parsing and return immediately.
+
+    Body (multipart/form-data):
+      - files: List[UploadFile]
+
+    Response:
+      {"ok": true, "ingest_id": "<id>", "count": 200}
+
+    Poll GET /parser/ingest/{ingest_id} for progress.
     """
     try:
-        items = [(f.file, f.filename) for f in files]
-        results = _job_service.parse_bulk_fileobjs(items)
-        return {"ok": True, "count": len(results), "results": results}
+        return await _submit(files, "resume")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Bulk job parse failed: {e}") from e
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ingest submit failed: {e}") from e
+
+
+@router.post("/job/ingest")
+async def ingest_job_bulk(files: List[UploadFile] = File(...)):
+    """
+    Queue MANY job descriptions for background parsing and return immediately.
+
+    Response:
+      {"ok": true, "ingest_id": "<id>", "count": 20}
+    """
+    try:
+        return await _submit(files, "job")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job ingest submit failed: {e}") from e
+
+
+@router.get("/ingest/{ingest_id}")
+async def ingest_status(ingest_id: str):
+    """
+    Progress of a background ingest.
+
+    Response:
+      {
+        "ok": true, "ingest_id": "...", "kind": "resume", "status": "running",
+        "total": 200, "queued": 150, "running": 4, "succeeded": 44, "failed": 2,
+        "elapsed_sec": 61.3, "files_per_sec": 0.75,
+        "files": [{"index": 0, "filename": "a.pdf", "status": "done", "result": {...}}, ...],
+        "failures": [{"ok": false, "file": "bad.pdf", "error": "reason"}]
+      }
+    """
+    status = await asyncio.to_thread(get_ingest_status, ingest_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Ingest not found")
+    return status
@@ -1,7 +1,65 @@
-from pydantic import BaseModel, EmailStr, conint, confloat, constr
-from typing import List, Optional, Dict, Literal, Union
+import re
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, EmailStr, PlainValidator, TypeAdapter, conint, confloat, constr, field_validator, model_validator
+from typing import Annotated, Any, List, Optional, Dict, Literal, Union
 
-class Meta(BaseModel):
+# Normalisation of GPT output happens in the "before" validators below, so one
+# validation pass both repairs and checks a document (see validate_resume).
+
+COUNTRY_CODES = {"india": "IN", "united states": "US", "united kingdom": "GB"}
+_YEAR_MONTH = re.compile(r"^\d{4}(-\d{2})?$")
+_YEAR = re.compile(r"\b(19|20)\d{2}\b")
+_EMAIL_STR = TypeAdapter(EmailStr)
+
+
+def country_code(value: Any) -> Any:
+    """Known country names to ISO codes, other long names cut to two letters."""
+    if isinstance(value, str) and len(value) > 2:
+        return COUNTRY_CODES.get(value.strip().lower(), value[:2].upper())
+    return value
+
+
+def year_or_none(value: Any, pattern: re.Pattern = _YEAR_MONTH) -> Any:
+    """Keep a value matching `pattern`, otherwise the first year found in it, else None."""
+    if not isinstance(value, str) or not value or pattern.match(value):
+        return value
+    found = _YEAR.search(value)
+    return found.group() if found else None
+
+
+def drop_none(value: Any) -> Any:
+    """A dict without its None values; None when nothing is left."""
+    if isinstance(value, dict):
+        value = {k: v for k, v in value.items() if v is not None}
+        return value or None
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _cached_email(value: str) -> str:
+    return _EMAIL_STR.validate_python(value)
+
+
+def email(value: Any) -> str:
+    """
+    EmailStr validation, cached per address: email-validator otherwise
+    dominates the cost of validating a document, and addresses recur across
+    re-uploads and job postings. Invalid addresses are not cached.
+    """
+    if isinstance(value, str):
+        return _cached_email(value)
+    return _EMAIL_STR.validate_python(value)
+
+
+Email = Annotated[str, PlainValidator(email)]
+
+
+class CanonicalModel(BaseModel):
+    # Keys beyond the schema are kept: the stored document has always carried them
+    model_config = ConfigDict(extra="allow")
+
+
+class Meta(CanonicalModel):
     canonical_version: str = "1.0"
     parser_version: str = "hrx-0.1.0"
     ingested_at: Optional[str] = None
@@ -10,34 +68,55 @@ class Meta(BaseModel):
     parsing_confidence: confloat(ge=0, le=1) = 0.0
     language: Optional[str] = "en"
     hash_sha256: Optional[str] = None
+    file_sha256: Optional[str] = None
+    text_sha256: Optional[str] = None
+    prompt_version: Optional[str] = None
+
+    @field_validator("parsing_confidence", mode="before")
+    @classmethod
+    def _confidence(cls, v):
+        return float(v) if isinstance(v, (int, float)) else 0.75
 
-class Links(BaseModel):
+class Links(CanonicalModel):
     linkedin: Optional[str] = None
     github: Optional[str] = None
     portfolio: Optional[str] = None
     other: List[str] = []
 
-class Location(BaseModel):
+class Location(CanonicalModel):
     city: Optional[str] = None
     state: Optional[str] = None
     country: Optional[constr(min_length=2, max_length=2)] = None
 
-class Identity(BaseModel):
+    @field_validator("country", mode="before")
+    @classmethod
+    def _country(cls, v):
+        return country_code(v)
+
+class Identity(CanonicalModel):
     full_name: Optional[str] = None
     first_name: Optional[str] = None
     last_name: Optional[str] = None
-    emails: List[EmailStr] = []
+    emails: List[Email] = []
     phones: List[str] = []
     links: Links = Links()
     location: Location = Location()
 
-class Skill(BaseModel):
+class Skill(CanonicalModel):
     name: str
     group: Optional[str] = None
     proficiency: Optional[Literal["beginner","intermediate","advanced","expert"]] = None
     years: Optional[confloat(ge=0, le=50)] = None
 
-class Experience(BaseModel):
+    @field_validator("proficiency", mode="before")
+    @classmethod
+    def _proficiency(cls, v):
+        if isinstance(v, str):
+            v = v.lower().strip()
+            return v if v in ("beginner", "intermediate", "advanced", "expert") else None
+        return v
+
+class Experience(CanonicalModel):
     title_raw: Optional[str] = None
     title_norm: Optional[str] = None
     company: Optional[str] = None
@@ -49,7 +128,23 @@ class Experience(BaseModel):
     achievements: List[str] = []
     tech: List[str] = []
 
-class Education(BaseModel):
+    @model_validator(mode="before")
+    @classmethod
+    def _dates(cls, data):
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)  # leave the caller's GPT object as it was
+        end = data.get("end_date")
+        if isinstance(end, str) and end.lower().strip() in ("current", "present", "ongoing", "now"):
+            data["end_date"] = None
+            data["current"] = True
+        elif "end_date" in data:
+            data["end_date"] = year_or_none(end)
+        if "start_date" in data:
+            data["start_date"] = year_or_none(data["start_date"])
+        return data
+
+class Education(CanonicalModel):
     institution: Optional[str] = None
     degree: Optional[str] = None
     field_of_study: Optional[str] = None
@@ -57,17 +152,46 @@ class Education(BaseModel):
     end_year: Optional[conint(ge=1950, le=2100)] = None
     score: Optional[Dict[str, float]] = None
 
-class Preferences(BaseModel):
+    @field_validator("score", mode="before")
+    @classmethod
+    def _score(cls, v):
+        return drop_none(v)
+
+class Preferences(CanonicalModel):
     remote: Optional[bool] = None
     relocation: Optional[Union[str, bool]] = None  # Allow both string and boolean
     notice_period_days: Optional[conint(ge=0, le=365)] = None
     salary: Optional[Dict[str, Union[str, float]]] = None  # Allow both string and float values
 
-class WorkAuth(BaseModel):
+    @field_validator("relocation", mode="before")
+    @classmethod
+    def _relocation(cls, v):
+        if isinstance(v, bool):
+            return "Yes" if v else "No"
+        return v
+
+    @field_validator("salary", mode="before")
+    @classmethod
+    def _salary(cls, v):
+        if not isinstance(v, dict):
+            return v
+        salary = dict(v)
+        currency = salary.get("currency")
+        if not (isinstance(currency, (int, float))
+                or (isinstance(currency, str) and currency.upper() in ("USD", "INR", "EUR", "GBP"))):
+            salary.pop("currency", None)
+        if isinstance(salary.get("expectation_lpa"), str):
+            try:
+                salary["expectation_lpa"] = float(salary["expectation_lpa"])
+            except ValueError:
+                del salary["expectation_lpa"]
+        return drop_none(salary)
+
+class WorkAuth(CanonicalModel):
     country: Optional[str] = None
     status: Optional[str] = None
 
-class CanonicalResume(BaseModel):
+class CanonicalResume(CanonicalModel):
     meta: Meta
     identity: Identity
     summary: Optional[str] = None
@@ -78,4 +202,17 @@ class CanonicalResume(BaseModel):
     certifications: List[Dict] = []
     preferences: Preferences = Preferences()
     work_auth: WorkAuth = WorkAuth()
-    dedupe: Dict[str, List[str]] = {"keys": []}
\ No newline at end of file
+    dedupe: Dict[str, List[str]] = {"keys": []}
+
+
+# Built once at import; validating through it avoids per-call schema lookups
+RESUME_ADAPTER = TypeAdapter(CanonicalResume)
+
+
+def validate_resume(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalise and validate a parsed resume in one pass; returns the document to
+    embed and store. Only keys present in `obj` are written back, so defaults
+    do not add None-valued keys to stored documents.
+    """
+    return RESUME_ADAPTER.validate_python(obj).model_dump(exclude_unset=True)
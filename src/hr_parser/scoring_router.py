@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Dict, Any
-from app.scoring.pipeline import score_candidate_against_open_jobs, score_job_against_all_candidates
-from .repository import canon_col, jobs_col
+from app.scoring.pipeline import score_candidate_against_open_jobs, score_job_against_all_candidates, top_candidates_for_job
+from .repository import acanon_col, ajobs_col
 
 router = APIRouter(prefix="/scoring", tags=["scoring"])
 
@@ -44,8 +44,31 @@ def score_job(job_id: str):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Scoring failed: {str(e)}") from e
 
+@router.get("/job/{job_id}/top")
+def top_candidates(job_id: str, k: int = Query(20, ge=1, le=200), pool: int = Query(300, ge=1, le=2000)):
+    """
+    Best candidates for a job without scoring the whole pool.
+
+    Retrieves the `pool` semantic nearest neighbours from the ANN index and
+    reranks them with the regular scorer.
+
+    Response:
+      {
+        "ok": true,
+        "results": [{"candidate_id": "...", "final_score": 81.2, "components": {...}}, ...]
+      }
+    """
+    try:
+        return {"ok": True, "results": top_candidates_for_job(job_id, k=k, pool=pool)}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Top candidates failed: {e}") from e
+
 @router.get("/candidate/{candidate_id}/job/{job_id}")
-def score_single_match(candidate_id: str, job_id: str):
+async def score_single_match(candidate_id: str, job_id: str):
     """
     Score a specific candidate against a specific job.
     
@@ -66,11 +89,11 @@ def score_single_match(candidate_id: str, job_id: str):
         except:
             j_id = job_id
         
-        candidate = canon_col.find_one({"_id": cand_id})
+        candidate = await acanon_col.find_one({"_id": cand_id})
         if not candidate:
             raise HTTPException(status_code=404, detail="Candidate not found")
         
-        job = jobs_col.find_one({"_id": j_id})
+        job = await ajobs_col.find_one({"_id": j_id})
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
         
@@ -89,18 +112,18 @@ def score_single_match(candidate_id: str, job_id: str):
         raise HTTPException(status_code=500, detail=f"Scoring failed: {e}") from e
 
 @router.get("/candidate/{candidate_id}/scores")
-def get_scores_for_candidate(candidate_id: str, limit: int = Query(10, ge=1, le=100)):
+async def get_scores_for_candidate(candidate_id: str, limit: int = Query(10, ge=1, le=100)):
     """
     Get all scores for a candidate (top matches).
     
     Returns list of job matches sorted by score.
     """
-    db = jobs_col.database  # same DB used elsewhere
+    db = ajobs_col.database  # same DB used elsewhere
     cur = db.scores.find({"candidate_id": candidate_id}).sort("final_score", -1).limit(limit)
     
     # Convert ObjectIds to strings for JSON serialization
     scores = []
-    for doc in cur:
+    async for doc in cur:
         if "_id" in doc:
             doc["_id"] = str(doc["_id"])
         scores.append(doc)
@@ -108,18 +131,18 @@ def get_scores_for_candidate(candidate_id: str, limit: int = Query(10, ge=1, le=
     return {"ok": True, "scores": scores}
 
 @router.get("/job/{job_id}/scores")
-def get_scores_for_job(job_id: str, limit: int = Query(10, ge=1, le=100)):
+async def get_scores_for_job(job_id: str, limit: int = Query(10, ge=1, le=100)):
     """
     Get all scores for a job (top candidates).
     
     Returns list of candidate matches sorted by score.
     """
-    db = jobs_col.database
+    db = ajobs_col.database
     cur = db.scores.find({"job_id": job_id}).sort("final_score", -1).limit(limit)
     
     # Convert ObjectIds to strings for JSON serialization
     scores = []
-    for doc in cur:
+    async for doc in cur:
         if "_id" in doc:
             doc["_id"] = str(doc["_id"])
         scores.append(doc)
@@ -0,0 +1,186 @@
+# hr_parser/sections.py
+"""
+Section-parallel GPT parsing for long documents.
+
+A long resume or job description is split locally at its section headings
+("Experience", "Education", "Responsibilities", ...). Sections listed in the
+layout's `parallel` map become parts of their own, and oversized ones are
+chunked further at line boundaries (preferring lines that start a new role,
+i.e. carry a year). Everything else stays in one "general" part. The parts
+are parsed concurrently with smaller prompts, each allowed MAX_OUTPUT_TOKENS,
+and their JSON is merged back into one canonical object, so latency follows
+the slowest part and long documents are no longer truncated by the output cap.
+
+Short documents, or documents without a recognised parallel section, yield a
+single part and go through the regular one-prompt path.
+"""
+
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .compaction import count_tokens
+from .config import SECTION_PARALLEL_MIN_TOKENS, SECTION_CHUNK_TOKENS, SECTION_MAX_PARALLEL
+
+# name -> heading regex; `parallel` maps a section to the canonical keys its part returns
+RESUME_LAYOUT = {
+    "headings": {
+        "experience": r"(work |professional |employment |relevant )?(experience|history)|employment|career( history)?",
+        "education": r"education( and training)?|academic (background|qualifications)|academics",
+        "skills": r"(technical |key |core )?(skills|competencies|technologies)( summary)?|tech stack",
+        "projects": r"(key |personal |academic )?projects",
+        "certifications": r"certifications?( and courses)?|licen[cs]es( and certifications)?|courses",
+    },
+    "parallel": {
+        "experience": ["experience"],
+        "education": ["education"],
+    },
+}
+
+JOB_LAYOUT = {
+    "headings": {
+        "responsibilities": r"(key |your |main )?(responsibilities|duties)|what you('|’)ll do|the role|role overview",
+        "qualifications": r"(minimum |preferred |required )?(requirements|qualifications)|what you('|’)ll bring|"
+                          r"who you are|must have|nice to have|(required |preferred )?skills",
+        "benefits": r"benefits|perks|what we offer",
+        "company": r"about (us|the company|the team)|who we are",
+    },
+    "parallel": {
+        "responsibilities": ["responsibilities"],
+        "qualifications": ["qualifications", "requirements"],
+    },
+}
+
+Part = Dict[str, Any]  # {"name", "keys" (None for the general part), "text"}
+
+_YEAR = re.compile(r"\b(19|20)\d{2}\b")
+
+
+def _heading(line: str, patterns: Dict[str, re.Pattern]) -> Optional[str]:
+    candidate = line.strip().rstrip(":").strip()
+    if not candidate or len(candidate) > 60:
+        return None
+    for name, pattern in patterns.items():
+        if pattern.fullmatch(candidate):
+            return name
+    return None
+
+
+def split_sections(text: str, layout: dict) -> List[tuple]:
+    """[(section name, text)] in document order; text before the first heading is "header"."""
+    patterns = {name: re.compile(p, re.IGNORECASE) for name, p in layout["headings"].items()}
+    sections: List[tuple] = []
+    name, lines = "header", []
+    for line in text.splitlines():
+        found = _heading(line, patterns)
+        if found is not None:
+            if lines:
+                sections.append((name, "\n".join(lines)))
+            name, lines = found, []
+        lines.append(line)
+    if lines:
+        sections.append((name, "\n".join(lines)))
+    return sections
+
+
+def _chunk(text: str, max_tokens: int) -> List[str]:
+    """Split at line boundaries into pieces of about max_tokens, starting new pieces at dated lines."""
+    lines = text.splitlines()
+    chunks: List[List[str]] = [[]]
+    size = 0
+    for line in lines:
+        tokens = count_tokens(line) + 1
+        # Once past half the budget, a dated line (a new role) is a good place to cut
+        if chunks[-1] and (size + tokens > max_tokens or (size > max_tokens // 2 and _YEAR.search(line))):
+            chunks.append([])
+            size = 0
+        chunks[-1].append(line)
+        size += tokens
+    heading = lines[0] if lines else ""
+    # Later chunks repeat the section heading so the model knows what it is reading
+    return ["\n".join(c if i == 0 else [heading] + c) for i, c in enumerate(chunks) if c]
+
+
+def plan_parts(text: str, layout: dict,
+               min_tokens: Optional[int] = None, chunk_tokens: Optional[int] = None) -> List[Part]:
+    """Parts to parse concurrently; a single general part means "use the one-prompt path"."""
+    min_tokens = SECTION_PARALLEL_MIN_TOKENS if min_tokens is None else min_tokens
+    chunk_tokens = SECTION_CHUNK_TOKENS if chunk_tokens is None else chunk_tokens
+    whole = [{"name": "general", "keys": None, "text": text}]
+    if min_tokens <= 0 or count_tokens(text) < min_tokens:
+        return whole
+
+    general: List[str] = []
+    parallel: Dict[str, List[str]] = {}
+    for name, body in split_sections(text, layout):
+        if name in layout["parallel"]:
+            parallel.setdefault(name, []).append(body)
+        else:
+            general.append(body)
+    if not parallel:
+        return whole
+
+    parts = [{"name": "general", "keys": None, "text": "\n".join(general)}]
+    for name, bodies in parallel.items():
+        for chunk in _chunk("\n".join(bodies), chunk_tokens):
+            parts.append({"name": name, "keys": layout["parallel"][name], "text": chunk})
+    return parts
+
+
+def _fill(target: dict, source: dict) -> None:
+    """Copy values from source into target where target has nothing."""
+    for key, value in source.items():
+        current = target.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            _fill(current, value)
+        elif isinstance(current, list) and isinstance(value, list):
+            seen = {json.dumps(v, sort_keys=True, default=str) for v in current}
+            for v in value:
+                marker = json.dumps(v, sort_keys=True, default=str)
+                if marker not in seen:
+                    seen.add(marker)
+                    current.append(v)
+        elif current in (None, "", [], {}):
+            target[key] = value
+
+
+def merge_parts(results: List[tuple]) -> dict:
+    """
+    Merge [(part, obj)] into one canonical dict. Section parts contribute only
+    their keys and the general part everything else (dicts such as job
+    requirements are filled from both). Lists are concatenated in part order
+    without duplicates; dicts and scalars only fill gaps.
+    """
+    owned = {k for part, _ in results if part["keys"] is not None for k in part["keys"]}
+    merged: dict = {}
+    for part, obj in results:
+        if not isinstance(obj, dict):
+            continue
+        if part["keys"] is not None:
+            obj = {k: v for k, v in obj.items() if k in part["keys"]}
+        else:
+            # Lists owned by a section part come only from that part's text
+            obj = {k: v for k, v in obj.items() if not (k in owned and isinstance(v, list))}
+        _fill(merged, obj)
+    return merged
+
+
+def run_parts(parts: List[Part], call: Callable[[Part], dict]) -> dict:
+    """Parse the parts on up to SECTION_MAX_PARALLEL threads and merge them."""
+    with ThreadPoolExecutor(max_workers=max(1, min(SECTION_MAX_PARALLEL, len(parts)))) as pool:
+        objs = list(pool.map(call, parts))
+    return merge_parts(list(zip(parts, objs)))
+
+
+async def run_parts_async(parts: List[Part], call: Callable[[Part], Awaitable[dict]]) -> dict:
+    """Async variant of run_parts; at most SECTION_MAX_PARALLEL parts in flight."""
+    gate = asyncio.Semaphore(max(1, SECTION_MAX_PARALLEL))
+
+    async def _one(part: Part) -> dict:
+        async with gate:
+            return await call(part)
+
+    objs = await asyncio.gather(*(_one(p) for p in parts))
+    return merge_parts(list(zip(parts, objs)))
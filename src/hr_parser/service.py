@@ -1,17 +1,16 @@
-import tempfile, shutil, time, hashlib
-from typing import Iterable, List, Dict, Any
-from .extractor import file_to_text
-from .gpt_client import parse_with_gpt
-from .schemas import CanonicalResume
-from .repository import upsert_canonical
+import asyncio, hashlib
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple
+from .gpt_client import parse_with_gpt, parse_with_gpt_async, parse_response, PROMPT_VERSION
+from .schemas import validate_resume
+from .identity import extract_identity, resume_identity_keys, text_fingerprint
+from .repository import (
+    upsert_canonical_async, upsert_canonical_many,
+    find_fingerprints, find_fingerprints_async, record_fingerprint, record_fingerprint_async, record_fingerprints,
+    find_known_resume, find_known_resume_async,
+)
+from .bulk import extract_in_pool, iter_bulk, run_bulk
 from app.ml.embeddings import EmbeddingService
 
-# Force reload of extractor module
-import importlib
-import hr_parser.extractor
-importlib.reload(hr_parser.extractor)
-from .extractor import file_to_text
-
 class HRResumeParserService:
     """Drop-in service for single/bulk resume parsing."""
 
@@ -19,34 +18,189 @@ class HRResumeParserService:
         self.embedding_service = EmbeddingService()
 
     def parse_fileobj(self, fileobj, filename: str) -> Dict[str, Any]:
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            shutil.copyfileobj(fileobj, tmp)
-            tmp_path = tmp.name
+        return self.parse_bytes(fileobj.read(), filename)
+
+    def parse_bytes(self, data: bytes, filename: str) -> Dict[str, Any]:
+        file_sha = hashlib.sha256(data).hexdigest()
+        cached = self._lookup_fingerprints([file_sha])
+        if file_sha in cached:
+            return cached[file_sha]
+
+        text, mime = extract_in_pool(data, filename)
+        known = self._known_text(text, file_sha)
+        if known is not None:
+            return known
+        canonical = self._parse_text(text, mime, filename, file_sha)
+        return self._store(canonical)
+
+    async def parse_bytes_async(self, data: bytes, filename: str) -> Dict[str, Any]:
+        """Async variant of parse_fileobj over raw upload bytes; only extraction leaves the event loop."""
+        file_sha = hashlib.sha256(data).hexdigest()
+        cached = await self._lookup_fingerprint_async(file_sha)
+        if cached is not None:
+            return cached
+
+        text, mime = await asyncio.to_thread(extract_in_pool, data, filename)
+        known = await self._known_text_async(text, file_sha)
+        if known is not None:
+            return known
+        canonical = await parse_with_gpt_async(text, source_file=filename)
+        canonical = self._finalize(canonical, mime, filename, file_sha, text_fingerprint(text))
+        canonical = await self.embedding_service.store_embeddings_async(canonical, 'resume')
+
+        candidate_id = await upsert_canonical_async(canonical)
+        confidence = canonical["meta"]["parsing_confidence"]
+        await self._record_fingerprint_async(file_sha, candidate_id, confidence)
+        return {"ok": True, "candidate_id": candidate_id, "parsing_confidence": confidence}
+
+    def _cached_result(self, fingerprint: Dict[str, Any]) -> Dict[str, Any]:
+        return {"ok": True, "candidate_id": fingerprint["doc_id"],
+                "parsing_confidence": fingerprint["parsing_confidence"], "cached": True}
+
+    def _lookup_fingerprints(self, file_shas: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Results for uploads whose raw bytes were already ingested, keyed by sha256; a failed lookup is a miss."""
+        try:
+            hits = find_fingerprints("resume", file_shas, PROMPT_VERSION)
+        except Exception as e:
+            print(f"Fingerprint lookup failed, parsing: {e}")
+            return {}
+        return {sha: self._cached_result(fp) for sha, fp in hits.items()}
+
+    async def _lookup_fingerprint_async(self, file_sha: str) -> Optional[Dict[str, Any]]:
+        try:
+            hits = await find_fingerprints_async("resume", [file_sha], PROMPT_VERSION)
+        except Exception as e:
+            print(f"Fingerprint lookup failed, parsing: {e}")
+            return None
+        return self._cached_result(hits[file_sha]) if file_sha in hits else None
+
+    async def _record_fingerprint_async(self, file_sha: str, doc_id: str, confidence: float) -> None:
+        try:
+            await record_fingerprint_async("resume", file_sha, PROMPT_VERSION, doc_id, confidence)
+        except Exception as e:
+            # The doc is stored; a missing fingerprint only costs a re-parse later
+            print(f"Fingerprint recording failed: {e}")
+
+    def _identity_keys(self, text: str) -> List[str]:
+        identity = extract_identity(text)
+        return resume_identity_keys(identity["emails"], identity["phones"])
 
-        text, mime = file_to_text(tmp_path)
+    def _known_result(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        confidence = doc.get("meta", {}).get("parsing_confidence", 0.7)
+        return {"ok": True, "candidate_id": str(doc["_id"]), "parsing_confidence": confidence, "cached": True}
 
+    def _known_text(self, text: str, file_sha: str) -> Optional[Dict[str, Any]]:
+        """
+        Result for a candidate already parsed from this exact text (found by the
+        regex-extracted phones/emails), or None. Skips GPT and embeddings.
+        """
+        try:
+            hit = find_known_resume(self._identity_keys(text), text_fingerprint(text), PROMPT_VERSION)
+        except Exception as e:
+            print(f"Identity lookup failed, parsing: {e}")
+            return None
+        if hit is None:
+            return None
+        result = self._known_result(hit)
+        try:
+            # Remember these bytes too, so the next upload of them skips extraction
+            record_fingerprint("resume", file_sha, PROMPT_VERSION,
+                               result["candidate_id"], result["parsing_confidence"])
+        except Exception as e:
+            print(f"Fingerprint recording failed: {e}")
+        return result
+
+    async def _known_text_async(self, text: str, file_sha: str) -> Optional[Dict[str, Any]]:
+        """Async variant of _known_text."""
+        try:
+            hit = await find_known_resume_async(self._identity_keys(text), text_fingerprint(text), PROMPT_VERSION)
+        except Exception as e:
+            print(f"Identity lookup failed, parsing: {e}")
+            return None
+        if hit is None:
+            return None
+        result = self._known_result(hit)
+        await self._record_fingerprint_async(file_sha, result["candidate_id"], result["parsing_confidence"])
+        return result
+
+    def _parse_text(self, text: str, mime: str, filename: str, file_sha: str) -> Dict[str, Any]:
         canonical = parse_with_gpt(text, source_file=filename)
+        return self._finalize(canonical, mime, filename, file_sha, text_fingerprint(text))
+
+    def _finalize(self, canonical: Dict[str, Any], mime: str, filename: str, file_sha: str,
+                  text_sha: Optional[str] = None) -> Dict[str, Any]:
         # fill meta if missing
         canonical.setdefault("meta", {})
         canonical["meta"].setdefault("source_file", filename)
         canonical["meta"].setdefault("source_mime", mime)
         canonical["meta"].setdefault("parsing_confidence", 0.7)
+        canonical["meta"]["file_sha256"] = file_sha
+        if text_sha:
+            canonical["meta"]["text_sha256"] = text_sha
+            canonical["meta"]["prompt_version"] = PROMPT_VERSION
+
+        # normalise and validate in one pass; the result is what gets embedded and stored
+        return validate_resume(canonical)
+
+    def _store(self, canonical: Dict[str, Any]) -> Dict[str, Any]:
+        outcome = self._store_many([canonical])[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _store_many(self, canonicals: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Embed a batch in one request and write it with one bulk upsert
+        (result dict or Exception per doc, in input order).
+        """
+        canonicals = self.embedding_service.store_embeddings_many(canonicals, 'resume')
+        ids = upsert_canonical_many(canonicals)
+
+        outcomes: List[Any] = []
+        fingerprints = []
+        for canonical, candidate_id in zip(canonicals, ids):
+            if isinstance(candidate_id, Exception):
+                outcomes.append(candidate_id)
+                continue
+            confidence = canonical["meta"]["parsing_confidence"]
+            fingerprints.append((canonical["meta"]["file_sha256"], candidate_id, confidence))
+            outcomes.append({"ok": True, "candidate_id": candidate_id, "parsing_confidence": confidence})
+        try:
+            record_fingerprints("resume", PROMPT_VERSION, fingerprints)
+        except Exception as e:
+            # The docs are stored; a missing fingerprint only costs a re-parse later
+            print(f"Fingerprint recording failed: {e}")
+        return outcomes
+
+    # --- offline batch mode (hr_parser.batch) ----------------------------------
+
+    def cached_result(self, file_sha: str) -> Optional[Dict[str, Any]]:
+        """Result for upload bytes that were already ingested, or None."""
+        return self._lookup_fingerprints([file_sha]).get(file_sha)
+
+    def known_result(self, text: str, file_sha: str) -> Optional[Dict[str, Any]]:
+        """Result for a candidate already parsed from this exact text, or None (see _known_text)."""
+        return self._known_text(text, file_sha)
+
+    def finalize_response(self, content: str, filename: str, mime: str, file_sha: str,
+                          text_sha: str, hash_sha256: str) -> Dict[str, Any]:
+        """Validated document for the reply to a prepare_request body, ready for store_many."""
+        canonical = parse_response(content, filename, hash_sha256)
+        return self._finalize(canonical, mime, filename, file_sha, text_sha)
 
-        # validate schema
-        CanonicalResume.model_validate(canonical)
+    def store_many(self, canonicals: List[Dict[str, Any]]) -> List[Any]:
+        """Embed and upsert finalized documents (result dict or Exception per doc, in input order)."""
+        return self._store_many(canonicals)
 
-        # Add embeddings
-        canonical = self.embedding_service.store_embeddings(canonical, 'resume')
+    def parse_bulk_fileobjs(self, items: Iterable[tuple], on_result=None) -> List[Dict[str, Any]]:
+        return run_bulk(items, self._parse_text, self._store_many,
+                        lookup=self._lookup_fingerprints, known=self._known_text, on_result=on_result)
 
-        candidate_id = upsert_canonical(canonical)
-        return {"ok": True, "candidate_id": candidate_id,
-                "parsing_confidence": canonical["meta"]["parsing_confidence"]}
+    async def parse_bulk_fileobjs_async(self, items: Iterable[tuple]) -> List[Dict[str, Any]]:
+        """Run the staged bulk engine without blocking the event loop."""
+        return await asyncio.to_thread(self.parse_bulk_fileobjs, list(items))
 
-    def parse_bulk_fileobjs(self, items: Iterable[tuple]) -> List[Dict[str, Any]]:
-        out = []
-        for fileobj, filename in items:
-            try:
-                out.append(self.parse_fileobj(fileobj, filename))
-            except Exception as e:
-                out.append({"ok": False, "file": filename, "error": str(e)})
-        return out
\ No newline at end of file
+    def stream_bulk_fileobjs_async(self, items: Iterable[tuple]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """(index, result) per file in completion order, for streaming responses."""
+        items = list(items)
+        return iter_bulk(lambda on_result: self.parse_bulk_fileobjs(items, on_result=on_result))
@@ -0,0 +1,75 @@
+import numpy as np
+import app.ml.ann as ann
+from app.ml.ann import IVFIndex
+
+
+def _clustered(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    return centers[rng.integers(20, size=n)] + rng.normal(size=(n, dim)) * 0.4
+
+
+def test_ivf_search_recall_updates_and_persistence(tmp_path, monkeypatch):
+    monkeypatch.setattr(ann, "ANN_MIN_TRAIN", 500)
+    X = _clustered(3000, 64)
+    idx = IVFIndex().build((str(i), X[i]) for i in range(len(X)))
+    assert idx.centroids is not None
+
+    q = X[42]
+    Xn = X / np.linalg.norm(X, axis=1, keepdims=True)
+    exact = {str(i) for i in np.argsort(-(Xn @ (q / np.linalg.norm(q))))[:10]}
+    hits = idx.search(q, 10)
+    assert hits[0][0] == "42"
+    assert len(exact & {doc_id for doc_id, _ in hits}) >= 8
+
+    idx.upsert("new", q * 2)
+    assert {doc_id for doc_id, _ in idx.search(q, 2)} == {"42", "new"}
+    idx.remove("42")
+    assert idx.search(q, 1)[0][0] == "new"
+
+    path = str(tmp_path / "cands.npz")
+    idx.save(path)
+    loaded = IVFIndex.load(path)
+    assert len(loaded) == len(idx)
+    assert loaded.search(q, 5) == idx.search(q, 5)
+
+
+def test_persistent_index_merges_saves_from_several_processes(tmp_path, monkeypatch):
+    from app.ml.ann import PersistentIndex
+    monkeypatch.setattr(ann, "ANN_SAVE_EVERY", 1000)
+    path = str(tmp_path / "cands.npz")
+    X = _clustered(50, 16)
+    PersistentIndex(path).get(lambda: ((str(i), X[i]) for i in range(40)))
+
+    # Two worker processes each see the saved index and upsert different docs
+    a, b = PersistentIndex(path), PersistentIndex(path)
+    for p in (a, b):
+        p.get(lambda: [])
+    a.upsert("from-a", X[40])
+    b.upsert("from-b", X[41])
+    b.upsert("0", None)
+    a.close()
+    b.close()
+
+    merged = IVFIndex.load(path)
+    assert {"from-a", "from-b"} <= set(merged._rows) and "0" not in merged._rows
+    assert len(merged) == 41
+
+
+def test_persistent_index_retrains_in_the_background(tmp_path, monkeypatch):
+    import time
+    from app.ml.ann import PersistentIndex
+    monkeypatch.setattr(ann, "ANN_MIN_TRAIN", 200)
+    X = _clustered(700, 16)
+    index = PersistentIndex(str(tmp_path / "cands.npz"))
+    idx = index.get(lambda: ((str(i), X[i]) for i in range(150)))
+    assert idx.centroids is None
+
+    for i in range(150, 700):  # re-clustered once 4x the 150 vectors it was built on
+        index.upsert(str(i), X[i])
+    for _ in range(100):
+        if idx.centroids is not None and not index._retraining:
+            break
+        time.sleep(0.05)
+    assert idx.centroids is not None and not idx.needs_training
+    assert idx.search(X[300], 1)[0][0] == "300"
@@ -0,0 +1,77 @@
+import asyncio, json
+from types import SimpleNamespace
+
+from hr_parser.batch import BatchRun
+from hr_parser.service import HRResumeParserService
+
+
+class FakeBatchAPI:
+    """Local stand-in for the OpenAI files + batches endpoints."""
+
+    def __init__(self, respond, polls_until_done=1):
+        self.respond, self.polls_until_done = respond, polls_until_done
+        self.files, self.batches, self._store, self._batches = self, self, {}, {}
+
+    async def create(self, file=None, purpose=None, input_file_id=None, endpoint=None, **kwargs):
+        if file is not None:  # files.create
+            file_id = f"file-{len(self._store)}"
+            self._store[file_id] = file.read().decode()
+            return SimpleNamespace(id=file_id)
+        out = []  # batches.create: answer every request line up front
+        for line in self._store[input_file_id].splitlines():
+            req = json.loads(line)
+            out.append(json.dumps({"custom_id": req["custom_id"], **self.respond(req)}))
+        output_id = f"file-{len(self._store)}"
+        self._store[output_id] = "\n".join(out)
+        batch_id = f"batch-{len(self._batches)}"
+        self._batches[batch_id] = {"output": output_id, "polls": 0}
+        return SimpleNamespace(id=batch_id, status="validating")
+
+    async def retrieve(self, batch_id):
+        b = self._batches[batch_id]
+        b["polls"] += 1
+        done = b["polls"] >= self.polls_until_done
+        return SimpleNamespace(id=batch_id, status="completed" if done else "in_progress",
+                               output_file_id=b["output"] if done else None, error_file_id=None)
+
+    async def content(self, file_id):
+        return SimpleNamespace(text=self._store[file_id])
+
+
+def _respond(req):
+    text = req["body"]["messages"][-1]["content"].split("Resume text:\n", 1)[1]
+    if "broken" in text:
+        return {"response": None, "error": {"code": "server_error", "message": "boom"}}
+    name = text.splitlines()[0]
+    body = {"choices": [{"message": {"content": json.dumps(
+        {"identity": {"full_name": name, "emails": []}, "meta": {"parsing_confidence": 0.9}})}}]}
+    return {"response": {"status_code": 200, "body": body}, "error": None}
+
+
+def test_batch_run_prepares_submits_collects_and_resumes(tmp_path, monkeypatch):
+    stored = []
+
+    def store_many(self, canonicals):
+        stored.extend(canonicals)
+        return [{"ok": True, "candidate_id": f"cand-{c['identity']['full_name']}"} for c in canonicals]
+
+    monkeypatch.setattr(HRResumeParserService, "cached_result", lambda self, sha: None)
+    monkeypatch.setattr(HRResumeParserService, "known_result", lambda self, text, sha: None)
+    monkeypatch.setattr(HRResumeParserService, "store_many", store_many)
+
+    files = [(f"Person {i}\nSkills: Python".encode(), f"p{i}.txt") for i in range(5)]
+    files.append((b"broken upload\nSkills: none", "broken.txt"))
+    api = FakeBatchAPI(_respond, polls_until_done=2)
+    run = BatchRun(str(tmp_path), kind="resume", client=api)
+    assert run.prepare(files) == 6
+
+    counts = asyncio.run(run.run(poll_seconds=0))
+    assert counts == {"stored": 5, "failed": 1}
+    assert sorted(c["identity"]["full_name"] for c in stored) == [f"Person {i}" for i in range(5)]
+    assert all(c["meta"]["source_file"].endswith(".txt") and c["meta"]["text_sha256"] for c in stored)
+
+    # A fresh run over the same workdir resumes from the checkpoint and stores nothing twice
+    again = BatchRun(str(tmp_path), kind="resume", client=api)
+    assert asyncio.run(again.collect()) == {"stored": 0, "failed": 0}
+    assert again.summary()["stored"] == 5 and again.summary()["failed"] == 1
+    assert len(stored) == 5
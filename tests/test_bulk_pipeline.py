@@ -0,0 +1,100 @@
+import io, random, time
+from hr_parser.bulk import run_bulk
+
+
+def _parse(text, mime, filename, file_sha):
+    time.sleep(random.uniform(0, 0.02))
+    if "boom" in text:
+        raise ValueError("bad resume")
+    return {"meta": {"source_file": filename, "source_mime": mime}, "text": text}
+
+
+def _store(canonicals):
+    time.sleep(random.uniform(0, 0.02))
+    return [{"ok": True, "candidate_id": c["meta"]["source_file"]} for c in canonicals]
+
+
+def test_bulk_keeps_order_and_error_shape():
+    items = [(io.BytesIO(f"resume {i}".encode()), f"r{i}.txt") for i in range(20)]
+    items[7] = (io.BytesIO(b"boom"), "bad.txt")
+
+    out = run_bulk(items, _parse, _store, max_concurrency=4)
+
+    assert len(out) == 20
+    assert out[7] == {"ok": False, "file": "bad.txt", "error": "bad resume"}
+    for i, res in enumerate(out):
+        if i != 7:
+            assert res == {"ok": True, "candidate_id": f"r{i}.txt"}
+
+
+def test_bulk_skips_already_ingested_files():
+    import hashlib
+    seen = []
+
+    def parse(text, mime, filename, file_sha):
+        seen.append(filename)
+        return _parse(text, mime, filename, file_sha)
+
+    known = hashlib.sha256(b"resume 1").hexdigest()
+    cached = {"ok": True, "candidate_id": "existing", "parsing_confidence": 0.8, "cached": True}
+    items = [(io.BytesIO(f"resume {i}".encode()), f"r{i}.txt") for i in range(3)]
+
+    out = run_bulk(items, parse, _store, lookup=lambda shas: {known: cached} if known in shas else {})
+
+    assert out[1] == cached
+    assert sorted(seen) == ["r0.txt", "r2.txt"]
+
+
+def test_bulk_stores_in_batches_and_keeps_per_doc_errors():
+    batches = []
+
+    def store(canonicals):
+        batches.append(len(canonicals))
+        return [ValueError("dup") if c["text"] == "resume 3" else {"ok": True, "candidate_id": c["text"]}
+                for c in canonicals]
+
+    items = [(io.BytesIO(f"resume {i}".encode()), f"r{i}.txt") for i in range(10)]
+    out = run_bulk(items, _parse, store, max_concurrency=4, store_batch=4)
+
+    assert sorted(batches) == [2, 4, 4]
+    assert out[3] == {"ok": False, "file": "r3.txt", "error": "dup"}
+    assert out[5] == {"ok": True, "candidate_id": "resume 5"}
+
+
+def test_bulk_endpoint_streams_ndjson_per_file():
+    import json
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from hr_parser.bulk import iter_bulk
+    from hr_parser.router import router
+
+    class FakeService:
+        def parse_bulk_fileobjs(self, items, on_result=None):
+            return run_bulk(items, _parse, _store, max_concurrency=2, store_batch=1, on_result=on_result)
+
+        def stream_bulk_fileobjs_async(self, items):
+            return iter_bulk(lambda on_result: self.parse_bulk_fileobjs(items, on_result=on_result))
+
+        async def parse_bulk_fileobjs_async(self, items):
+            return self.parse_bulk_fileobjs(items)
+
+    app = FastAPI()
+    app.include_router(router)
+    app.state.parser_services = {"resume": FakeService(), "job": FakeService()}
+    files = [("files", (f"r{i}.txt", f"resume {i}".encode())) for i in range(4)]
+    files[2] = ("files", ("bad.txt", b"boom"))
+
+    with TestClient(app) as client:
+        plain = client.post("/parser/bulk", files=files).json()
+        streamed = client.post("/parser/job/bulk", files=files, headers={"Accept": "application/x-ndjson"})
+
+    assert plain["count"] == 4 and plain["results"][2]["ok"] is False
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    *per_file, summary = lines
+    assert sorted(line["index"] for line in per_file) == [0, 1, 2, 3]
+    assert all("elapsed_sec" in line for line in per_file)
+    by_index = {line["index"]: line for line in per_file}
+    assert by_index[2]["ok"] is False and by_index[2]["file"] == "bad.txt"
+    assert by_index[0]["candidate_id"] == "r0.txt"
+    assert summary["summary"] is True and (summary["succeeded"], summary["failed"]) == (3, 1)
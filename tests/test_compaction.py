@@ -0,0 +1,43 @@
+from hr_parser.compaction import compact_text, count_tokens
+
+
+def _page(n, body):
+    return "\n".join(["Jane Doe  -  Curriculum Vitae", *body, f"Page {n} of 3", "Confidential | acme-recruiting.com"])
+
+
+def test_compaction_drops_page_furniture_and_duplicates():
+    bullet = "Built   ingestion pipelines processing 2M documents/day"
+    text = "\f".join([
+        _page(1, ["Senior Engineer", bullet, bullet, "~~~ ||| ~~~"]),
+        _page(2, ["Senior Engineer", bullet, "2019"]),
+        _page(3, ["Python, MongoDB, Kubernetes"]),
+    ])
+    out, stats = compact_text(text)
+    lines = out.splitlines()
+
+    assert lines.count("Jane Doe - Curriculum Vitae") == 1  # header kept once
+    assert not any(line.startswith("Page ") for line in lines)
+    assert lines.count("Confidential | acme-recruiting.com") == 1  # footer too
+    # The back-to-back repeat collapses; the same bullet on page 2 belongs to that entry
+    assert lines.count("Built ingestion pipelines processing 2M documents/day") == 2
+    assert lines.count("Senior Engineer") == 2  # short lines may repeat legitimately
+    assert "2019" in lines and "~~~ ||| ~~~" not in lines
+    assert stats["tokens_out"] < stats["tokens_in"] and stats["tokens_saved"] > 0
+
+
+def test_compaction_enforces_token_budget_on_line_boundary():
+    text = "\n".join(f"Achievement number {i} shipped on time and under budget" for i in range(500))
+    out, stats = compact_text(text, max_tokens=200)
+    assert count_tokens(out) <= 200
+    assert out.splitlines()[-1].endswith("under budget")
+    assert stats["tokens_out"] == count_tokens(out)
+
+
+def test_compaction_keeps_a_bullet_shared_by_two_roles():
+    shared = "Led a team of 5 engineers delivering the project ahead of schedule"
+    stack = "Tech: Python, Kafka, PostgreSQL, Kubernetes"
+    text = "\n".join(["Staff Engineer, Acme 2021-2024", shared, stack,
+                      "Senior Engineer, Globex 2017-2021", shared, stack])
+    lines = compact_text(text)[0].splitlines()
+    assert lines.count(shared) == 2 and lines.count(stack) == 2
+    assert lines.index("Senior Engineer, Globex 2017-2021") < len(lines) - 2
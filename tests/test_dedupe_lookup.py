@@ -0,0 +1,86 @@
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from hr_parser.repository import _best_match, _resume_lookup_keys, _upsert_many
+
+
+def test_best_match_follows_phone_email_hash_priority():
+    doc = {"identity": {"phones": ["+1 (555) 010-0000"], "emails": ["A@x.io"]}, "meta": {"hash_sha256": "h"}}
+    lookup = _resume_lookup_keys(doc)
+    assert lookup == ["phone:15550100000", "email:a@x.io", "hash:h"]
+
+    older, newer = ObjectId(), ObjectId()
+    by_email = {"_id": older, "dedupe": {"keys": ["email:a@x.io"]}}
+    by_phone = {"_id": newer, "dedupe": {"keys": ["phone:15550100000", "email:other@x.io"]}}
+    assert _best_match([by_email, by_phone], lookup) is by_phone
+
+    same_key = {"_id": ObjectId(), "dedupe": {"keys": ["email:a@x.io"]}}
+    assert _best_match([same_key, by_email], lookup) is by_email
+    assert _best_match([], lookup) is None
+
+
+
+class FakeCol:
+    def __init__(self, docs, fail_index=None):
+        self.docs, self.fail_index, self.ops = docs, fail_index, None
+
+    def find(self, query, projection):
+        keys = set(query["dedupe.keys"]["$in"])
+        return [d for d in self.docs if keys & set(d["dedupe"]["keys"])]
+
+    def bulk_write(self, ops, ordered):
+        self.ops = ops
+        if self.fail_index is not None:
+            raise BulkWriteError({"writeErrors": [{"index": self.fail_index, "errmsg": "boom"}]})
+
+
+def _doc(*keys):
+    return {"dedupe": {"keys": list(keys)}}
+
+
+def test_upsert_many_matches_stored_and_in_batch_docs():
+    stored = {"_id": ObjectId(), "dedupe": {"keys": ["email:a@x.io"]}}
+    col = FakeCol([stored])
+    docs = [_doc("email:a@x.io"), _doc("phone:1"), _doc("phone:1", "email:b@x.io"), _doc("email:b@x.io")]
+
+    ids = _upsert_many(col, docs, [d["dedupe"]["keys"] for d in docs])
+
+    assert ids[0] == str(stored["_id"])
+    assert ids[1] == ids[2] == ids[3] != ids[0]
+    assert [type(op) for op in col.ops] == [UpdateOne, InsertOne, UpdateOne, UpdateOne]
+
+
+def test_upsert_many_reports_errors_per_doc():
+    col = FakeCol([], fail_index=0)
+    docs = [_doc("phone:1"), _doc("phone:1"), _doc("phone:2")]
+
+    ids = _upsert_many(col, docs, [d["dedupe"]["keys"] for d in docs])
+
+    # the second doc was merged into the failed insert, so it failed too
+    assert isinstance(ids[0], Exception) and isinstance(ids[1], Exception)
+    assert isinstance(ids[2], str)
+
+
+def test_regex_identity_matches_repository_keys():
+    from hr_parser.identity import extract_identity, resume_identity_keys
+
+    text = ("JOHN DOE | John.Doe@Example.com | +1 (555) 010-0000\n"
+            "linkedin.com/in/john-doe/  Experience 2015 - 2021  Acme Corp\n"
+            "Order id 12345678901234567890")
+    identity = extract_identity(text)
+    assert identity["emails"] == ["john.doe@example.com"]
+    assert identity["phones"] == ["+1 (555) 010-0000"]
+    assert identity["linkedin"] == ["linkedin.com/in/john-doe"]
+
+    gpt_doc = {"identity": {"phones": ["+1 555 010 0000"], "emails": ["john.doe@example.com"]}, "meta": {}}
+    assert resume_identity_keys(identity["emails"], identity["phones"]) == _resume_lookup_keys(gpt_doc)[:-1]
+
+
+def test_regex_identity_does_not_join_numbers_across_lines():
+    from hr_parser.identity import extract_identity
+    text = "\n".join([
+        "Jane Roe", "+91 98765 43210",
+        "Anna Nagar, Chennai 600040",
+        "2019 - 2021 Data Analyst",  # pincode + date range only look like a phone joined across the newline
+    ])
+    assert extract_identity(text)["phones"] == ["+91 98765 43210"]
@@ -0,0 +1,19 @@
+from app import metrics
+from app.ml.emb_cache import VectorLRU
+
+
+def test_lru_is_bounded_by_bytes_and_counts():
+    metrics.reset()
+    lru = VectorLRU(max_bytes=3 * 4 * 4)  # three 4-dim float32 vectors
+    lru.put_many("m", {f"s{i}": [float(i)] * 4 for i in range(3)})
+    assert lru.get("m", "s0").tolist() == [0.0] * 4  # s0 becomes most recent
+
+    lru.put_many("m", {"s3": [3.0] * 4})
+
+    assert len(lru) == 3 and lru.bytes == 48
+    hits = lru.get_many("m", ["s0", "s1", "s3"])
+    assert {sha: v.tolist() for sha, v in hits.items()} == {"s0": [0.0] * 4, "s3": [3.0] * 4}
+    counters = metrics.snapshot()
+    assert counters["emb_cache.lru.evictions"] == 1
+    assert counters["emb_cache.lru.hits"] == 3
+    assert counters["emb_cache.lru.misses"] == 1
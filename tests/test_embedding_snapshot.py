@@ -0,0 +1,64 @@
+import numpy as np
+import app.ml.snapshot as snapshot_mod
+from app.ml.snapshot import EmbeddingSnapshot
+
+
+def test_snapshot_appends_replaces_and_compacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_mod, "_MIN_COMPACT_ROWS", 4)
+    rng = np.random.default_rng(1)
+    vecs = {f"d{i}": rng.normal(size=8) for i in range(3)}
+    writer = EmbeddingSnapshot(str(tmp_path), "candidates").attach(lambda: vecs.items())
+    reader = EmbeddingSnapshot(str(tmp_path), "candidates")  # another process
+    q = rng.normal(size=8)
+
+    def expected(v):
+        return (float(np.dot(v, q) / (np.linalg.norm(v) * np.linalg.norm(q))) + 1) / 2
+
+    writer.upsert("d3", rng.normal(size=8))
+    vecs["d0"] = rng.normal(size=8)
+    writer.upsert("d0", vecs["d0"])
+    scores = reader.semantic_scores(["d0", "d1", "missing"], q)
+    assert np.allclose(scores[:2], [expected(vecs["d0"]), expected(vecs["d1"])], atol=1e-6)
+    assert scores[2] is None
+
+    writer.upsert("d1", None)  # lost its vector; 2 of 6 rows stale, so it compacts
+    assert reader.semantic_scores(["d1"], q) == [None]
+    assert writer._gen == 2 and writer._rows == 3
+    assert sorted(d for d, _ in reader.items()) == ["d0", "d2", "d3"]
+    assert np.load(tmp_path / "candidates-2.npy", mmap_mode="r").shape == (3, 8)
+
+    vecs["d2"] = rng.normal(size=8)
+    writer.upsert("d2", vecs["d2"])
+    assert np.isclose(reader.semantic_scores(["d2"], q)[0], expected(vecs["d2"]), atol=1e-6)
+
+
+def test_reader_follows_a_compaction_between_resolve_and_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_mod, "_MIN_COMPACT_ROWS", 4)
+    rng = np.random.default_rng(2)
+    vecs = {f"d{i}": rng.normal(size=8) for i in range(4)}
+    writer = EmbeddingSnapshot(str(tmp_path), "candidates").attach(lambda: vecs.items())
+    reader = EmbeddingSnapshot(str(tmp_path), "candidates")
+    resolve, raced = reader._manifest_gen, []
+
+    def racing_resolve():
+        gen = resolve()
+        if not raced:  # the writer compacts right after the reader resolved gen 1
+            raced.append(gen)
+            writer.upsert_many([("d0", None), ("d1", None)])
+        return gen
+
+    monkeypatch.setattr(reader, "_manifest_gen", racing_resolve)
+    q = rng.normal(size=8)
+    scores = reader.semantic_scores(["d0", "d2"], q)
+    assert raced == [1] and reader._gen == 2 and not (tmp_path / "candidates-1.npy").exists()
+    assert scores[0] is None and scores[1] is not None
+
+
+def test_unreadable_snapshot_falls_back_without_rebuilding(tmp_path):
+    vecs = {f"d{i}": np.ones(8) for i in range(3)}
+    EmbeddingSnapshot(str(tmp_path), "candidates").attach(lambda: vecs.items())
+    (tmp_path / "candidates-1.npy").unlink()
+    reader = EmbeddingSnapshot(str(tmp_path), "candidates")
+    assert reader.attach(lambda: 1 / 0) is reader  # the loader is not called
+    assert reader.semantic_scores(["d0"], np.ones(8)) == [None]
+    assert list(reader.items()) == []
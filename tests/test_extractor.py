@@ -0,0 +1,60 @@
+import io, zipfile
+from hr_parser.extractor import bytes_to_text, detect_mime, DOCX_MIME, PDF_MIME
+
+
+def _docx_bytes():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("word/document.xml", "<w:document/>")
+    return buf.getvalue()
+
+
+def test_detect_mime_from_magic_bytes():
+    assert detect_mime(b"%PDF-1.7\n...") == PDF_MIME
+    assert detect_mime(b"\r\n %PDF-1.4") == PDF_MIME
+    assert detect_mime(b"\r\n junk %PDF-1.4", "cv.pdf") == PDF_MIME
+    assert detect_mime(_docx_bytes()) == DOCX_MIME
+    assert detect_mime(b"\x89PNG\r\n\x1a\n....") == "image/png"
+    assert detect_mime(b"\xff\xd8\xff\xe0....") == "image/jpeg"
+    # magic bytes win over a misleading name; the extension is only a fallback
+    assert detect_mime(b"%PDF-1.7", "resume.txt") == PDF_MIME
+    assert detect_mime(b"plain", "scan.jpg") == "image/jpeg"
+    assert detect_mime(b"plain", "cv") == "text/plain"
+    # Text that talks about PDFs is still text
+    notes = b"Skills: generating reports (%PDF-1.7, DOCX), Python\n"
+    assert detect_mime(notes) == detect_mime(notes, "notes.txt") == "text/plain"
+    assert detect_mime(b"The %PDF header", "cv.pdf") == "text/plain"
+
+
+def test_bytes_to_text_decodes_plain_text():
+    text, mime = bytes_to_text("Jane Doe – Engineer".encode() + b"\xff", "cv.txt")
+    assert (text, mime) == ("Jane Doe – Engineer", "text/plain")
+    assert bytes_to_text(memoryview(b"abc"))[0] == "abc"
+
+
+def _pdf_bytes(pages):
+    import fitz
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {i} experience with Python and Mongo")
+    scan = doc.new_page()
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+    scan.insert_image(scan.rect, pixmap=pix)
+    return doc.tobytes()
+
+
+def test_pdf_pages_are_planned_and_merged_in_order():
+    from concurrent.futures import ProcessPoolExecutor
+    from hr_parser.extractor import extract_pdf
+
+    data = _pdf_bytes(9)
+    serial, pages = extract_pdf(data)
+    assert [p["plan"] for p in pages] == ["text"] * 9 + ["ocr"]
+    assert [p["method"] for p in pages[:9]] == ["text"] * 9
+    assert all(p["seconds"] >= 0 and "text" not in p for p in pages)
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        parallel, parallel_pages = extract_pdf(data, executor=pool)
+    assert parallel == serial
+    assert [p["page"] for p in parallel_pages] == list(range(10))
+    assert serial.splitlines()[0].startswith("Page 0") and serial.splitlines()[-1].startswith("Page 8")
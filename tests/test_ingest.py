@@ -0,0 +1,198 @@
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+import hr_parser.ingest as ingest
+
+
+class FakeCursor(list):
+    def sort(self, key, direction=1):
+        return FakeCursor(sorted(self, key=lambda d: d[key], reverse=direction < 0))
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the ingest queue, with atomic single-doc updates."""
+
+    def __init__(self):
+        self.docs = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _match(doc, query):
+        for key, cond in query.items():
+            if key == "$or":
+                if not any(FakeCollection._match(doc, q) for q in cond):
+                    return False
+                continue
+            value = doc.get(key)
+            if isinstance(cond, dict):
+                if "$lt" in cond and not (value is not None and value < cond["$lt"]):
+                    return False
+                if "$gte" in cond and not (value is not None and value >= cond["$gte"]):
+                    return False
+            elif value != cond:
+                return False
+        return True
+
+    @staticmethod
+    def _apply(doc, update):
+        doc.update(update.get("$set", {}))
+        for key, n in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + n
+        for key in update.get("$unset", {}):
+            doc.pop(key, None)
+
+    def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        with self._lock:
+            self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs):
+        return SimpleNamespace(inserted_ids=[self.insert_one(d).inserted_id for d in docs])
+
+    def find_one(self, query):
+        return next(iter(self.find(query)), None)
+
+    def find(self, query, projection=None):
+        with self._lock:
+            found = [dict(d) for d in self.docs if self._match(d, query)]
+        return FakeCursor(found)
+
+    def find_one_and_update(self, query, update, sort=None, return_document=None):
+        with self._lock:
+            found = [d for d in self.docs if self._match(d, query)]
+            for key, direction in reversed(sort or []):
+                found.sort(key=lambda d: d[key], reverse=direction < 0)
+            if not found:
+                return None
+            self._apply(found[0], update)
+            return dict(found[0])
+
+    def update_one(self, query, update):
+        with self._lock:
+            for d in self.docs:
+                if self._match(d, query):
+                    self._apply(d, update)
+                    return SimpleNamespace(matched_count=1, modified_count=1)
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+    def update_many(self, query, update):
+        with self._lock:
+            hits = [d for d in self.docs if self._match(d, query)]
+            for d in hits:
+                self._apply(d, update)
+        return SimpleNamespace(matched_count=len(hits), modified_count=len(hits))
+
+
+class EchoService:
+    def parse_bytes(self, data, filename):
+        return {"ok": data != b"bad", "file": filename}
+
+
+def _queue(monkeypatch, n, kind="resume"):
+    monkeypatch.setattr(ingest, "ingest_jobs_col", FakeCollection())
+    monkeypatch.setattr(ingest, "ingest_queue_col", FakeCollection())
+    monkeypatch.setattr(ingest._pool, "start", lambda services=None: None)
+    files = [(b"bad" if i == 1 else b"pdf", f"f{i}.pdf") for i in range(n)]
+    pool = ingest.IngestWorkerPool(workers=0)
+    pool._services = {kind: EchoService()}
+    return ingest.submit_ingest(files, kind), pool
+
+
+def test_concurrent_claims_take_distinct_items(monkeypatch):
+    ingest_id, pool = _queue(monkeypatch, 40)
+    claimed, barrier = [], threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        while (item := pool._claim()) is not None:
+            claimed.append((item["index"], item["claim"]))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(i for i, _ in claimed) == list(range(40))
+    assert len({token for _, token in claimed}) == 40
+    assert ingest.get_ingest_status(ingest_id)["running"] == 40
+
+
+def test_requeued_item_is_finished_only_by_its_new_owner(monkeypatch):
+    ingest_id, pool = _queue(monkeypatch, 1)
+    stale = pool._claim()
+    # The first worker stalls past its lease without renewing it
+    ingest.ingest_queue_col.update_one({"_id": stale["_id"]}, {"$set": {"heartbeat_at": time.time() - 10_000}})
+    pool._requeue_stale()
+    assert ingest.get_ingest_status(ingest_id)["queued"] == 1
+
+    fresh = pool._claim()
+    assert fresh["claim"] != stale["claim"] and fresh["attempts"] == 2
+    assert not pool._finish(stale, {"ok": False, "file": "f0.pdf", "error": "late"})
+    assert pool._finish(fresh, {"ok": True, "file": "f0.pdf"})
+    assert not pool._finish(fresh, {"ok": True, "file": "f0.pdf"})
+
+    status = ingest.get_ingest_status(ingest_id)
+    assert (status["status"], status["succeeded"], status["failed"]) == ("completed", 1, 0)
+    assert ingest.ingest_jobs_col.find_one({})["succeeded"] == 1
+
+
+def test_live_heartbeat_keeps_the_lease_and_exhausted_items_fail(monkeypatch):
+    ingest_id, pool = _queue(monkeypatch, 2)
+    monkeypatch.setattr(ingest, "INGEST_LEASE_SECONDS", 60)
+    live, dead = pool._claim(), pool._claim()
+    long_ago = time.time() - 10_000
+    # Both were claimed long ago, but only `live` has renewed its lease since
+    ingest.ingest_queue_col.update_many({}, {"$set": {"started_at": long_ago}})
+    ingest.ingest_queue_col.update_one({"_id": dead["_id"]},
+                                       {"$set": {"heartbeat_at": long_ago, "attempts": ingest.MAX_ATTEMPTS}})
+    pool._requeue_stale()
+
+    status = ingest.get_ingest_status(ingest_id)
+    assert (status["running"], status["failed"]) == (1, 1)
+    assert status["failures"][0]["error"] == "Worker lease expired too many times"
+    assert pool._finish(live, {"ok": True, "file": "f0.pdf"})
+    assert ingest.get_ingest_status(ingest_id)["status"] == "completed"
+
+
+def test_pool_drains_queue_with_progress_counts(monkeypatch):
+    ingest_id, pool = _queue(monkeypatch, 5)
+    status = ingest.get_ingest_status(ingest_id)
+    assert (status["status"], status["queued"], status["total"]) == ("queued", 5, 5)
+
+    for n in itertools.count(1):
+        item = pool._claim()
+        if item is None:
+            break
+        pool._process(item)
+        status = ingest.get_ingest_status(ingest_id)
+        assert status["succeeded"] + status["failed"] == n
+        assert status["queued"] == 5 - n
+
+    assert (status["status"], status["succeeded"], status["failed"]) == ("completed", 4, 1)
+    assert [f["file"] for f in status["failures"]] == ["f1.pdf"]
+    assert all("data" not in d for d in ingest.ingest_queue_col.docs)
+    assert ingest.ingest_jobs_col.find_one({})["finished_at"] is not None
+
+
+def test_heartbeat_renews_the_lease_while_parsing(monkeypatch):
+    ingest_id, pool = _queue(monkeypatch, 1)
+    monkeypatch.setattr(ingest, "INGEST_LEASE_SECONDS", 1.5)
+    item = pool._claim()
+    renewed = []
+
+    class SlowService:
+        def parse_bytes(self, data, filename):
+            time.sleep(1.3)
+            renewed.append(ingest.ingest_queue_col.find_one({})["heartbeat_at"])
+            return {"ok": True, "file": filename}
+
+    pool._services = {"resume": SlowService()}
+    pool._process(item)
+    assert renewed[0] > item["heartbeat_at"]
+    assert ingest.get_ingest_status(ingest_id)["succeeded"] == 1
@@ -0,0 +1,23 @@
+import numpy as np
+from app.scoring.matrix import semantic_for_pool
+from app.scoring.score import compute_base_and_semantic, candidate_vec, job_vec
+
+
+def test_matrix_scores_match_per_pair_scoring():
+    rng = np.random.default_rng(7)
+    job = {
+        "requirements": {"required_skills": ["Python", "SQL"], "preferred_skills": ["AWS"]},
+        "emb": {"jd_vec": rng.normal(size=1536).tolist()},
+    }
+    candidates = [
+        {"skills": [{"name": "Python"}], "emb": {"summary_vec": rng.normal(size=1536).tolist()}}
+        for _ in range(200)
+    ]
+    candidates.append({"skills": [{"name": "SQL"}], "emb": {"skills_vec": rng.normal(size=1536).tolist()}})
+    candidates.append({"skills": [{"name": "AWS"}], "emb": {}})
+    candidates.append({"skills": [], "emb": {"summary_vec": [0.0] * 1536}})
+
+    semantic = semantic_for_pool(candidates, candidate_vec, job_vec(job))
+
+    for c, sem in zip(candidates, semantic):
+        assert compute_base_and_semantic(c, job, semantic=sem) == compute_base_and_semantic(c, job)
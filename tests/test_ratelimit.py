@@ -0,0 +1,105 @@
+import asyncio, threading, time
+from types import SimpleNamespace
+
+import pytest
+
+from hr_parser.ratelimit import AdaptiveLimiter, TokenBucket
+
+
+class Throttled(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers={"retry-after-ms": str(int(retry_after * 1000))})
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(600)  # 10 per second
+    now = time.monotonic()
+    assert bucket.wait_time(600, now) == 0
+    bucket.take(600)
+    assert bucket.wait_time(5, now) == pytest.approx(0.5, abs=0.01)
+    assert TokenBucket(0).wait_time(10 ** 9, now) == 0
+
+
+def test_429_halves_window_and_pauses_every_caller():
+    limiter = AdaptiveLimiter("test", rpm=0, tpm=0, max_concurrency=8)
+    calls = []
+
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise Throttled(retry_after=0.2)
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=10))
+
+    started = time.monotonic()
+    limiter.call(flaky, tokens=100)
+    assert calls[1] - started >= 0.2  # Retry-After honoured before the retry
+    assert limiter.window == pytest.approx(4 + 1 / 4)  # halved, then one additive step
+
+    for _ in range(50):
+        limiter.call(lambda: None, tokens=1)
+    assert limiter.window == 8  # additive increase back up to the ceiling
+
+
+def test_concurrency_window_is_shared_by_threads_and_tasks():
+    limiter = AdaptiveLimiter("test", rpm=0, tpm=0, max_concurrency=3)
+    peak, lock, active = [0], threading.Lock(), [0]
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    async def awork():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    async def tasks():
+        await asyncio.gather(*(limiter.call_async(awork, tokens=1) for _ in range(6)))
+
+    threads = [threading.Thread(target=limiter.call, args=(work, 1)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    asyncio.run(tasks())
+    for t in threads:
+        t.join()
+    assert peak[0] <= 3 and limiter.in_flight == 0
+
+
+def test_token_budget_throttles_requests():
+    limiter = AdaptiveLimiter("test", rpm=0, tpm=6000, max_concurrency=10)  # 100 tokens/s
+    started = time.monotonic()
+    for tokens in (3000, 3000, 100):
+        limiter.call(lambda: None, tokens=tokens)
+    assert 0.9 <= time.monotonic() - started < 3  # the third call waits for ~1s of refill
+
+
+def test_concurrent_429s_halve_the_window_once_per_episode():
+    limiter = AdaptiveLimiter("test", rpm=0, tpm=0, max_concurrency=16)
+    barrier = threading.Barrier(8)
+
+    def burst():
+        limiter.acquire(1)
+        barrier.wait()  # all eight are in flight when the first 429 lands
+        limiter.release(1, error=Throttled(retry_after=0.2))
+
+    threads = [threading.Thread(target=burst) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert limiter.window == 8 and limiter._strikes == 1 and limiter.in_flight == 0
+
+    time.sleep(0.25)  # a 429 after the cooldown starts a new episode
+    limiter.acquire(1)
+    limiter.release(1, error=Throttled(retry_after=0.05))
+    assert limiter.window == 4 and limiter._strikes == 2
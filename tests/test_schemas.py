@@ -0,0 +1,78 @@
+import pytest
+from pydantic import TypeAdapter, EmailStr, ValidationError
+
+from hr_parser.job_schemas import validate_job
+from hr_parser.schemas import email, validate_resume
+
+
+def test_resume_is_normalised_in_one_validation_pass():
+    doc = validate_resume({
+        "meta": {"parsing_confidence": "high", "file_sha256": "f" * 64},
+        "identity": {"emails": ["Jane@Example.COM"], "location": {"country": "India"}},
+        "skills": [{"name": "Python", "proficiency": " Advanced"}, {"name": "Go", "proficiency": "guru"}],
+        "experience": [{"start_date": "Jan 2019", "end_date": "Present"}, {"start_date": "2015-04", "end_date": "n/a"}],
+        "education": [{"score": {"value": 8.1, "scale": None}}],
+        "preferences": {"relocation": True, "salary": {"currency": "bitcoin", "expectation_lpa": "32"}},
+        "headline": "kept",
+    })
+    assert doc["meta"]["parsing_confidence"] == 0.75
+    assert doc["meta"]["file_sha256"] == "f" * 64
+    assert doc["identity"]["emails"] == ["Jane@example.com"]
+    assert doc["identity"]["location"]["country"] == "IN"
+    assert [s["proficiency"] for s in doc["skills"]] == ["advanced", None]
+    first, second = doc["experience"]
+    assert (first["start_date"], first["end_date"], first["current"]) == ("2019", None, True)
+    assert (second["start_date"], second["end_date"]) == ("2015-04", None)
+    assert doc["education"][0]["score"] == {"value": 8.1}
+    assert doc["preferences"]["relocation"] == "Yes"
+    assert doc["preferences"]["salary"] == {"expectation_lpa": 32.0}
+    assert doc["headline"] == "kept"  # keys beyond the schema are stored as before
+
+
+def test_job_is_normalised_and_missing_sections_default():
+    doc = validate_job({
+        "meta": {},
+        "details": {"employment_type": "full_time", "travel_required": "Not required", "visa_sponsorship": 3},
+        "location": {"country": "United Kingdom", "remote": "yes", "hybrid": "maybe"},
+        "requirements": {"education_level": "Master's"},
+        "application": {"application_deadline": "31 March 2026", "contact_email": "Jobs@Corp.IO"},
+    })
+    assert doc["details"]["employment_type"] == "full_time"
+    assert (doc["details"]["travel_required"], doc["details"]["visa_sponsorship"]) == (False, None)
+    assert doc["location"] == {"country": "GB", "remote": True, "hybrid": None}
+    assert doc["requirements"]["education_level"] == "master"
+    assert doc["application"]["application_deadline"] == "2026"
+    assert doc["application"]["contact_email"] == "Jobs@corp.io"
+    assert doc["compensation"] == {} and doc["company"] == {} and doc["benefits"] == []
+
+
+def test_validated_documents_keep_their_shape():
+    raw = {
+        "meta": {"parsing_confidence": 0.9},
+        "identity": {"full_name": "Jane Roe", "emails": ["jane@example.com"]},
+        "experience": [{"company": "Acme", "end_date": "Present"}, {"company": "Globex"}],
+        "skills": [{"name": "Go"}],
+    }
+    doc = validate_resume(raw)
+    assert raw["experience"][0] == {"company": "Acme", "end_date": "Present"}  # input left untouched
+    # Defaults do not add None-valued keys GPT left out
+    assert doc == {
+        "meta": {"parsing_confidence": 0.9},
+        "identity": {"full_name": "Jane Roe", "emails": ["jane@example.com"]},
+        "experience": [{"company": "Acme", "end_date": None, "current": True}, {"company": "Globex"}],
+        "skills": [{"name": "Go"}],
+    }
+
+
+@pytest.mark.parametrize("address", [
+    "a.b+c@sub.example.co.in", "Jane@Example.COM", "a..b@x.io", ".a@x.io", "a@x", "a@-x.com",
+    "x@host.local", "a@example.test", "user@xn--bcher-kva.com", "ünï@x.com",
+])
+def test_email_matches_emailstr(address):
+    try:
+        expected = TypeAdapter(EmailStr).validate_python(address)
+    except ValidationError:
+        with pytest.raises(ValidationError):
+            email(address)
+    else:
+        assert email(address) == email(address) == expected
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+import app.scoring.pipeline as pipeline
+from app.scoring.pipeline import ScoreWriter
+
+
+class FakeScores:
+    """Records bulk_write calls; `fail` maps a call number to the error it raises."""
+
+    def __init__(self, fail=None):
+        self.calls = []
+        self.fail = fail or {}
+
+    def bulk_write(self, ops, ordered=True):
+        self.calls.append((ops, ordered))
+        error = self.fail.get(len(self.calls))
+        if error is not None:
+            raise error
+
+
+def _writer(monkeypatch, batch_size, fail=None):
+    scores = FakeScores(fail)
+    monkeypatch.setattr(pipeline, "db", SimpleNamespace(scores=scores))
+    return ScoreWriter(batch_size=batch_size), scores
+
+
+def _key(i):
+    return {"job_id": "j1", "candidate_id": f"c{i}"}
+
+
+def test_flushes_full_batches_then_the_final_partial_one(monkeypatch):
+    writer, scores = _writer(monkeypatch, batch_size=3)
+    for i in range(7):
+        writer.add(_key(i), {"total": i / 10})
+    assert [len(ops) for ops, _ in scores.calls] == [3, 3]
+    assert writer.written == 6
+
+    writer.flush()
+    writer.flush()  # nothing left; no empty bulk_write
+    assert [len(ops) for ops, _ in scores.calls] == [3, 3, 1]
+    assert writer.written == 7
+    assert all(ordered is False for _, ordered in scores.calls)
+
+    op = scores.calls[2][0][0]
+    assert op._filter == _key(6) and op._upsert
+    assert op._doc["$set"]["total"] == 0.6 and op._doc["$set"]["candidate_id"] == "c6"
+
+
+def test_failed_pairs_are_reported_and_not_counted(monkeypatch, capsys):
+    partial = BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "duplicate key"}]})
+    writer, scores = _writer(monkeypatch, batch_size=2, fail={1: partial, 2: RuntimeError("connection reset")})
+    for i in range(5):
+        writer.add(_key(i), {"total": 0.5})
+    writer.flush()
+
+    assert [len(ops) for ops, _ in scores.calls] == [2, 2, 1]
+    # Batch 1 lost one pair, batch 2 failed as a whole, batch 3 went through
+    assert writer.written == 2
+    out = capsys.readouterr().out
+    assert "candidate c1 / job j1: duplicate key" in out
+    assert "candidate c2 / job j1: connection reset" in out and "candidate c3 / job j1: connection reset" in out
+    assert "c0 /" not in out and "c4 /" not in out
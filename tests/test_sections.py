@@ -0,0 +1,123 @@
+import pytest
+
+from hr_parser.sections import JOB_LAYOUT, RESUME_LAYOUT, merge_parts, plan_parts, split_sections
+
+RESUME = "\n".join([
+    "Jane Doe", "jane@example.com", "Summary: backend engineer",
+    "Work Experience:",
+    *[line for i in range(12) for line in (f"Engineer at Company {i} 20{10 + i}-20{11 + i}",
+                                           f"Built service number {i} handling payments and search")],
+    "Education",
+    "BSc Computer Science, State University 2006-2010",
+    "Skills",
+    "Python, Go, MongoDB",
+])
+
+
+def test_long_resume_is_split_into_general_and_section_parts():
+    assert [name for name, _ in split_sections(RESUME, RESUME_LAYOUT)] == ["header", "experience", "education", "skills"]
+
+    parts = plan_parts(RESUME, RESUME_LAYOUT, min_tokens=50, chunk_tokens=80)
+    names = [p["name"] for p in parts]
+    assert names[0] == "general" and "Python, Go" in parts[0]["text"] and "Company" not in parts[0]["text"]
+    assert names.count("experience") > 1 and names.count("education") == 1
+    # every role lands in exactly one chunk, each chunk starts with the heading
+    chunks = [p["text"] for p in parts if p["name"] == "experience"]
+    assert all(c.startswith("Work Experience:") for c in chunks)
+    assert sum(c.count("Engineer at Company") for c in chunks) == 12
+
+    jd = "Senior SRE at Acme\nWhat you'll do:\nRun Kubernetes\nRequirements\n5+ years Linux\nBenefits\nHealth"
+    assert [n for n, _ in split_sections(jd, JOB_LAYOUT)] == ["header", "responsibilities", "qualifications", "benefits"]
+    assert plan_parts(RESUME, RESUME_LAYOUT, min_tokens=100000) == [{"name": "general", "keys": None, "text": RESUME}]
+
+
+def test_merge_keeps_section_ownership_and_document_order():
+    general = {"name": "general", "keys": None}
+    exp1 = {"name": "experience", "keys": ["experience"]}
+    exp2 = {"name": "experience", "keys": ["experience"]}
+    merged = merge_parts([
+        (general, {"identity": {"full_name": "Jane Doe", "emails": []}, "skills": [{"name": "Python"}],
+                   "experience": [{"company": "hallucinated"}]}),
+        (exp1, {"experience": [{"company": "A"}, {"company": "B"}], "identity": {"full_name": "Other"}}),
+        (exp2, {"experience": [{"company": "B"}, {"company": "C"}]}),
+    ])
+    assert [e["company"] for e in merged["experience"]] == ["A", "B", "C"]
+    assert merged["identity"]["full_name"] == "Jane Doe"
+    assert merged["skills"] == [{"name": "Python"}]
+
+    job = merge_parts([
+        (general, {"details": {"title": "SRE"}, "requirements": {"experience_years": 5, "required_skills": []}}),
+        ({"name": "qualifications", "keys": ["qualifications", "requirements"]},
+         {"qualifications": ["Linux"], "requirements": {"experience_years": 3, "required_skills": ["Linux"]}}),
+    ])
+    assert job["requirements"] == {"experience_years": 5, "required_skills": ["Linux"]}
+    assert job["qualifications"] == ["Linux"]
+
+
+def test_parse_with_gpt_runs_parts_concurrently(monkeypatch):
+    import hr_parser.gpt_client as gpt
+    import hr_parser.sections as sections
+
+    monkeypatch.setattr(gpt, "USE_MOCK", False)
+    monkeypatch.setattr(gpt, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(sections, "SECTION_PARALLEL_MIN_TOKENS", 50)
+    monkeypatch.setattr(sections, "SECTION_CHUNK_TOKENS", 80)
+    prompts = []
+
+    def fake_complete(messages):
+        text = messages[-1]["content"].split("Resume text:\n", 1)[1]
+        prompts.append(text)
+        if text.startswith("Jane Doe"):
+            return {"identity": {"full_name": "Jane Doe", "emails": ["jane@example.com"]}, "skills": [{"name": "Go"}]}
+        if text.startswith("Education"):
+            return {"education": [{"institution": "State University"}]}
+        return {"experience": [{"company": line.split(" at ")[1].split(" 20")[0]}
+                               for line in text.splitlines() if " at Company" in line]}
+
+    monkeypatch.setattr(gpt, "_complete", fake_complete)
+    obj = gpt.parse_with_gpt(RESUME, source_file="jane.pdf")
+    assert len(prompts) > 3
+    assert [e["company"] for e in obj["experience"]] == [f"Company {i}" for i in range(12)]
+    assert obj["education"] == [{"institution": "State University"}]
+    assert obj["meta"]["source_file"] == "jane.pdf"
+
+
+def test_bad_json_retries_only_its_part_and_api_errors_are_not_retried(monkeypatch):
+    from types import SimpleNamespace
+    from tenacity import wait_none
+    import hr_parser.gpt_client as gpt
+    import hr_parser.sections as sections
+
+    monkeypatch.setattr(gpt, "USE_MOCK", False)
+    monkeypatch.setattr(gpt, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(sections, "SECTION_PARALLEL_MIN_TOKENS", 50)
+    monkeypatch.setattr(sections, "SECTION_CHUNK_TOKENS", 80)
+    monkeypatch.setattr(gpt._complete.retry, "wait", wait_none())
+    compactions, sent = [], []
+    real_compact = gpt.compact_for_prompt
+    monkeypatch.setattr(gpt, "compact_for_prompt", lambda text: compactions.append(text) or real_compact(text))
+
+    def create(**body):
+        text = body["messages"][-1]["content"].split("Resume text:\n", 1)[1]
+        sent.append(text)
+        if text == "down":
+            raise RuntimeError("API error the limiter gave up on")
+        if text.startswith("Education") and sent.count(text) == 1:
+            content = '{"education": [{"institution": "State'  # cut off mid-reply
+        elif text.startswith("Education"):
+            content = '{"education": [{"institution": "State University"}]}'
+        else:
+            content = "{}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(gpt, "get_openai", lambda: client)
+    obj = gpt.parse_with_gpt(RESUME, source_file="jane.pdf")
+    assert obj["education"] == [{"institution": "State University"}]
+    assert len(compactions) == 1
+    assert len(sent) == len(set(sent)) + 1  # only the cut-off part was sent twice
+
+    sent.clear()
+    with pytest.raises(RuntimeError):
+        gpt.parse_with_gpt("down", "down.pdf")
+    assert sent == ["down"]
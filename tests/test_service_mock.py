@@ -1,4 +1,4 @@
-import io, os
+import asyncio, io, os
 from hr_parser.service import HRResumeParserService
 
 def test_mock_parse(monkeypatch):
@@ -7,4 +7,123 @@ def test_mock_parse(monkeypatch):
     fake = io.BytesIO(b"John Doe\nEmail: john@example.com\nSkills: Python, FastAPI")
     res = svc.parse_fileobj(fake, "john_doe.pdf")
     assert res["ok"] is True
-    assert "candidate_id" in res
\ No newline at end of file
+    assert "candidate_id" in res
+
+def test_mock_parse_async(monkeypatch):
+    import asyncio
+    import hr_parser.service as service_mod
+    from hr_parser.gpt_client import _mock_response
+
+    async def fake_gpt(text, source_file):
+        return _mock_response(text, source_file)
+
+    async def fake_upsert(doc):
+        return "cand-1"
+
+    async def no_embeddings(doc, doc_type):
+        return doc
+
+    async def no_fingerprints(kind, shas, prompt_version):
+        return {}
+
+    async def record(*args):
+        pass
+
+    monkeypatch.setattr(service_mod, "parse_with_gpt_async", fake_gpt)
+    monkeypatch.setattr(service_mod, "upsert_canonical_async", fake_upsert)
+    monkeypatch.setattr(service_mod, "find_fingerprints_async", no_fingerprints)
+    monkeypatch.setattr(service_mod, "record_fingerprint_async", record)
+    svc = HRResumeParserService()
+    monkeypatch.setattr(svc.embedding_service, "store_embeddings_async", no_embeddings)
+
+    res = asyncio.run(svc.parse_bytes_async(b"John Doe\nSkills: Python", "john_doe.txt"))
+    assert res == {"ok": True, "candidate_id": "cand-1", "parsing_confidence": 0.9}
+
+def test_known_text_skips_gpt_and_embeddings(monkeypatch):
+    import hr_parser.service as service_mod
+    from hr_parser.identity import text_fingerprint
+
+    text = "Jane Roe\njane.roe@example.com | +91 98765-43210\nSkills: Python"
+    queries, recorded = [], []
+
+    def find_known(keys, text_sha, prompt_version):
+        queries.append((keys, text_sha))
+        return {"_id": "cand-7", "meta": {"parsing_confidence": 0.8}}
+
+    def fail(*args, **kwargs):
+        raise AssertionError("GPT/embeddings must not run for known text")
+
+    monkeypatch.setattr(service_mod, "find_fingerprints", lambda kind, shas, pv: {})
+    monkeypatch.setattr(service_mod, "find_known_resume", find_known)
+    monkeypatch.setattr(service_mod, "record_fingerprint", lambda *args: recorded.append(args))
+    monkeypatch.setattr(service_mod, "extract_in_pool", lambda data, filename: (text, "text/plain"))
+    monkeypatch.setattr(service_mod, "parse_with_gpt", fail)
+    svc = HRResumeParserService()
+    monkeypatch.setattr(svc.embedding_service, "store_embeddings_many", fail)
+
+    res = svc.parse_bytes(b"raw upload bytes", "jane.pdf")
+    assert res == {"ok": True, "candidate_id": "cand-7", "parsing_confidence": 0.8, "cached": True}
+    assert queries == [(["phone:919876543210", "email:jane.roe@example.com"], text_fingerprint(text))]
+    assert recorded[0][3] == "cand-7"
+
+    # The async path takes the same shortcut through _known_text_async
+    async def find_known_async(*args):
+        return find_known(*args)
+
+    async def record_async(*args):
+        recorded.append(args)
+
+    async def no_fingerprints(*args):
+        return {}
+
+    monkeypatch.setattr(service_mod, "find_fingerprints_async", no_fingerprints)
+    monkeypatch.setattr(service_mod, "find_known_resume_async", find_known_async)
+    monkeypatch.setattr(service_mod, "record_fingerprint_async", record_async)
+    monkeypatch.setattr(service_mod, "parse_with_gpt_async", fail)
+    assert asyncio.run(svc.parse_bytes_async(b"raw upload bytes", "jane.pdf")) == res
+    assert queries[1] == queries[0] and recorded[1][3] == "cand-7"
+
+def test_fingerprint_failures_do_not_fail_single_uploads(monkeypatch):
+    import asyncio
+    import hr_parser.job_service as job_mod
+    import hr_parser.service as service_mod
+    from hr_parser.gpt_client import _mock_response
+    from hr_parser.job_gpt_client import _mock_job_response
+    from hr_parser.job_service import HRJobParserService
+
+    def down(*args, **kwargs):
+        raise RuntimeError("fingerprints unavailable")
+
+    async def down_async(*args, **kwargs):
+        raise RuntimeError("fingerprints unavailable")
+
+    async def fake_gpt(text, source_file):
+        return _mock_job_response(text, source_file)
+
+    async def fake_upsert(doc):
+        return "job-1"
+
+    async def no_embeddings(doc, doc_type):
+        return doc
+
+    # Async job upload: lookup error is a miss, the post-upsert record is best-effort
+    monkeypatch.setattr(job_mod, "find_fingerprints_async", down_async)
+    monkeypatch.setattr(job_mod, "record_fingerprint_async", down_async)
+    monkeypatch.setattr(job_mod, "parse_job_with_gpt_async", fake_gpt)
+    monkeypatch.setattr(job_mod, "upsert_job_async", fake_upsert)
+    jobs = HRJobParserService()
+    monkeypatch.setattr(jobs.embedding_service, "store_embeddings_async", no_embeddings)
+    res = asyncio.run(jobs.parse_bytes_async(b"Data Scientist at TechCorp", "jd.txt"))
+    assert res["ok"] is True and res["job_id"] == "job-1"
+
+    # Sync resume upload: same, through the batched store path
+    monkeypatch.setattr(service_mod, "find_fingerprints", down)
+    monkeypatch.setattr(service_mod, "find_known_resume", lambda *args: None)
+    monkeypatch.setattr(service_mod, "record_fingerprints", down)
+    monkeypatch.setattr(service_mod, "upsert_canonical_many", lambda docs: ["cand-2"] * len(docs))
+    monkeypatch.setattr(service_mod, "extract_in_pool", lambda data, filename: ("John Doe", "text/plain"))
+    monkeypatch.setattr(service_mod, "parse_with_gpt", lambda text, source_file: _mock_response(text, source_file))
+    svc = HRResumeParserService()
+    monkeypatch.setattr(svc.embedding_service, "store_embeddings_many", lambda docs, doc_type: docs)
+    res = svc.parse_bytes(b"John Doe", "john_doe.txt")
+    assert res["ok"] is True and res["candidate_id"] == "cand-2"
@@ -0,0 +1,63 @@
+import bson
+import numpy as np
+from app.ml.vector_codec import encode, decode, is_encoded
+from app.scoring.score import candidate_vec
+
+
+def test_float32_and_int8_round_trip_through_bson():
+    vec = np.random.default_rng(3).normal(size=1536)
+    doc = bson.decode(bson.encode({"f": encode(vec, "float32"), "q": encode(vec, "int8")}))
+
+    f32 = decode(doc["f"])
+    assert f32.dtype == np.float32 and not f32.flags.writeable  # view over the BSON bytes
+    assert np.array_equal(f32, vec.astype(np.float32))
+    q = decode(doc["q"])
+    assert np.max(np.abs(q - vec)) <= np.max(np.abs(vec)) / 127
+    assert is_encoded(doc["f"], "float32") and is_encoded(doc["q"], "int8")
+    assert len(bson.encode({"v": doc["q"]})) < len(bson.encode({"v": doc["f"]})) < len(bson.encode({"v": vec.tolist()}))
+
+
+def test_legacy_lists_and_empty_vectors_decode():
+    assert decode([1.0, 2.0]).tolist() == [1.0, 2.0]
+    assert decode([]) is None and decode(None) is None
+    assert candidate_vec({"emb": {"summary_vec": [], "skills_vec": encode([0.5, 0.25])}}).tolist() == [0.5, 0.25]
+
+
+def test_migration_switches_between_binary_formats():
+    import importlib.util, os
+    path = os.path.join(os.path.dirname(__file__), "..", "scripts", "migrate_vectors.py")
+    spec = importlib.util.spec_from_file_location("migrate_vectors", path)
+    migrate = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migrate)
+
+    class FakeCollection:
+        def __init__(self, docs):
+            self.docs = {d["_id"]: d for d in docs}
+
+        def find(self, query, projection, batch_size):
+            return [bson.decode(bson.encode(d)) for d in self.docs.values()]
+
+        def bulk_write(self, ops, ordered):
+            for op in ops:
+                doc = self.docs[op._filter["_id"]]
+                for field, value in op._doc["$set"].items():
+                    *parents, leaf = field.split(".")
+                    target = doc
+                    for part in parents:
+                        target = target[part]
+                    target[leaf] = value
+
+    vec = np.random.default_rng(5).normal(size=64)
+    col = FakeCollection([{"_id": 1, "emb": {"skills_vec": encode(vec, "float32"), "summary_vec": None}}])
+    fields = ["emb.skills_vec", "emb.summary_vec"]
+
+    assert migrate.migrate_collection(col, fields, "int8", 10, False) == (1, 1)
+    stored = col.docs[1]["emb"]["skills_vec"]
+    assert is_encoded(stored, "int8")
+    assert np.max(np.abs(decode(stored) - vec)) <= np.max(np.abs(vec)) / 127
+
+    assert migrate.migrate_collection(col, fields, "array", 10, False) == (1, 1)
+    stored = col.docs[1]["emb"]["skills_vec"]
+    assert isinstance(stored, list) and np.allclose(stored, vec, atol=np.max(np.abs(vec)) / 127)
+    assert col.docs[1]["emb"]["summary_vec"] is None
+    assert migrate.migrate_collection(col, fields, "array", 10, False) == (1, 0)